@@ -3,23 +3,42 @@ HabitIQ - Gestión Inteligente de Hábitos
 App principal con autenticación de usuarios
 """
 
+import csv
+import io
+import json
 import os
 import sys
-from datetime import datetime, date
+import time
+import threading
+from collections import namedtuple
+from datetime import datetime, date, timedelta
+from itertools import islice
 
 # Agregar directorio raíz al path
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, BASE_DIR)
 
+import click
 from dotenv import load_dotenv
 load_dotenv(os.path.join(BASE_DIR, '.env'))
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import (Flask, render_template, request, redirect, url_for, flash, jsonify, g, has_request_context,
+                   Response, stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from backend.database.db import db, init_app
+from backend.services.cache import TTLCache, make_etag
+from backend.services.chart_service import ChartService
+from backend.services.import_service import DEFAULT_BATCH_SIZE, ImportReport, ImportService
+from backend.services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry, TimedQueuePool
+from backend.services.pagination import KeysetPagination
+from backend.services.pubsub import PubSub
+from backend.services.sql_profiler import DEFAULT_RING_SIZE, SQLProfiler, current_profile
+from backend.services.streaks import StreakService
+from backend.services.time_service import TimeService
 import sqlalchemy
+from sqlalchemy.orm import load_only
 
 # Crear aplicación Flask
 app = Flask(__name__,
@@ -37,8 +56,9 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_recycle': 280, 'pool_pre_ping':
 # seguir trabajando localmente.
 db_url = app.config['SQLALCHEMY_DATABASE_URI']
 try:
-    # Intento rápido de conexión (timeout corto)
-    engine = sqlalchemy.create_engine(db_url, connect_args={"connect_timeout": 5})
+    # Intento rápido de conexión (timeout corto; sqlite3 no admite connect_timeout)
+    connect_args = {} if db_url.startswith('sqlite') else {"connect_timeout": 5}
+    engine = sqlalchemy.create_engine(db_url, connect_args=connect_args)
     conn = engine.connect()
     conn.close()
     print(f"✅ Conexión a la base de datos OK: {db_url}")
@@ -49,6 +69,9 @@ except Exception as e:
     app.config['SQLALCHEMY_DATABASE_URI'] = fallback
     print(f"Usando base de datos local de fallback: {app.config['SQLALCHEMY_DATABASE_URI']}")
 
+# Pool que mide la espera de cada checkout para /metrics (SQLite en memoria usa StaticPool)
+app.config['SQLALCHEMY_ENGINE_OPTIONS']['poolclass'] = TimedQueuePool
+
 # Inicializar extensiones
 init_app(app)
 login_manager = LoginManager(app)
@@ -56,6 +79,70 @@ login_manager.login_view = 'login'
 login_manager.login_message = 'Inicia sesión para acceder a esta página'
 login_manager.login_message_category = 'info'
 
+# ========== INSTRUMENTACIÓN SQL ==========
+# Server-Timing con sentencias y tiempo de BD en cada respuesta; con
+# DEBUG_REQUESTS=1 las últimas peticiones se consultan en /debug/requests
+app.config['DEBUG_REQUESTS'] = os.environ.get('DEBUG_REQUESTS', '').lower() in ('1', 'true', 'yes')
+sql_profiler = SQLProfiler(app, ring_size=int(os.environ.get('DEBUG_REQUESTS_SIZE', DEFAULT_RING_SIZE)),
+                           keep_requests=app.config['DEBUG_REQUESTS'])
+
+# ========== MÉTRICAS ==========
+# Registro en proceso expuesto en /metrics; contadores sin locks por hilo
+metrics = MetricsRegistry()
+request_latency = metrics.histogram('habitiq_request_duration_seconds',
+                                    'Latencia de las peticiones por ruta', ('method', 'route', 'status'))
+request_db_time = metrics.histogram('habitiq_request_db_seconds',
+                                    'Tiempo en base de datos por petición', ('route',))
+db_pool_wait = metrics.histogram('habitiq_db_pool_wait_seconds',
+                                 'Tiempo para obtener una conexión del pool (incluye abrirla)',
+                                 buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0))
+db_pool_checkouts = metrics.counter('habitiq_db_pool_checkouts_total', 'Conexiones entregadas por el pool')
+completions_toggled = metrics.counter('habitiq_completions_toggled_total',
+                                      'Completaciones creadas o eliminadas', ('action', 'source'))
+with app.app_context():
+    # Solo el engine de la aplicación (los listeners de PoolEvents sobreviven a dispose)
+    sqlalchemy.event.listen(db.engine, 'checkout', lambda *args: db_pool_checkouts.inc())
+    if isinstance(db.engine.pool, TimedQueuePool):
+        db.engine.pool.wait_observers.append(db_pool_wait.observe)
+
+def pool_stat(name):
+    """Estadística del pool actual (None si el tipo de pool no la ofrece)"""
+    method = getattr(db.engine.pool, name, None)
+    return method() if callable(method) else None
+
+metrics.callback('habitiq_db_pool_size', 'Tamaño configurado del pool', lambda: pool_stat('size'))
+metrics.callback('habitiq_db_pool_checked_out', 'Conexiones prestadas ahora', lambda: pool_stat('checkedout'))
+# QueuePool.overflow() es negativo mientras quedan huecos del pool sin abrir
+metrics.callback('habitiq_db_pool_overflow', 'Conexiones por encima de pool_size',
+                 lambda: None if pool_stat('overflow') is None else max(pool_stat('overflow'), 0))
+metrics.callback('habitiq_dashboard_cache_hits_total', 'Aciertos de la caché de /api/dashboard/stats',
+                 lambda: dashboard_stats_cache.stats()['hits'], kind='counter')
+metrics.callback('habitiq_dashboard_cache_misses_total', 'Fallos de la caché de /api/dashboard/stats',
+                 lambda: dashboard_stats_cache.stats()['misses'], kind='counter')
+metrics.callback('habitiq_dashboard_cache_hit_ratio', 'Proporción de aciertos de la caché del dashboard',
+                 lambda: dashboard_stats_cache.stats()['hit_ratio'])
+metrics.callback('habitiq_dashboard_stream_subscribers', 'Streams SSE del dashboard abiertos',
+                 lambda: dashboard_events.subscriber_count())
+
+@app.before_request
+def start_request_timer():
+    """Marcar el inicio de la petición para el histograma de latencia"""
+    g.request_started = time.perf_counter()
+
+# Se registra después de SQLProfiler, así se ejecuta antes que él y su perfil sigue en g
+@app.after_request
+def record_request_metrics(response):
+    """Latencia y tiempo de BD por ruta (la plantilla de la regla, no la URL)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_latency.observe(time.perf_counter() - started, method=request.method,
+                                route=route, status=response.status_code)
+        profile = current_profile()
+        if profile is not None:
+            request_db_time.observe(profile.db_ms / 1000, route=route)
+    return response
+
 # ========== MODELOS ==========
 
 class User(UserMixin, db.Model):
@@ -67,6 +154,7 @@ class User(UserMixin, db.Model):
     bio = db.Column(db.String(300), default='')
     avatar_color = db.Column(db.String(7), default='#6366f1')
     is_public = db.Column(db.Boolean, default=True)
+    timezone = db.Column(db.String(50), default='UTC')
     created_at = db.Column(db.DateTime, default=lambda: datetime.utcnow())
     habits = db.relationship('Habit', backref='user', lazy=True, cascade='all, delete-orphan')
     achievements = db.relationship('UserAchievement', backref='user', lazy=True, cascade='all, delete-orphan')
@@ -83,24 +171,95 @@ class User(UserMixin, db.Model):
 
     def get_friends(self):
         """Get all accepted friends"""
-        sent = Friendship.query.filter_by(user_id=self.id, status='accepted').all()
-        received = Friendship.query.filter_by(friend_id=self.id, status='accepted').all()
-        friends = [f.receiver for f in sent] + [f.sender for f in received]
-        return friends
+        return get_friend_graph(self.id).friends()
+
+    def get_friend_ids(self):
+        """Ids de los amigos aceptados"""
+        return sorted(get_friend_graph(self.id).accepted)
 
     def get_pending_received(self):
         """Get pending friend requests received"""
-        return Friendship.query.filter_by(friend_id=self.id, status='pending').all()
+        return get_friend_graph(self.id).pending_received()
 
     def friendship_with(self, other_id):
         """Check friendship status with another user"""
-        f = Friendship.query.filter(
-            db.or_(
-                db.and_(Friendship.user_id == self.id, Friendship.friend_id == other_id),
-                db.and_(Friendship.user_id == other_id, Friendship.friend_id == self.id)
-            )
-        ).first()
-        return f
+        return get_friend_graph(self.id).edge(other_id)
+
+
+class FriendGraph:
+    """
+    Adyacencia de amistades de un usuario, cargada en una sola consulta.
+
+    Guarda una Friendship por cada otro usuario y los conjuntos accepted,
+    pending_in (solicitudes recibidas) y pending_out (enviadas).
+    """
+
+    def __init__(self, user_id, friendships):
+        self.user_id = user_id
+        self.edges = {}
+        self.accepted = set()
+        self.pending_in = set()
+        self.pending_out = set()
+        self._users = None
+        for f in friendships:
+            other = f.friend_id if f.user_id == user_id else f.user_id
+            # Si hay solicitudes duplicadas en ambos sentidos, prevalece la aceptada
+            if other in self.edges and self.edges[other].status == 'accepted':
+                continue
+            self.edges[other] = f
+        for other, f in self.edges.items():
+            if f.status == 'accepted':
+                self.accepted.add(other)
+            elif f.status == 'pending':
+                (self.pending_in if f.friend_id == user_id else self.pending_out).add(other)
+
+    @classmethod
+    def load(cls, user_id):
+        """Cargar todas las amistades del usuario (ambos sentidos) en una consulta"""
+        return cls(user_id, Friendship.query.filter(
+            db.or_(Friendship.user_id == user_id, Friendship.friend_id == user_id)
+        ).all())
+
+    def edge(self, other_id):
+        """Friendship con otro usuario (o None)"""
+        return self.edges.get(other_id)
+
+    def statuses(self, user_ids):
+        """Estado de amistad para varios usuarios: {user_id: Friendship o None}"""
+        return {uid: self.edges.get(uid) for uid in user_ids}
+
+    def users(self):
+        """Usuarios adyacentes (amigos y solicitudes) cargados en una consulta"""
+        if self._users is None:
+            ids = list(self.edges)
+            self._users = {u.id: u for u in User.query.filter(User.id.in_(ids))} if ids else {}
+        return self._users
+
+    def friends(self):
+        """Amigos aceptados ordenados por nombre"""
+        users = self.users()
+        return sorted((users[uid] for uid in self.accepted if uid in users), key=lambda u: u.username.lower())
+
+    def pending_received(self):
+        """Solicitudes pendientes recibidas (sender ya en el identity map)"""
+        self.users()
+        return sorted((self.edges[uid] for uid in self.pending_in), key=lambda f: f.id)
+
+def get_friend_graph(user_id):
+    """FriendGraph del usuario, cacheado durante la petición actual"""
+    if not has_request_context():
+        return FriendGraph.load(user_id)
+    graphs = g.setdefault('friend_graphs', {})
+    if user_id not in graphs:
+        graphs[user_id] = FriendGraph.load(user_id)
+    return graphs[user_id]
+
+def invalidate_friend_graph(*user_ids):
+    """Descartar el FriendGraph cacheado tras modificar amistades"""
+    if has_request_context():
+        graphs = g.get('friend_graphs', {})
+        for user_id in user_ids:
+            graphs.pop(user_id, None)
 
 
 class Friendship(db.Model):
@@ -111,6 +270,15 @@ class Friendship(db.Model):
     status = db.Column(db.String(20), default='pending')  # pending, accepted, rejected
     created_at = db.Column(db.DateTime, default=lambda: datetime.utcnow())
 
+    __table_args__ = (
+        db.Index('idx_friendship_user_status', 'user_id', 'status'),
+        db.Index('idx_friendship_friend_status', 'friend_id', 'status'),
+        # Una sola fila por pareja en cualquier sentido: (menor id, mayor id)
+        db.Index('uq_friendship_pair_undirected',
+                 db.case((user_id < friend_id, user_id), else_=friend_id),
+                 db.case((user_id < friend_id, friend_id), else_=user_id), unique=True),
+    )
+
 
 class Achievement(db.Model):
     __tablename__ = 'achievements'
@@ -131,6 +299,10 @@ class UserAchievement(db.Model):
     earned_at = db.Column(db.DateTime, default=lambda: datetime.utcnow())
     achievement = db.relationship('Achievement', backref='user_achievements')
 
+    __table_args__ = (
+        db.Index('uq_user_achievement', 'user_id', 'achievement_id', unique=True),
+    )
+
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -148,29 +320,371 @@ class Habit(db.Model):
     current_streak = db.Column(db.Integer, default=0)
     best_streak = db.Column(db.Integer, default=0)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.utcnow())
-    completions = db.relationship('Completion', backref='habit', lazy=True, cascade='all, delete-orphan')
+    # NOT NULL: es la posición del cursor de /app y /api/habits
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.utcnow())
+    # lazy='dynamic': habit.completions es una consulta, el historial nunca se carga entero
+    completions = db.relationship('Completion', backref='habit', lazy='dynamic', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('idx_habits_user_active', 'user_id', 'is_active'),
+        db.Index('idx_habits_user_created', 'user_id', 'created_at'),
+    )
+
+def completion_local_day(ctx):
+    """
+    Default de completed_day: día local de completed_date en la zona del
+    dueño del hábito. Solo consulta la zona si no se indica el día.
+    """
+    params = ctx.get_current_parameters()
+    timezone_name = ctx.connection.execute(
+        sqlalchemy.select(User.timezone).join(Habit, Habit.user_id == User.id)
+        .where(Habit.id == params.get('habit_id'))
+    ).scalar()
+    return TimeService.local_day(params.get('completed_date') or datetime.utcnow(), timezone_name)
 
 class Completion(db.Model):
     __tablename__ = 'completions'
     id = db.Column(db.Integer, primary_key=True)
     habit_id = db.Column(db.Integer, db.ForeignKey('habits.id'), nullable=False)
-    completed_date = db.Column(db.DateTime, default=lambda: datetime.utcnow())
+    completed_date = db.Column(db.DateTime, nullable=False, default=lambda: datetime.utcnow())
+    # Día de calendario (zona del usuario) para búsquedas exactas por día
+    completed_day = db.Column(db.Date, default=lambda ctx: completion_local_day(ctx))
     notes = db.Column(db.String(200))
 
+    __table_args__ = (
+        db.Index('idx_habit_date', 'habit_id', 'completed_date'),
+        db.Index('idx_habit_day', 'habit_id', 'completed_day'),
+    )
+
+class DailyUserStats(db.Model):
+    """Rollup diario por usuario, mantenido al escribir completaciones"""
+    __tablename__ = 'daily_user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    completions = db.Column(db.Integer, nullable=False, default=0)
+    habits_active = db.Column(db.Integer, nullable=False, default=0)
+
+class UserScore(db.Model):
+    """Puntuación materializada por usuario para el leaderboard"""
+    __tablename__ = 'user_scores'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    best_streak = db.Column(db.Integer, nullable=False, default=0)
+    total_completions = db.Column(db.Integer, nullable=False, default=0)
+    today_done = db.Column(db.Integer, nullable=False, default=0)
+    today_day = db.Column(db.Date)  # día local al que corresponde today_done
+    achievements = db.Column(db.Integer, nullable=False, default=0)
+    # Contadores para la evaluación incremental de logros
+    habit_count = db.Column(db.Integer, nullable=False, default=0)
+    friend_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.utcnow(), onupdate=lambda: datetime.utcnow())
+
+# HELPERS de fechas en la zona horaria del usuario
+def user_today(user=None):
+    """Día actual en la zona horaria del usuario (actual por defecto)"""
+    if user is None and current_user and current_user.is_authenticated:
+        user = current_user
+    return TimeService.today(user.timezone if user is not None else None)
+
+def completed_on(day):
+    """Filtro de completaciones de un día local (completed_day, usa idx_habit_day)"""
+    return Completion.completed_day == day
+
+def completed_today_ids(user=None, habit_ids=None):
+    """Ids de los hábitos del usuario completados hoy, en una sola consulta"""
+    if user is None:
+        user = current_user
+    query = db.session.query(Completion.habit_id).join(Habit).filter(
+        Habit.user_id == user.id,
+        completed_on(user_today(user))
+    )
+    if habit_ids is not None:
+        query = query.filter(Completion.habit_id.in_(habit_ids))
+    return {habit_id for habit_id, in query.distinct()}
+
+def attach_completed_today(habits, user=None):
+    """Marcar habit.completed_today en una lista de hábitos (evita N+1 en templates)"""
+    done = completed_today_ids(user)
+    for habit in habits:
+        habit.completed_today = habit.id in done
+    return habits
+
 # FUNCIÓN HELPER para verificar si un hábito fue completado hoy
+# (fallback para hábitos sin completed_today precargado)
 def is_completed_today(habit_id):
     """Verificar si un hábito fue completado hoy"""
-    today = datetime.utcnow().date()
     completion = Completion.query.filter(
         Completion.habit_id == habit_id,
-        db.func.date(Completion.completed_date) == today
+        completed_on(user_today())
     ).first()
     return completion is not None
 
 # Hacerla disponible en los templates
 app.jinja_env.globals.update(is_completed_today=is_completed_today)
 
+# ========== RACHAS ==========
+
+def completed_days_query(habit_ids):
+    """(habit_id, día) distintos de los hábitos, ordenados para el motor de rachas"""
+    return db.session.query(Completion.habit_id, Completion.completed_day) \
+        .filter(Completion.habit_id.in_(habit_ids)) \
+        .distinct().order_by(Completion.habit_id, Completion.completed_day)
+
+def refresh_habit_streaks(habits, today):
+    """
+    Recalcular current_streak y best_streak desde el historial (sin commit).
+
+    Lee solo los días completados de los hábitos indicados, en una consulta,
+    sin cargar objetos Completion.
+    """
+    if not habits:
+        return
+    streaks = StreakService.compute_many(completed_days_query([habit.id for habit in habits]),
+                                         {habit.id: habit.frequency for habit in habits}, today)
+    for habit in habits:
+        habit.current_streak, habit.best_streak = streaks[habit.id]
+
+def recompute_streaks(user_ids=None, chunk_size=500):
+    """
+    Recalcular las rachas de todos los hábitos (o de los de user_ids) por bloques.
+
+    Cada bloque lee sus días completados en una consulta y escribe las rachas
+    con un UPDATE masivo por clave primaria; al final refresca user_scores.
+    """
+    query = db.session.query(Habit.id, Habit.frequency, User.timezone) \
+        .join(User, User.id == Habit.user_id).order_by(Habit.id)
+    if user_ids is not None:
+        query = query.filter(Habit.user_id.in_(user_ids))
+    habits = query.all()
+    
+    todays = {}
+    for i in range(0, len(habits), chunk_size):
+        chunk = habits[i:i + chunk_size]
+        today = {}
+        for habit_id, _, tz in chunk:
+            if tz not in todays:
+                todays[tz] = TimeService.today(tz)
+            today[habit_id] = todays[tz]
+        streaks = StreakService.compute_many(completed_days_query([habit_id for habit_id, _, _ in chunk]),
+                                             {habit_id: frequency for habit_id, frequency, _ in chunk}, today)
+        db.session.execute(db.update(Habit), [
+            {'id': habit_id, 'current_streak': current, 'best_streak': best}
+            for habit_id, (current, best) in streaks.items()
+        ])
+        db.session.commit()
+    
+    refresh_user_scores(user_ids)
+    return len(habits)
+
+def rollover_streaks(chunk_size=10000):
+    """
+    Poner a 0 las rachas actuales que ya no siguen vivas (idempotente).
+
+    Para cada zona horaria calcula el día local y, por rangos de ids de
+    usuario, ejecuta un único UPDATE: se reinician los hábitos con racha sin
+    ninguna completación desde el inicio del periodo anterior (ayer, la semana
+    pasada o el mes pasado según su frecuencia). Pensado para ejecutarse cada
+    hora, así cada zona se procesa poco después de su medianoche.
+    """
+    first_id, last_id = db.session.query(db.func.min(User.id), db.func.max(User.id)).one()
+    if first_id is None:
+        return 0
+    timezones = [tz for tz, in db.session.query(User.timezone).distinct()]
+    
+    cutoffs = {}
+    for tz in timezones:
+        today = TimeService.today(tz)
+        cutoffs[tz] = {frequency: StreakService.previous_period_start(today, frequency)
+                       for frequency in ('daily', 'weekly', 'monthly')}
+    
+    reset = 0
+    for lo in range(first_id, last_id + 1, chunk_size):
+        hi = lo + chunk_size
+        for tz, cutoff in cutoffs.items():
+            # users.timezone puede ser NULL en filas antiguas: se tratan como UTC
+            zone_users = db.select(User.id).where(
+                User.id >= lo, User.id < hi,
+                User.timezone.is_(None) if tz is None else User.timezone == tz)
+            since = db.case(
+                (Habit.frequency == 'weekly', cutoff['weekly']),
+                (Habit.frequency == 'monthly', cutoff['monthly']),
+                else_=cutoff['daily'])
+            recent = db.select(Completion.id).where(
+                Completion.habit_id == Habit.id, Completion.completed_day >= since)
+            result = db.session.execute(
+                db.update(Habit)
+                .where(Habit.user_id >= lo, Habit.user_id < hi,
+                       Habit.user_id.in_(zone_users),
+                       Habit.current_streak > 0,
+                       ~recent.exists())
+                .values(current_streak=0)
+                .execution_options(synchronize_session=False))
+            reset += result.rowcount or 0
+        db.session.commit()
+    return reset
+
+@app.cli.command('rollover-streaks')
+def rollover_streaks_command():
+    """Reiniciar rachas caducadas (programar cada hora)"""
+    count = rollover_streaks()
+    print(f"✅ Rachas reiniciadas: {count} hábitos")
+
+@app.cli.command('recompute-streaks')
+def recompute_streaks_command():
+    """Recalcular las rachas desde el historial de completaciones"""
+    count = recompute_streaks()
+    print(f"✅ Rachas recalculadas para {count} hábitos")
+
+# ========== ESTADÍSTICAS DEL DASHBOARD ==========
+
+class DashboardStats:
+    """
+    Estadísticas del dashboard de un usuario: total de hábitos, activos,
+    completados hoy y hábito con mejor racha.
+
+    for_user() las calcula en una sola consulta agregada (endpoint de sondeo);
+    from_habits() las deriva de los hábitos ya cargados por la página.
+    """
+
+    def __init__(self, total_habits=0, active_habits=0, completed_today=0,
+                 best_streak=0, best_streak_name=None, best_streak_habit=None):
+        self.total_habits = total_habits
+        self.active_habits = active_habits
+        self.completed_today = completed_today
+        self.best_streak = best_streak
+        self.best_streak_name = best_streak_name
+        self.best_streak_habit = best_streak_habit
+
+    @classmethod
+    def for_user(cls, user):
+        """Calcular las estadísticas con una consulta sobre los hábitos del usuario"""
+        done_today = sqlalchemy.exists().where(
+            Completion.habit_id == Habit.id,
+            completed_on(user_today(user))
+        )
+        best = db.session.query(Habit.name).filter(Habit.user_id == user.id) \
+            .order_by(Habit.best_streak.desc(), Habit.id).limit(1).scalar_subquery()
+        row = db.session.query(
+            db.func.count(Habit.id),
+            db.func.sum(sqlalchemy.case((Habit.is_active.is_(True), 1), else_=0)),
+            db.func.sum(sqlalchemy.case((done_today, 1), else_=0)),
+            db.func.max(Habit.best_streak),
+            best
+        ).filter(Habit.user_id == user.id).one()
+        total, active, completed, best_streak, best_name = row
+        return cls(total, active or 0, completed or 0, best_streak or 0, best_name)
+
+    @classmethod
+    def from_habits(cls, habits):
+        """Derivar las estadísticas de hábitos con completed_today ya adjuntado"""
+        best = None
+        for habit in habits:
+            if best is None or (habit.best_streak or 0) > (best.best_streak or 0):
+                best = habit
+        return cls(
+            total_habits=len(habits),
+            active_habits=sum(1 for habit in habits if habit.is_active),
+            completed_today=sum(1 for habit in habits if habit.completed_today),
+            best_streak=best.best_streak if best else 0,
+            best_streak_name=best.name if best else None,
+            best_streak_habit=best
+        )
+
+    def to_dict(self):
+        """Respuesta JSON de /api/dashboard/stats"""
+        return {
+            'total_habits': self.total_habits,
+            'active_habits': self.active_habits,
+            'completed_today': self.completed_today,
+            'best_streak': self.best_streak,
+            'best_streak_habit': self.best_streak_name or 'Ninguno'
+        }
+
+# Respuestas de /api/dashboard/stats por usuario (el dashboard lo sondea cada pocos segundos)
+dashboard_stats_cache = TTLCache(ttl=float(os.environ.get('DASHBOARD_STATS_TTL', 10)))
+
+# Avisos a los streams SSE del dashboard (clave: id de usuario)
+dashboard_events = PubSub()
+
+def notify_user_changed(*user_ids):
+    """Invalidar las estadísticas cacheadas y avisar a los dashboards abiertos"""
+    for user_id in user_ids:
+        dashboard_stats_cache.invalidate(user_id)
+        dashboard_events.publish(user_id)
+
+def dashboard_stats_payload(user):
+    """(etag, payload) de las estadísticas del usuario, desde la caché si está vigente"""
+    cached = dashboard_stats_cache.get(user.id)
+    if cached is None:
+        # Leída antes de consultar: si un cambio invalida mientras tanto, no se cachea el valor viejo
+        generation = dashboard_stats_cache.generation(user.id)
+        payload = DashboardStats.for_user(user).to_dict()
+        cached = (make_etag(payload), payload)
+        dashboard_stats_cache.set(user.id, cached, generation)
+    return cached
+
+# ========== ROLLUP DIARIO ==========
+
+def bump_daily_stats(user_id, day, delta=0):
+    """Sumar delta completaciones al rollup del día (sin commit, usa la transacción actual)"""
+    active = Habit.query.filter_by(user_id=user_id, is_active=True).count()
+    updated = DailyUserStats.query.filter_by(user_id=user_id, day=day).update({
+        DailyUserStats.completions: DailyUserStats.completions + delta,
+        DailyUserStats.habits_active: active
+    }, synchronize_session=False)
+    if not updated:
+        db.session.add(DailyUserStats(user_id=user_id, day=day,
+                                      completions=max(delta, 0), habits_active=active))
+
+def rebuild_daily_stats(user_ids=None):
+    """Reconstruir el rollup desde completions (todos los usuarios o solo user_ids)"""
+    stats = DailyUserStats.__table__
+    day = Completion.completed_day
+
+    delete = stats.delete()
+    if user_ids is not None:
+        delete = delete.where(stats.c.user_id.in_(user_ids))
+    db.session.execute(delete)
+
+    grouped = db.select(Habit.user_id, day, db.func.count(Completion.id), db.literal(0)) \
+        .select_from(Completion).join(Habit, Completion.habit_id == Habit.id) \
+        .where(Habit.user_id.isnot(None))
+    if user_ids is not None:
+        grouped = grouped.where(Habit.user_id.in_(user_ids))
+    grouped = grouped.group_by(Habit.user_id, day)
+    db.session.execute(stats.insert().from_select(
+        ['user_id', 'day', 'completions', 'habits_active'], grouped))
+
+    # No hay historial de hábitos activos: se usa el número actual
+    active = db.select(db.func.count(Habit.id)).where(
+        Habit.user_id == stats.c.user_id, Habit.is_active.is_(True)
+    ).scalar_subquery()
+    update = stats.update().values(habits_active=active)
+    if user_ids is not None:
+        update = update.where(stats.c.user_id.in_(user_ids))
+    db.session.execute(update)
+    db.session.commit()
+
+    query = DailyUserStats.query
+    if user_ids is not None:
+        query = query.filter(DailyUserStats.user_id.in_(user_ids))
+    return query.count()
+
+def total_completions_for(user_id):
+    """Total de completaciones de un usuario según el rollup"""
+    return db.session.query(db.func.coalesce(db.func.sum(DailyUserStats.completions), 0)) \
+        .filter(DailyUserStats.user_id == user_id).scalar()
+
+def completions_on(user_id, day):
+    """Completaciones de un usuario en un día según el rollup"""
+    return db.session.query(DailyUserStats.completions) \
+        .filter_by(user_id=user_id, day=day).scalar() or 0
+
+@app.cli.command('rebuild-daily-stats')
+def rebuild_daily_stats_command():
+    """Backfill/reconstrucción del rollup daily_user_stats"""
+    rows = rebuild_daily_stats()
+    print(f"✅ Rollup diario reconstruido: {rows} filas")
+
 # ========== RUTAS PÚBLICAS ==========
 
 @app.route('/')
@@ -269,12 +783,24 @@ def logout():
 
 # ========== RUTAS DE HÁBITOS ==========
 
+# Hábitos por página en /app
+HABITS_PAGE_SIZE = 100
+
 @app.route('/app')
 @login_required
 def habits_app():
-    """Página principal de hábitos (requiere login)"""
-    habits_list = Habit.query.filter_by(user_id=current_user.id).order_by(Habit.created_at.desc()).all()
-    return render_template('index.html', habits=habits_list)
+    """Página principal de hábitos (requiere login), paginada por cursor"""
+    try:
+        habits_list, next_cursor = KeysetPagination.paginate(
+            Habit.query.filter_by(user_id=current_user.id), Habit.created_at, Habit.id,
+            request.args.get('cursor'), HABITS_PAGE_SIZE)
+    except ValueError:
+        return redirect(url_for('habits_app'))
+    completed_ids = completed_today_ids(habit_ids=[habit.id for habit in habits_list])
+    stats = DashboardStats.for_user(current_user)
+    return render_template('index.html', habits=habits_list, next_cursor=next_cursor,
+                           completed_ids=completed_ids,
+                           total_habits=stats.total_habits, active_habits=stats.active_habits)
 
 @app.route('/habits')
 @login_required
@@ -306,9 +832,15 @@ def create_habit():
             )
             
             db.session.add(new_habit)
+            db.session.flush()
+            bump_daily_stats(current_user.id, user_today())
+            bump_user_score(current_user.id, habits_delta=1)
             db.session.commit()
+            notify_user_changed(current_user.id)
             
             flash(f'¡Hábito "{name}" creado exitosamente!', 'success')
+            for a in fire_achievement_event(current_user, EVENT_HABIT_CREATED):
+                flash(f'Nuevo logro: {a.name}!', 'success')
             return redirect(url_for('habits_app'))
             
         except Exception as e:
@@ -328,34 +860,43 @@ def toggle_complete(habit_id):
     habit = Habit.query.filter_by(id=habit_id, user_id=current_user.id).first_or_404()
     
     # Verificar si ya se completó hoy
-    today = datetime.utcnow().date()
+    today = user_today()
     existing_completion = Completion.query.filter(
         Completion.habit_id == habit_id,
-        db.func.date(Completion.completed_date) == today
+        completed_on(today)
     ).first()
     
     if existing_completion:
         # Si ya está completado, eliminar la completación
         db.session.delete(existing_completion)
-        habit.current_streak = max(0, habit.current_streak - 1)
+        db.session.flush()
+        refresh_habit_streaks([habit], today)
+        bump_daily_stats(current_user.id, today, -1)
+        bump_user_score(current_user.id, -1, today, -1)
         db.session.commit()
         message = f'Completación de "{habit.name}" removida'
         completed = False
         flash_message_type = 'info'
     else:
         # Si no está completado, crear nueva completación
-        new_completion = Completion(habit_id=habit_id)
+        new_completion = Completion(habit_id=habit_id, completed_day=today)
         db.session.add(new_completion)
+        db.session.flush()
         
-        # Actualizar racha
-        habit.current_streak += 1
-        if habit.current_streak > habit.best_streak:
-            habit.best_streak = habit.current_streak
+        # Actualizar racha desde el historial
+        refresh_habit_streaks([habit], today)
         
+        bump_daily_stats(current_user.id, today, 1)
+        bump_user_score(current_user.id, 1, today, 1)
         db.session.commit()
         message = f'¡Hábito "{habit.name}" completado! 🎉'
         completed = True
         flash_message_type = 'success'
+    notify_user_changed(current_user.id)
+    completions_toggled.inc(action='complete' if completed else 'uncomplete', source='toggle')
+    
+    # Desmarcar no puede otorgar logros: solo se evalúa al completar
+    new_achievements = fire_achievement_event(current_user, EVENT_COMPLETION_TOGGLED) if completed else []
     
     # Si es una petición AJAX, devolver JSON
     is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
@@ -368,13 +909,139 @@ def toggle_complete(habit_id):
             'habit_id': habit_id,
             'habit_name': habit.name,
             'current_streak': habit.current_streak,
-            'best_streak': habit.best_streak
+            'best_streak': habit.best_streak,
+            'achievements': [a.name for a in new_achievements]
         })
     
     # Si no es AJAX, comportamiento normal
     flash(message, flash_message_type)
+    for a in new_achievements:
+        flash(f'Nuevo logro: {a.name}!', 'success')
     return redirect(request.referrer or url_for('habits_app'))
 
+# Máximo de operaciones aceptadas por petición en /api/completions/batch
+BATCH_MAX_OPERATIONS = 500
+
+def parse_batch_operations(data, today):
+    """
+    Validar las operaciones de /api/completions/batch.
+
+    Acepta una lista o {"operations": [...]}, con elementos
+    {"habit_id", "date" (YYYY-MM-DD, hoy por defecto), "state"} o tuplas
+    [habit_id, date, state]. Si un (hábito, día) se repite gana la última.
+
+    Returns:
+        dict: (habit_id, día) -> estado deseado
+
+    Raises:
+        ValueError: Si el formato no es válido
+    """
+    operations = data.get('operations') if isinstance(data, dict) else data
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('Se esperaba una lista de operaciones')
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        raise ValueError(f'Máximo {BATCH_MAX_OPERATIONS} operaciones por petición')
+    
+    result = {}
+    for op in operations:
+        if isinstance(op, (list, tuple)) and len(op) == 3:
+            op = dict(zip(('habit_id', 'date', 'state'), op))
+        if not isinstance(op, dict):
+            raise ValueError('Operación inválida')
+        habit_id, state = op.get('habit_id'), op.get('state')
+        if not isinstance(habit_id, int) or isinstance(habit_id, bool) or not isinstance(state, bool):
+            raise ValueError('Cada operación necesita habit_id entero y state booleano')
+        try:
+            day = date.fromisoformat(op['date']) if op.get('date') else today
+        except (TypeError, ValueError):
+            raise ValueError('Fecha inválida (usa YYYY-MM-DD)')
+        if day > today:
+            raise ValueError('No se pueden completar días futuros')
+        result[(habit_id, day)] = state
+    return result
+
+@app.route('/api/completions/batch', methods=['POST'])
+@login_required
+def api_completions_batch():
+    """Marcar/desmarcar varias completaciones (hábito, día) en una sola transacción"""
+    today = user_today()
+    try:
+        wanted = parse_batch_operations(request.get_json(silent=True), today)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Propiedad de todos los hábitos en una consulta
+    habit_ids = {habit_id for habit_id, _ in wanted}
+    habits = Habit.query.filter(Habit.user_id == current_user.id, Habit.id.in_(habit_ids)).all()
+    missing = habit_ids - {habit.id for habit in habits}
+    if missing:
+        return jsonify({'error': 'Hábitos no encontrados', 'habit_ids': sorted(missing)}), 404
+    
+    # Completaciones existentes de los (hábito, día) pedidos
+    days = {day for _, day in wanted}
+    existing = {}
+    for completion_id, habit_id, day in db.session.query(
+            Completion.id, Completion.habit_id, Completion.completed_day).filter(
+            Completion.habit_id.in_(habit_ids), Completion.completed_day.in_(days)):
+        existing.setdefault((habit_id, day), []).append(completion_id)
+    
+    to_insert, to_delete, per_day = [], [], {}
+    unchanged = 0
+    now = datetime.utcnow()
+    for (habit_id, day), state in wanted.items():
+        ids = existing.get((habit_id, day), [])
+        if state and not ids:
+            # Días atrasados: mediodía local, dentro del rango UTC de ese día
+            moment = now if day == today else TimeService.day_midpoint(day, current_user.timezone)
+            to_insert.append({'habit_id': habit_id, 'completed_date': moment, 'completed_day': day})
+            per_day[day] = per_day.get(day, 0) + 1
+        elif not state and ids:
+            to_delete.extend(ids)
+            per_day[day] = per_day.get(day, 0) - len(ids)
+        else:
+            unchanged += 1
+    
+    try:
+        if to_insert:
+            db.session.execute(db.insert(Completion), to_insert)
+        if to_delete:
+            Completion.query.filter(Completion.id.in_(to_delete)).delete(synchronize_session=False)
+        if per_day:
+            for day, delta in sorted(per_day.items()):
+                bump_daily_stats(current_user.id, day, delta)
+            refresh_habit_streaks(habits, today)
+            bump_user_score(current_user.id, sum(per_day.values()),
+                            today if today in per_day else None, per_day.get(today, 0))
+        done_today = completed_today_ids(habit_ids=list(habit_ids))
+        summary = [{
+            'id': habit.id,
+            'current_streak': habit.current_streak,
+            'best_streak': habit.best_streak,
+            'completed_today': habit.id in done_today
+        } for habit in sorted(habits, key=lambda h: h.id)]
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        app.logger.exception('Error al guardar el lote de completaciones del usuario %s', current_user.id)
+        return jsonify({'error': 'Error al guardar las completaciones'}), 500
+    
+    new_achievements = []
+    if per_day:
+        notify_user_changed(current_user.id)
+        completions_toggled.inc(len(to_insert), action='complete', source='batch')
+        completions_toggled.inc(len(to_delete), action='uncomplete', source='batch')
+        if to_insert:
+            new_achievements = fire_achievement_event(current_user, EVENT_COMPLETION_TOGGLED)
+    
+    return jsonify({
+        'success': True,
+        'created': len(to_insert),
+        'deleted': len(to_delete),
+        'unchanged': unchanged,
+        'habits': summary,
+        'achievements': [a.name for a in new_achievements]
+    })
+
 @app.route('/habits/edit/<int:habit_id>', methods=['GET', 'POST'])
 @login_required
 def edit_habit(habit_id):
@@ -386,9 +1053,15 @@ def edit_habit(habit_id):
             habit.name = request.form.get('name', habit.name)
             habit.description = request.form.get('description', habit.description)
             habit.category = request.form.get('category', habit.category)
-            habit.frequency = request.form.get('frequency', habit.frequency)
+            frequency = request.form.get('frequency', habit.frequency)
+            if frequency != habit.frequency:
+                # La racha se mide en periodos de la frecuencia: recalcular desde el historial
+                habit.frequency = frequency
+                refresh_habit_streaks([habit], user_today())
+                bump_user_score(current_user.id)
             
             db.session.commit()
+            notify_user_changed(current_user.id)
             flash(f'Hábito "{habit.name}" actualizado exitosamente', 'success')
             return redirect(url_for('habits_app'))
             
@@ -408,12 +1081,24 @@ def delete_habit(habit_id):
     habit = Habit.query.filter_by(id=habit_id, user_id=current_user.id).first_or_404()
     habit_name = habit.name
     
+    # Descontar sus completaciones del rollup diario
+    per_day = db.session.query(Completion.completed_day, db.func.count(Completion.id)) \
+        .filter(Completion.habit_id == habit_id).group_by(Completion.completed_day).all()
+    
     # Eliminar completaciones primero
     Completion.query.filter_by(habit_id=habit_id).delete()
     
     # Eliminar hábito
     db.session.delete(habit)
+    db.session.flush()
+    today = user_today()
+    for d, count in per_day:
+        bump_daily_stats(current_user.id, d, -count)
+    bump_daily_stats(current_user.id, today)
+    bump_user_score(current_user.id, -sum(count for _, count in per_day),
+                    today, -sum(count for d, count in per_day if d == today), habits_delta=-1)
     db.session.commit()
+    notify_user_changed(current_user.id)
     
     flash(f'Hábito "{habit_name}" eliminado exitosamente', 'success')
     return redirect(url_for('habits_app'))
@@ -424,7 +1109,10 @@ def toggle_habit(habit_id):
     """Activar/desactivar hábito"""
     habit = Habit.query.filter_by(id=habit_id, user_id=current_user.id).first_or_404()
     habit.is_active = not habit.is_active
+    db.session.flush()
+    bump_daily_stats(current_user.id, user_today())
     db.session.commit()
+    notify_user_changed(current_user.id)
     
     status = "activado" if habit.is_active else "desactivado"
     flash(f'Hábito "{habit.name}" {status}', 'info')
@@ -434,18 +1122,13 @@ def toggle_habit(habit_id):
 @login_required
 def dashboard():
     """Dashboard con estadísticas"""
-    from datetime import datetime, date
-    
     # Obtener fecha actual
     today = datetime.now()
     
-    # Obtener hábitos del usuario actual
-    habits = Habit.query.filter_by(user_id=current_user.id).all()
-    
-    # Calcular hábitos completados hoy
-    completed_today = Completion.query.filter(
-        db.func.date(Completion.completed_date) == date.today()
-    ).count()
+    # Hábitos del usuario con su estado de hoy (2 consultas en total)
+    habits = attach_completed_today(
+        Habit.query.filter_by(user_id=current_user.id).order_by(Habit.id).all())
+    stats = DashboardStats.from_habits(habits)
     
     # Obtener categorías agrupadas
     categories = {}
@@ -454,73 +1137,410 @@ def dashboard():
             categories[habit.category] = []
         categories[habit.category].append(habit)
     
-    # Calcular estadísticas
-    total_habits = len(habits)
-    active_habits = sum(1 for habit in habits if habit.is_active)
-    
-    # Hábitos con mejor racha
-    best_streak_habit = Habit.query.filter_by(user_id=current_user.id).order_by(Habit.best_streak.desc()).first()
-    
-    # Determinar qué hábitos fueron completados hoy
-    habit_ids_completed_today = [
-        completion.habit_id 
-        for completion in Completion.query.filter(
-            db.func.date(Completion.completed_date) == date.today()
-        ).all()
-    ]
-    
-    for habit in habits:
-        habit.completed_today = habit.id in habit_ids_completed_today
-    
     return render_template('dashboard.html',
                          today=today,
                          habits=habits,
                          categories=categories,
-                         total_habits=total_habits,
-                         active_habits=active_habits,
-                         completed_today=completed_today,
-                         best_streak_habit=best_streak_habit)
+                         total_habits=stats.total_habits,
+                         active_habits=stats.active_habits,
+                         completed_today=stats.completed_today,
+                         best_streak_habit=stats.best_streak_habit)
+
+# Campos de /api/habits (fields=) y los devueltos por defecto
+HABIT_API_FIELDS = ('id', 'name', 'description', 'category', 'frequency', 'current_streak',
+                    'best_streak', 'is_active', 'created_at', 'completed_today')
+HABIT_API_DEFAULT_FIELDS = ('id', 'name', 'category', 'frequency', 'current_streak',
+                            'best_streak', 'is_active', 'completed_today')
 
 @app.route('/api/habits')
 @login_required
 def api_habits():
-    """API para obtener hábitos (para AJAX)"""
-    habits = Habit.query.filter_by(user_id=current_user.id).all()
+    """
+    API para obtener hábitos (para AJAX).
+
+    Devuelve todos los hábitos, de más reciente a más antiguo. Con
+    ?limit=N y/o ?cursor=TOKEN pagina por cursor sobre (created_at, id) y la
+    siguiente página se indica en X-Next-Cursor y Link. ?fields=id,name,...
+    limita las columnas leídas y devueltas.
+    """
+    try:
+        fields = KeysetPagination.parse_fields(request.args.get('fields'), HABIT_API_FIELDS,
+                                               HABIT_API_DEFAULT_FIELDS)
+        columns = [getattr(Habit, f) for f in fields if f != 'completed_today']
+        query = Habit.query.filter_by(user_id=current_user.id) \
+            .options(load_only(Habit.id, Habit.created_at, *columns))
+        if KeysetPagination.wants_page(request.args):
+            limit = KeysetPagination.parse_limit(request.args.get('limit'))
+            habits, next_cursor = KeysetPagination.paginate(query, Habit.created_at, Habit.id,
+                                                            request.args.get('cursor'), limit)
+        else:
+            habits, next_cursor = query.order_by(Habit.created_at.desc(), Habit.id.desc()).all(), None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if 'completed_today' in fields:
+        done = completed_today_ids(habit_ids=[habit.id for habit in habits])
     result = []
     for habit in habits:
-        result.append({
-            'id': habit.id,
-            'name': habit.name,
-            'category': habit.category,
-            'frequency': habit.frequency,
-            'current_streak': habit.current_streak,
-            'best_streak': habit.best_streak,
-            'is_active': habit.is_active,
-            'completed_today': is_completed_today(habit.id)
-        })
-    return jsonify(result)
+        row = {}
+        for f in fields:
+            if f == 'completed_today':
+                row[f] = habit.id in done
+            elif f == 'created_at':
+                row[f] = habit.created_at.isoformat() if habit.created_at else None
+            else:
+                row[f] = getattr(habit, f)
+        result.append(row)
+    
+    response = jsonify(result)
+    next_url = url_for('api_habits', **{**request.args.to_dict(), 'cursor': next_cursor}) if next_cursor else None
+    return KeysetPagination.set_headers(response, next_cursor, next_url)
+
+def completion_day_filters(args):
+    """
+    Filtros start/end (YYYY-MM-DD, inclusive) sobre completed_day.
+
+    Raises:
+        ValueError: Si alguna fecha no es válida
+    """
+    filters = []
+    try:
+        if args.get('start'):
+            filters.append(Completion.completed_day >= date.fromisoformat(args['start']))
+        if args.get('end'):
+            filters.append(Completion.completed_day <= date.fromisoformat(args['end']))
+    except ValueError:
+        raise ValueError("Fechas inválidas (usa YYYY-MM-DD)")
+    return filters
+
+def completion_to_dict(completion):
+    """Completación como diccionario JSON"""
+    return {
+        'id': completion.id,
+        'habit_id': completion.habit_id,
+        'completed_date': completion.completed_date.isoformat() if completion.completed_date else None,
+        'completed_day': completion.completed_day.isoformat() if completion.completed_day else None,
+        'notes': completion.notes
+    }
+
+@app.route('/api/habits/<int:habit_id>/completions')
+@login_required
+def api_habit_completions(habit_id):
+    """
+    Historial de completaciones de un hábito, de más reciente a más antigua.
+
+    ?start=&end= filtran por día; ?limit=N&cursor=TOKEN paginan por
+    (completed_date, id) usando idx_habit_date.
+    """
+    Habit.query.with_entities(Habit.id).filter_by(id=habit_id, user_id=current_user.id).first_or_404()
+    try:
+        limit = KeysetPagination.parse_limit(request.args.get('limit'))
+        query = Completion.query.filter(Completion.habit_id == habit_id,
+                                        *completion_day_filters(request.args))
+        completions, next_cursor = KeysetPagination.paginate(
+            query, Completion.completed_date, Completion.id, request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = jsonify([completion_to_dict(c) for c in completions])
+    next_url = url_for('api_habit_completions', habit_id=habit_id,
+                       **{**request.args.to_dict(), 'cursor': next_cursor}) if next_cursor else None
+    return KeysetPagination.set_headers(response, next_cursor, next_url)
+
+# Columnas del export y filas leídas por lote del cursor de servidor
+EXPORT_COLUMNS = ('id', 'habit_id', 'habit_name', 'completed_date', 'completed_day', 'notes')
+EXPORT_BATCH_SIZE = 1000
+
+@app.route('/api/export/completions')
+@login_required
+def api_export_completions():
+    """
+    Exportar todas las completaciones del usuario como NDJSON (por defecto) o CSV.
+
+    La respuesta se genera por streaming con yield_per: las filas se leen por
+    lotes del cursor y nunca se materializan completas en memoria.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format debe ser ndjson o csv'}), 400
+    try:
+        filters = completion_day_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = db.session.query(
+        Completion.id, Completion.habit_id, Habit.name, Completion.completed_date,
+        Completion.completed_day, Completion.notes
+    ).join(Habit, Habit.id == Completion.habit_id) \
+        .filter(Habit.user_id == current_user.id, *filters) \
+        .order_by(Completion.id) \
+        .yield_per(EXPORT_BATCH_SIZE)
+    
+    def rows():
+        for row in query:
+            yield [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+    
+    def generate_ndjson():
+        for row in rows():
+            yield json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n'
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for i, row in enumerate(rows(), 1):
+            writer.writerow(row)
+            if i % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    if export_format == 'csv':
+        body, mimetype = generate_csv(), 'text/csv'
+    else:
+        body, mimetype = generate_ndjson(), 'application/x-ndjson'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=completions.{export_format}'
+    return response
+
+# ========== IMPORTACIÓN ==========
+
+# Tamaño máximo de lote aceptado por /api/import
+IMPORT_MAX_BATCH_SIZE = 50000
+# Filas por petición en /api/import: un fichero mayor ocuparía un worker durante minutos,
+# así que se importa con el comando `flask import-data`
+IMPORT_MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS', 100000))
+
+def _resolve_habit_ids(user_id, names, habit_ids):
+    """Completar habit_ids (nombre -> id) con los hábitos existentes, en una consulta"""
+    if not names:
+        return
+    rows = db.session.query(Habit.name, db.func.min(Habit.id)) \
+        .filter(Habit.user_id == user_id, Habit.name.in_(names)).group_by(Habit.name)
+    habit_ids.update(rows)
+
+def import_records(user, stream, fmt, batch_size=DEFAULT_BATCH_SIZE, max_rows=None):
+    """
+    Importar hábitos y completaciones de un fichero CSV/NDJSON para un usuario.
+
+    Procesa la entrada por lotes: valida las filas, resuelve los nombres de
+    hábito en bloque (creando los que falten) y escribe con INSERT masivos,
+    con un commit por lote. Las completaciones de un (hábito, día) que ya
+    existe se omiten, así reimportar el mismo fichero no duplica datos.
+    Al final reconstruye rollup, rachas, puntuación y logros del usuario.
+
+    Con max_rows se importan como mucho esas filas y el informe queda
+    marcado como truncated; las ya escritas se conservan.
+
+    Returns:
+        ImportReport: Contadores y filas por segundo
+    """
+    report = ImportReport()
+    habit_ids = {}
+    midpoints = {}
+    # Margen de un día para instantes UTC que localmente aún son "hoy"
+    max_day = user_today(user) + timedelta(days=1)
+    
+    records = ImportService.iter_records(stream, fmt)
+    if max_rows is not None:
+        records = islice(records, max_rows + 1)
+    for chunk in ImportService.chunks(records, batch_size):
+        habits, completions = [], []
+        for line, record in chunk:
+            if max_rows is not None and report.rows >= max_rows:
+                report.truncated = True
+                break
+            report.rows += 1
+            try:
+                row = ImportService.validate(record, max_day)
+            except ValueError as e:
+                report.add_error(line, str(e))
+                continue
+            (habits if row['type'] == 'habit' else completions).append(row)
+        
+        # Hábitos: los nuevos del fichero y los referenciados que aún no existen
+        names = {row['name'] for row in habits} | {row['habit'] for row in completions}
+        _resolve_habit_ids(user.id, names - habit_ids.keys(), habit_ids)
+        new_habits = {}
+        for row in habits:
+            if row['name'] not in habit_ids:
+                new_habits.setdefault(row['name'], row)
+        for row in completions:
+            if row['habit'] not in habit_ids and row['habit'] not in new_habits:
+                new_habits[row['habit']] = {'name': row['habit'], 'category': 'general',
+                                            'frequency': 'daily', 'description': '', 'is_active': True}
+        if new_habits:
+            db.session.execute(db.insert(Habit), [
+                {'user_id': user.id, 'name': name, 'category': row['category'], 'frequency': row['frequency'],
+                 'description': row['description'], 'is_active': row['is_active']}
+                for name, row in new_habits.items()
+            ])
+            report.habits_created += len(new_habits)
+            _resolve_habit_ids(user.id, set(new_habits), habit_ids)
+        
+        # Completaciones: día local y omitir (hábito, día) ya existentes
+        rows = []
+        for row in completions:
+            if row['moment'] is None:
+                day = row['day']
+                if day not in midpoints:
+                    midpoints[day] = TimeService.day_midpoint(day, user.timezone)
+                moment = midpoints[day]
+            else:
+                moment = row['moment']
+                day = TimeService.local_day(moment, user.timezone)
+            rows.append({'habit_id': habit_ids[row['habit']], 'completed_date': moment,
+                         'completed_day': day, 'notes': row['notes']})
+        if rows:
+            existing = set(db.session.query(Completion.habit_id, Completion.completed_day).filter(
+                Completion.habit_id.in_({row['habit_id'] for row in rows}),
+                Completion.completed_day.between(min(row['completed_day'] for row in rows),
+                                                 max(row['completed_day'] for row in rows))
+            ).distinct())
+            fresh = []
+            for row in rows:
+                key = (row['habit_id'], row['completed_day'])
+                if key in existing:
+                    report.duplicates += 1
+                else:
+                    existing.add(key)
+                    fresh.append(row)
+            if fresh:
+                db.session.execute(db.insert(Completion), fresh)
+                report.completions_created += len(fresh)
+        db.session.commit()
+    
+    if report.habits_created or report.completions_created:
+        rebuild_daily_stats([user.id])
+        recompute_streaks([user.id])
+        check_achievements(user)
+        notify_user_changed(user.id)
+    return report.finish()
+
+@app.cli.command('import-data')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='Usuario destino')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None,
+              help='Formato (por defecto según la extensión)')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, help='Filas por lote')
+def import_data_command(path, username, fmt, batch_size):
+    """Importar hábitos y completaciones desde CSV/NDJSON"""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f'Usuario no encontrado: {username}')
+    fmt = ImportService.detect_format(filename=path, explicit=fmt)
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        report = import_records(user, stream, fmt, batch_size).as_dict()
+    print(f"✅ Importadas {report['rows']} filas en {report['elapsed_seconds']}s "
+          f"({report['rows_per_second']} filas/s): {report['habits_created']} hábitos, "
+          f"{report['completions_created']} completaciones, {report['duplicates_skipped']} duplicadas, "
+          f"{report['errors']} con error")
+    for error in report['error_samples']:
+        print(f"  línea {error['line']}: {error['error']}")
+
+@app.route('/api/import', methods=['POST'])
+@login_required
+def api_import():
+    """
+    Importar un fichero CSV/NDJSON (multipart 'file' o cuerpo de la petición).
+
+    ?format=csv|ndjson (si no, por extensión o Content-Type) y ?batch_size=N.
+    Admite hasta IMPORT_MAX_ROWS filas: si el fichero tiene más, se importan
+    esas, se responde 413 y el fichero completo debe pasarse por
+    `flask import-data` (las filas ya importadas se omiten como duplicadas).
+    """
+    upload = request.files.get('file')
+    try:
+        fmt = ImportService.detect_format(
+            filename=upload.filename if upload else None,
+            content_type=upload.content_type if upload else request.content_type,
+            explicit=request.args.get('format'))
+        batch_size = request.args.get('batch_size', DEFAULT_BATCH_SIZE)
+        if not str(batch_size).isdigit():
+            raise ValueError('batch_size debe ser un entero')
+        batch_size = int(batch_size)
+        if not 1 <= batch_size <= IMPORT_MAX_BATCH_SIZE:
+            raise ValueError(f'batch_size debe estar entre 1 y {IMPORT_MAX_BATCH_SIZE}')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    raw = upload.stream if upload else request.stream
+    stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+    try:
+        report = import_records(current_user, stream, fmt, batch_size, IMPORT_MAX_ROWS)
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'error': 'El fichero debe estar en UTF-8'}), 400
+    except csv.Error as e:
+        # P. ej. un campo mayor que csv.field_size_limit()
+        db.session.rollback()
+        return jsonify({'error': f'CSV inválido: {e}'}), 400
+    finally:
+        stream.detach()
+    if report.truncated:
+        return jsonify({**report.as_dict(),
+                        'error': f'Máximo {IMPORT_MAX_ROWS} filas por petición: '
+                                 'importa el fichero completo con `flask import-data`'}), 413
+    return jsonify(report.as_dict())
 
 @app.route('/api/dashboard/stats')
 @login_required
 def api_dashboard_stats():
-    """API para obtener estadísticas del dashboard (AJAX)"""
-    from datetime import date
-    
-    total_habits = Habit.query.filter_by(user_id=current_user.id).count()
-    active_habits = Habit.query.filter_by(user_id=current_user.id, is_active=True).count()
-    completed_today = Completion.query.filter(
-        db.func.date(Completion.completed_date) == date.today()
-    ).count()
+    """API para obtener estadísticas del dashboard (AJAX, cacheada por usuario con ETag)"""
+    etag, payload = dashboard_stats_payload(current_user)
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    # 304 sin cuerpo si el cliente ya tiene esta versión (If-None-Match)
+    return response.make_conditional(request)
+
+# Segundos entre comentarios keepalive y vida máxima de un stream (el navegador reconecta solo).
+# Cada stream abierto ocupa un hilo/worker síncrono durante hasta MAX_AGE segundos, por eso se
+# limitan los streams simultáneos por usuario (varias pestañas); el resto recibe 429 y sondea.
+DASHBOARD_STREAM_KEEPALIVE = 25
+DASHBOARD_STREAM_MAX_AGE = 300
+DASHBOARD_STREAM_MAX_PER_USER = int(os.environ.get('DASHBOARD_STREAM_MAX_PER_USER', 3))
+
+@app.route('/api/dashboard/stream')
+@login_required
+def api_dashboard_stream():
+    """Stream SSE con las estadísticas del dashboard; envía un evento solo cuando cambian"""
+    user = current_user._get_current_object()
+    last_event_id = request.headers.get('Last-Event-ID')
+    subscription = dashboard_events.subscribe(user.id, limit=DASHBOARD_STREAM_MAX_PER_USER)
+    if subscription is None:
+        response = jsonify({'error': 'Demasiados streams abiertos'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(DASHBOARD_STREAM_MAX_AGE)
+        return response
     
-    best_streak_habit = Habit.query.filter_by(user_id=current_user.id).order_by(Habit.best_streak.desc()).first()
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            etag = last_event_id
+            deadline = time.monotonic() + DASHBOARD_STREAM_MAX_AGE
+            changed = True
+            while time.monotonic() < deadline:
+                if changed:
+                    new_etag, payload = dashboard_stats_payload(user)
+                    # No retener la conexión de la base de datos mientras el stream espera
+                    db.session.remove()
+                    if new_etag != etag:
+                        etag = new_etag
+                        yield f'id: {etag}\nevent: stats\ndata: {json.dumps(payload)}\n\n'
+                else:
+                    yield ': keepalive\n\n'
+                changed = subscription.wait(DASHBOARD_STREAM_KEEPALIVE)
+        finally:
+            dashboard_events.unsubscribe(subscription)
     
-    return jsonify({
-        'total_habits': total_habits,
-        'active_habits': active_habits,
-        'completed_today': completed_today,
-        'best_streak': best_streak_habit.best_streak if best_streak_habit else 0,
-        'best_streak_habit': best_streak_habit.name if best_streak_habit else 'Ninguno'
-    })
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # Si el cliente corta antes de empezar el stream, generate() no llega a ejecutar su finally
+    response.call_on_close(lambda: dashboard_events.unsubscribe(subscription))
+    return response
 
 # ========== LOGROS / ACHIEVEMENTS ==========
 
@@ -540,60 +1560,185 @@ ACHIEVEMENT_DEFINITIONS = [
     {'key': 'perfect_day', 'name': 'Dia Perfecto', 'description': 'Completa todos tus habitos en un dia', 'icon': 'fa-sun', 'color': '#f59e0b', 'category': 'completion'},
 ]
 
+AchievementEntry = namedtuple('AchievementEntry', 'id key name description icon color category')
+
+class AchievementCatalog:
+    """
+    Catálogo de logros cacheado por proceso (key -> AchievementEntry).
+
+    Las entradas son tuplas inmutables, seguras para compartir entre
+    peticiones e hilos. seed_achievements() invalida solo el catálogo del
+    proceso que lo ejecuta; los demás workers recargan al vencer ``ttl``
+    segundos, así que ven los cambios con ese retraso como máximo.
+    """
+
+    def __init__(self, ttl=300, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._tables = None  # (by_key, by_id, cargado_en), se sustituye entero
+        self._lock = threading.Lock()
+
+    def _snapshot(self):
+        """(by_key, by_id) vigentes, leídos de una sola vez bajo el lock"""
+        with self._lock:
+            if self._tables is None or self._clock() - self._tables[2] >= self.ttl:
+                entries = [AchievementEntry(a.id, a.key, a.name, a.description, a.icon, a.color, a.category)
+                           for a in Achievement.query.order_by(Achievement.id)]
+                self._tables = ({e.key: e for e in entries}, {e.id: e for e in entries}, self._clock())
+            return self._tables[0], self._tables[1]
+
+    def all(self):
+        """Todas las entradas en orden de id"""
+        by_key, _ = self._snapshot()
+        return list(by_key.values())
+
+    def get(self, key):
+        """Entrada por key (o None)"""
+        by_key, _ = self._snapshot()
+        return by_key.get(key)
+
+    def by_id(self, achievement_id):
+        """Entrada por id (o None)"""
+        _, by_id = self._snapshot()
+        return by_id.get(achievement_id)
+
+    def invalidate(self):
+        """Forzar recarga en el próximo acceso (solo en este proceso)"""
+        with self._lock:
+            self._tables = None
+
+achievement_catalog = AchievementCatalog(ttl=float(os.environ.get('ACHIEVEMENT_CATALOG_TTL', 300)))
+
 def seed_achievements():
-    """Seed achievement definitions into DB"""
-    for ach_def in ACHIEVEMENT_DEFINITIONS:
-        existing = Achievement.query.filter_by(key=ach_def['key']).first()
-        if not existing:
-            ach = Achievement(**ach_def)
-            db.session.add(ach)
+    """Upsert masivo de ACHIEVEMENT_DEFINITIONS (una lectura + inserciones/updates en bloque)"""
+    existing = {a.key: a for a in Achievement.query.all()}
+    fields = ('name', 'description', 'icon', 'color', 'category')
+
+    to_insert = [ach_def for ach_def in ACHIEVEMENT_DEFINITIONS if ach_def['key'] not in existing]
+    to_update = [
+        dict(ach_def, id=existing[ach_def['key']].id)
+        for ach_def in ACHIEVEMENT_DEFINITIONS
+        if ach_def['key'] in existing
+        and any(getattr(existing[ach_def['key']], f) != ach_def[f] for f in fields)
+    ]
+
+    if to_insert:
+        db.session.execute(db.insert(Achievement), to_insert)
+    if to_update:
+        db.session.execute(db.update(Achievement), to_update)
     db.session.commit()
 
-def check_achievements(user):
-    """Check and award achievements for a user"""
-    earned_keys = {ua.achievement.key for ua in user.achievements}
-    new_achievements = []
+    if to_insert or to_update:
+        achievement_catalog.invalidate()
+    return len(to_insert), len(to_update)
+
+# Eventos que disparan la evaluación de logros
+EVENT_HABIT_CREATED = 'habit_created'
+EVENT_COMPLETION_TOGGLED = 'completion_toggled'
+EVENT_FRIENDSHIP_ACCEPTED = 'friendship_accepted'
+
+# Reglas: key -> (eventos de los que depende, condición sobre los contadores)
+ACHIEVEMENT_RULES = {
+    'first_habit': ({EVENT_HABIT_CREATED}, lambda c: c['habit_count'] >= 1),
+    'five_habits': ({EVENT_HABIT_CREATED}, lambda c: c['habit_count'] >= 5),
+    'ten_habits': ({EVENT_HABIT_CREATED}, lambda c: c['habit_count'] >= 10),
+    'streak_3': ({EVENT_COMPLETION_TOGGLED}, lambda c: c['best_streak'] >= 3),
+    'streak_7': ({EVENT_COMPLETION_TOGGLED}, lambda c: c['best_streak'] >= 7),
+    'streak_30': ({EVENT_COMPLETION_TOGGLED}, lambda c: c['best_streak'] >= 30),
+    'streak_100': ({EVENT_COMPLETION_TOGGLED}, lambda c: c['best_streak'] >= 100),
+    'first_complete': ({EVENT_COMPLETION_TOGGLED}, lambda c: c['total_completions'] >= 1),
+    'fifty_completions': ({EVENT_COMPLETION_TOGGLED}, lambda c: c['total_completions'] >= 50),
+    'hundred_completions': ({EVENT_COMPLETION_TOGGLED}, lambda c: c['total_completions'] >= 100),
+    'first_friend': ({EVENT_FRIENDSHIP_ACCEPTED}, lambda c: c['friend_count'] >= 1),
+    'five_friends': ({EVENT_FRIENDSHIP_ACCEPTED}, lambda c: c['friend_count'] >= 5),
+    'perfect_day': ({EVENT_COMPLETION_TOGGLED},
+                    lambda c: c['habits_active'] > 0 and c['today_done'] >= c['habits_active']),
+}
+
+def achievement_counters(user):
+    """Contadores mantenidos incrementalmente (user_scores + rollup de hoy) en una consulta"""
+    today = user_today(user)
+    row = db.session.query(
+        UserScore.habit_count, UserScore.total_completions, UserScore.best_streak,
+        UserScore.friend_count, DailyUserStats.completions, DailyUserStats.habits_active
+    ).outerjoin(DailyUserStats, db.and_(DailyUserStats.user_id == UserScore.user_id,
+                                        DailyUserStats.day == today)) \
+     .filter(UserScore.user_id == user.id).first()
+    habit_count, total, best, friends, today_done, active = row or (0, 0, 0, 0, 0, 0)
+    return {
+        'habit_count': habit_count,
+        'total_completions': total,
+        'best_streak': best,
+        'friend_count': friends,
+        'today_done': today_done or 0,
+        'habits_active': active or 0,
+    }
 
-    habit_count = Habit.query.filter_by(user_id=user.id).count()
-    total_completions = Completion.query.join(Habit).filter(Habit.user_id == user.id).count()
-    best_streak = db.session.query(db.func.max(Habit.best_streak)).filter(Habit.user_id == user.id).scalar() or 0
-    friend_count = len(user.get_friends())
+def _award_achievements(user_id, keys):
+    """
+    Otorgar los logros indicados que el usuario aún no tenga y hacer commit.
+
+    Si otra petición concurrente otorga alguno entre la lectura y el commit
+    (uq_user_achievement), se deshace y se reintenta una vez sin los ya
+    otorgados, así un duplicado no descarta el resto del lote.
+    """
+    entries = [e for e in map(achievement_catalog.get, keys) if e]
+    for _ in range(2):
+        if entries:
+            earned = {aid for aid, in db.session.query(UserAchievement.achievement_id).filter(
+                UserAchievement.user_id == user_id,
+                UserAchievement.achievement_id.in_([e.id for e in entries]))}
+            entries = [e for e in entries if e.id not in earned]
+        if not entries:
+            return []
+        db.session.add_all(UserAchievement(user_id=user_id, achievement_id=e.id) for e in entries)
+        try:
+            bump_user_score(user_id, achievements=len(entries))
+            db.session.commit()
+            return entries
+        except sqlalchemy.exc.IntegrityError:
+            db.session.rollback()
+    return []
+
+def fire_achievement_event(user, event):
+    """Evaluar solo las reglas que dependen de event y otorgar los logros nuevos"""
+    keys = {key: achievement_catalog.get(key) for key, (events, _) in ACHIEVEMENT_RULES.items()
+            if event in events}
+    earned = {aid for aid, in db.session.query(UserAchievement.achievement_id).filter(
+        UserAchievement.user_id == user.id,
+        UserAchievement.achievement_id.in_([e.id for e in keys.values() if e])
+    )}
+    pending = [key for key, entry in keys.items() if entry and entry.id not in earned]
+    if not pending:
+        return []
+
+    counters = achievement_counters(user)
+    return _award_achievements(user.id, [key for key in pending if ACHIEVEMENT_RULES[key][1](counters)])
 
-    # Check today perfect day
-    today_total = Habit.query.filter_by(user_id=user.id, is_active=True).count()
-    today_done = Completion.query.join(Habit).filter(
-        Habit.user_id == user.id,
-        db.func.date(Completion.completed_date) == date.today()
-    ).count()
-    perfect_day = today_total > 0 and today_done >= today_total
-
-    checks = {
-        'first_habit': habit_count >= 1,
-        'five_habits': habit_count >= 5,
-        'ten_habits': habit_count >= 10,
-        'streak_3': best_streak >= 3,
-        'streak_7': best_streak >= 7,
-        'streak_30': best_streak >= 30,
-        'streak_100': best_streak >= 100,
-        'first_complete': total_completions >= 1,
-        'fifty_completions': total_completions >= 50,
-        'hundred_completions': total_completions >= 100,
-        'first_friend': friend_count >= 1,
-        'five_friends': friend_count >= 5,
-        'perfect_day': perfect_day,
+def check_achievements(user):
+    """Recalcular todos los logros de un usuario desde las tablas fuente (backfill)"""
+    earned_ids = [aid for aid, in db.session.query(UserAchievement.achievement_id).filter_by(user_id=user.id)]
+    earned_keys = {entry.key for entry in map(achievement_catalog.by_id, earned_ids) if entry}
+
+    counters = {
+        'habit_count': Habit.query.filter_by(user_id=user.id).count(),
+        'total_completions': total_completions_for(user.id),
+        'best_streak': db.session.query(db.func.max(Habit.best_streak)).filter(Habit.user_id == user.id).scalar() or 0,
+        'friend_count': len(user.get_friend_ids()),
+        'today_done': completions_on(user.id, user_today(user)),
+        'habits_active': Habit.query.filter_by(user_id=user.id, is_active=True).count(),
     }
 
-    for key, condition in checks.items():
-        if condition and key not in earned_keys:
-            ach = Achievement.query.filter_by(key=key).first()
-            if ach:
-                ua = UserAchievement(user_id=user.id, achievement_id=ach.id)
-                db.session.add(ua)
-                new_achievements.append(ach)
+    return _award_achievements(user.id, [
+        key for key, (_, condition) in ACHIEVEMENT_RULES.items()
+        if key not in earned_keys and condition(counters)
+    ])
 
-    if new_achievements:
-        db.session.commit()
-    return new_achievements
+@app.cli.command('check-achievements')
+def check_achievements_command():
+    """Recalcular los logros de todos los usuarios"""
+    awarded = sum(len(check_achievements(user)) for user in User.query.all())
+    print(f"✅ Logros recalculados: {awarded} nuevos")
 
 # ========== PERFIL ==========
 
@@ -608,6 +1753,11 @@ def profile():
             current_user.bio = request.form.get('bio', '')[:300]
             current_user.avatar_color = request.form.get('avatar_color', '#6366f1')
             current_user.is_public = request.form.get('is_public') == 'on'
+            tz_name = request.form.get('timezone', '').strip() or 'UTC'
+            if TimeService.get_zone(tz_name).key == tz_name:
+                current_user.timezone = tz_name
+            else:
+                flash('Zona horaria no reconocida, se mantiene la actual', 'error')
             db.session.commit()
             flash('Perfil actualizado', 'success')
 
@@ -630,18 +1780,13 @@ def profile():
 
     # Stats
     total_habits = Habit.query.filter_by(user_id=current_user.id).count()
-    total_completions = Completion.query.join(Habit).filter(Habit.user_id == current_user.id).count()
+    total_completions = total_completions_for(current_user.id)
     best_streak = db.session.query(db.func.max(Habit.best_streak)).filter(Habit.user_id == current_user.id).scalar() or 0
     friends = current_user.get_friends()
 
-    # Check achievements
-    new_achs = check_achievements(current_user)
-    if new_achs:
-        for a in new_achs:
-            flash(f'Nuevo logro: {a.name}!', 'success')
-
-    all_achievements = Achievement.query.all()
-    earned_ids = {ua.achievement_id for ua in current_user.achievements}
+    all_achievements = achievement_catalog.all()
+    earned_ids = {aid for aid, in db.session.query(UserAchievement.achievement_id)
+                  .filter_by(user_id=current_user.id)}
 
     return render_template('profile.html',
                          total_habits=total_habits,
@@ -660,9 +1805,6 @@ def friends_page():
     friends = current_user.get_friends()
     pending = current_user.get_pending_received()
 
-    # Check achievements
-    check_achievements(current_user)
-
     return render_template('friends.html', friends=friends, pending=pending)
 
 @app.route('/friends/search')
@@ -678,9 +1820,10 @@ def search_users():
         ).limit(20).all()
 
         # Add friendship status to each result
+        statuses = get_friend_graph(current_user.id).statuses([u.id for u in results])
         for u in results:
             u.friendship_status = None
-            f = current_user.friendship_with(u.id)
+            f = statuses[u.id]
             if f:
                 u.friendship_status = f.status
                 u.friendship_sender_id = f.user_id
@@ -707,7 +1850,14 @@ def send_friend_request(user_id):
     target = User.query.get_or_404(user_id)
     friendship = Friendship(user_id=current_user.id, friend_id=target.id, status='pending')
     db.session.add(friendship)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        # Solicitud cruzada o duplicada enviada en paralelo (uq_friendship_pair_undirected)
+        db.session.rollback()
+        flash('Ya tienes una solicitud con este usuario', 'info')
+        return redirect(url_for('friends_page'))
+    invalidate_friend_graph(current_user.id, target.id)
 
     flash(f'Solicitud enviada a {target.username}', 'success')
     return redirect(url_for('friends_page'))
@@ -722,11 +1872,16 @@ def accept_friend(friendship_id):
         return redirect(url_for('friends_page'))
 
     f.status = 'accepted'
+    bump_user_score(f.user_id, friends_delta=1)
+    bump_user_score(f.friend_id, friends_delta=1)
     db.session.commit()
+    invalidate_friend_graph(f.user_id, f.friend_id)
+    notify_user_changed(f.user_id, f.friend_id)
 
-    # Check social achievements for both users
-    check_achievements(current_user)
-    check_achievements(f.sender)
+    # Evaluar logros sociales de ambos usuarios
+    for a in fire_achievement_event(current_user, EVENT_FRIENDSHIP_ACCEPTED):
+        flash(f'Nuevo logro: {a.name}!', 'success')
+    fire_achievement_event(f.sender, EVENT_FRIENDSHIP_ACCEPTED)
 
     flash(f'Ahora eres amigo de {f.sender.username}!', 'success')
     return redirect(url_for('friends_page'))
@@ -742,6 +1897,7 @@ def reject_friend(friendship_id):
 
     db.session.delete(f)
     db.session.commit()
+    invalidate_friend_graph(f.user_id, f.friend_id)
     flash('Solicitud rechazada', 'info')
     return redirect(url_for('friends_page'))
 
@@ -751,8 +1907,12 @@ def remove_friend(user_id):
     """Eliminar amigo"""
     f = current_user.friendship_with(user_id)
     if f:
+        if f.status == 'accepted':
+            bump_user_score(f.user_id, friends_delta=-1)
+            bump_user_score(f.friend_id, friends_delta=-1)
         db.session.delete(f)
         db.session.commit()
+        invalidate_friend_graph(f.user_id, f.friend_id)
         flash('Amigo eliminado', 'info')
     return redirect(url_for('friends_page'))
 
@@ -769,12 +1929,14 @@ def public_profile(username):
         return redirect(url_for('friends_page'))
 
     total_habits = Habit.query.filter_by(user_id=user.id).count()
-    total_completions = Completion.query.join(Habit).filter(Habit.user_id == user.id).count()
+    total_completions = total_completions_for(user.id)
     best_streak = db.session.query(db.func.max(Habit.best_streak)).filter(Habit.user_id == user.id).scalar() or 0
     active_habits = Habit.query.filter_by(user_id=user.id, is_active=True).count()
 
     # Get user's earned achievements
-    earned_achievements = UserAchievement.query.filter_by(user_id=user.id).all()
+    earned_ids = [aid for aid, in db.session.query(UserAchievement.achievement_id)
+                  .filter_by(user_id=user.id).order_by(UserAchievement.earned_at)]
+    earned_achievements = [entry for entry in map(achievement_catalog.by_id, earned_ids) if entry]
 
     # Top habits by streak
     top_habits = Habit.query.filter_by(user_id=user.id, is_active=True).order_by(Habit.best_streak.desc()).limit(5).all()
@@ -798,84 +1960,254 @@ def public_profile(username):
 
 # ========== LEADERBOARD ==========
 
-@app.route('/leaderboard')
-@login_required
-def leaderboard():
-    """Leaderboard de amigos"""
-    friends = current_user.get_friends()
-    friend_ids = [f.id for f in friends] + [current_user.id]
-
-    leaderboard_data = []
-    for uid in friend_ids:
-        u = User.query.get(uid)
-        if not u:
-            continue
-        streak = db.session.query(db.func.max(Habit.best_streak)).filter(Habit.user_id == uid).scalar() or 0
-        completions = Completion.query.join(Habit).filter(Habit.user_id == uid).count()
-        today_done = Completion.query.join(Habit).filter(
-            Habit.user_id == uid,
-            db.func.date(Completion.completed_date) == date.today()
-        ).count()
-        ach_count = UserAchievement.query.filter_by(user_id=uid).count()
-
-        leaderboard_data.append({
-            'user': u,
-            'best_streak': streak,
+# Columnas por las que se puede ordenar el leaderboard
+LEADERBOARD_SORTS = ('total_completions', 'best_streak', 'today_done', 'achievements', 'username')
+LEADERBOARD_PER_PAGE = 50
+
+def local_today_expr(user_ids):
+    """Expresión SQL con el día actual de cada usuario según su zona horaria"""
+    zones = [tz for tz, in db.session.query(User.timezone).filter(User.id.in_(user_ids)).distinct() if tz]
+    if not zones:
+        return db.literal(TimeService.today(), db.Date)
+    return db.case(*[(User.timezone == tz, TimeService.today(tz)) for tz in zones],
+                   else_=TimeService.today())
+
+def _write_scores(user_ids):
+    """Recalcular user_scores de user_ids desde las tablas fuente (sin commit)"""
+    scores = UserScore.__table__
+    streaks = db.select(Habit.user_id, db.func.max(Habit.best_streak).label('best_streak')) \
+        .where(Habit.user_id.in_(user_ids)).group_by(Habit.user_id).subquery()
+    totals = db.select(DailyUserStats.user_id, db.func.sum(DailyUserStats.completions).label('total')) \
+        .where(DailyUserStats.user_id.in_(user_ids)).group_by(DailyUserStats.user_id).subquery()
+    achs = db.select(UserAchievement.user_id, db.func.count(UserAchievement.id).label('achievements')) \
+        .where(UserAchievement.user_id.in_(user_ids)).group_by(UserAchievement.user_id).subquery()
+    habit_counts = db.select(Habit.user_id, db.func.count(Habit.id).label('habits')) \
+        .where(Habit.user_id.in_(user_ids)).group_by(Habit.user_id).subquery()
+    ends = db.union_all(
+        db.select(Friendship.user_id.label('uid')).where(Friendship.status == 'accepted', Friendship.user_id.in_(user_ids)),
+        db.select(Friendship.friend_id.label('uid')).where(Friendship.status == 'accepted', Friendship.friend_id.in_(user_ids))
+    ).subquery()
+    friend_counts = db.select(ends.c.uid, db.func.count().label('friends')).group_by(ends.c.uid).subquery()
+    local_today = local_today_expr(user_ids)
+    today = db.aliased(DailyUserStats)
+
+    rows = db.select(
+        User.id,
+        db.func.coalesce(streaks.c.best_streak, 0),
+        db.func.coalesce(totals.c.total, 0),
+        db.func.coalesce(today.completions, 0),
+        local_today,
+        db.func.coalesce(achs.c.achievements, 0),
+        db.func.coalesce(habit_counts.c.habits, 0),
+        db.func.coalesce(friend_counts.c.friends, 0),
+        db.literal(datetime.utcnow(), db.DateTime)
+    ).outerjoin(streaks, streaks.c.user_id == User.id) \
+     .outerjoin(totals, totals.c.user_id == User.id) \
+     .outerjoin(achs, achs.c.user_id == User.id) \
+     .outerjoin(habit_counts, habit_counts.c.user_id == User.id) \
+     .outerjoin(friend_counts, friend_counts.c.uid == User.id) \
+     .outerjoin(today, db.and_(today.user_id == User.id, today.day == local_today)) \
+     .where(User.id.in_(user_ids))
+
+    db.session.execute(scores.delete().where(scores.c.user_id.in_(user_ids)))
+    db.session.execute(scores.insert().from_select(
+        ['user_id', 'best_streak', 'total_completions', 'today_done', 'today_day',
+         'achievements', 'habit_count', 'friend_count', 'updated_at'], rows))
+
+def refresh_user_scores(user_ids=None, chunk_size=500):
+    """Refresco completo de user_scores por bloques de usuarios (corrige desviaciones)"""
+    if user_ids is None:
+        user_ids = [uid for uid, in db.session.query(User.id).order_by(User.id)]
+    for i in range(0, len(user_ids), chunk_size):
+        _write_scores(user_ids[i:i + chunk_size])
+        db.session.commit()
+    return len(user_ids)
+
+def bump_user_score(user_id, total_delta=0, day=None, day_delta=0, achievements=0,
+                    habits_delta=0, friends_delta=0):
+    """
+    Actualizar incrementalmente la puntuación materializada (sin commit).
+
+    La mejor racha se relee de habits; si el usuario aún no tiene fila se
+    calcula completa desde las tablas fuente.
+    """
+    values = {
+        UserScore.total_completions: UserScore.total_completions + total_delta,
+        UserScore.achievements: UserScore.achievements + achievements,
+        UserScore.habit_count: UserScore.habit_count + habits_delta,
+        UserScore.friend_count: UserScore.friend_count + friends_delta,
+        UserScore.best_streak: db.select(db.func.coalesce(db.func.max(Habit.best_streak), 0))
+            .where(Habit.user_id == user_id).scalar_subquery(),
+        UserScore.updated_at: datetime.utcnow(),
+    }
+    if day is not None:
+        values[UserScore.today_done] = db.case(
+            (UserScore.today_day == day, UserScore.today_done + day_delta),
+            else_=max(day_delta, 0))
+        values[UserScore.today_day] = day
+    db.session.flush()
+    updated = UserScore.query.filter_by(user_id=user_id).update(values, synchronize_session=False)
+    if not updated:
+        _write_scores([user_id])
+
+@app.cli.command('refresh-scores')
+def refresh_scores_command():
+    """Refresco completo de la tabla user_scores (programar p. ej. cada noche)"""
+    count = refresh_user_scores()
+    print(f"✅ Puntuaciones recalculadas para {count} usuarios")
+
+def build_leaderboard(user_ids, sort='total_completions', order='desc', page=1, per_page=LEADERBOARD_PER_PAGE):
+    """
+    Leer el leaderboard de un conjunto de usuarios desde user_scores.
+
+    Devuelve (filas de la página, total de usuarios). Cada fila es un dict con
+    user, best_streak, total_completions, today_done y achievements.
+    """
+    if not user_ids:
+        return [], 0
+    if sort not in LEADERBOARD_SORTS:
+        sort = 'total_completions'
+
+    columns = {
+        'best_streak': db.func.coalesce(UserScore.best_streak, 0),
+        'total_completions': db.func.coalesce(UserScore.total_completions, 0),
+        # today_done solo vale si corresponde al día actual del usuario
+        'today_done': db.case((UserScore.today_day == local_today_expr(user_ids), UserScore.today_done),
+                              else_=0),
+        'achievements': db.func.coalesce(UserScore.achievements, 0),
+        'username': User.username,
+    }
+    sort_col = columns[sort].asc() if order == 'asc' else columns[sort].desc()
+
+    query = db.session.query(
+        User,
+        columns['best_streak'], columns['total_completions'],
+        columns['today_done'], columns['achievements'],
+        db.func.count().over()
+    ).outerjoin(UserScore, UserScore.user_id == User.id) \
+     .filter(User.id.in_(user_ids)) \
+     .order_by(sort_col, User.id) \
+     .limit(per_page).offset((page - 1) * per_page)
+
+    rows, total = [], 0
+    for user, best, completions, today_done, ach_count, count in query:
+        total = count
+        rows.append({
+            'user': user,
+            'best_streak': best,
             'total_completions': completions,
             'today_done': today_done,
             'achievements': ach_count,
-            'is_me': uid == current_user.id
         })
+    return rows, total
 
-    # Sort by total completions descending
-    leaderboard_data.sort(key=lambda x: x['total_completions'], reverse=True)
-
-    return render_template('leaderboard.html', leaderboard=leaderboard_data)
+@app.route('/leaderboard')
+@login_required
+def leaderboard():
+    """Leaderboard de amigos"""
+    friend_ids = current_user.get_friend_ids() + [current_user.id]
+
+    sort = request.args.get('sort', 'total_completions')
+    if sort not in LEADERBOARD_SORTS:
+        sort = 'total_completions'
+    order = 'asc' if request.args.get('order') == 'asc' else 'desc'
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', LEADERBOARD_PER_PAGE, type=int), 1), 200)
+
+    leaderboard_data, total = build_leaderboard(friend_ids, sort, order, page, per_page)
+    offset = (page - 1) * per_page
+    for rank, entry in enumerate(leaderboard_data, start=offset + 1):
+        entry['rank'] = rank
+        entry['is_me'] = entry['user'].id == current_user.id
+
+    return render_template('leaderboard.html',
+                         leaderboard=leaderboard_data,
+                         total=total,
+                         sort=sort,
+                         order=order,
+                         page=page,
+                         per_page=per_page,
+                         pages=max((total + per_page - 1) // per_page, 1))
 
 # ========== API PARA GRÁFICAS ==========
 
 @app.route('/api/chart/completions')
 @login_required
 def api_chart_completions():
-    """Completaciones de los ultimos 30 dias para Chart.js"""
-    from datetime import timedelta
-    today = date.today()
-    data = []
-    for i in range(29, -1, -1):
-        d = today - timedelta(days=i)
-        count = Completion.query.join(Habit).filter(
-            Habit.user_id == current_user.id,
-            db.func.date(Completion.completed_date) == d
-        ).count()
-        data.append({'date': d.strftime('%d/%m'), 'count': count})
-    return jsonify(data)
+    """Completaciones para Chart.js (30 dias por defecto; admite bucket, days, start y end)"""
+    try:
+        bucket = ChartService.resolve_bucket(request.args.get('bucket'))
+        start, end = ChartService.resolve_window(request.args, default_days=30, today=user_today())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    counts = completion_counts_by_day(current_user.id, start, end)
+    label = ChartService.BUCKET_LABELS[bucket]
+    return jsonify([{'date': first.strftime(label), 'count': count}
+                    for first, count in ChartService.bucket_series(counts, start, end, bucket)])
+
+def completion_counts_by_day(user_id, start, end):
+    """Conteo de completaciones por día en [start, end] leído del rollup diario"""
+    rows = db.session.query(DailyUserStats.day, DailyUserStats.completions).filter(
+        DailyUserStats.user_id == user_id,
+        DailyUserStats.day >= start,
+        DailyUserStats.day <= end
+    ).all()
+    return {d.isoformat(): count for d, count in rows}
 
 @app.route('/api/chart/heatmap')
 @login_required
 def api_chart_heatmap():
-    """Datos para heatmap de los ultimos 365 dias"""
-    from datetime import timedelta
-    today = date.today()
-    data = {}
-    for i in range(364, -1, -1):
-        d = today - timedelta(days=i)
-        count = Completion.query.join(Habit).filter(
-            Habit.user_id == current_user.id,
-            db.func.date(Completion.completed_date) == d
-        ).count()
-        data[d.isoformat()] = count
-    return jsonify(data)
+    """Datos para heatmap (ultimos 365 dias por defecto, admite days/start/end)"""
+    try:
+        start, end = ChartService.resolve_window(request.args, default_days=365,
+                                                 today=user_today())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    counts = completion_counts_by_day(current_user.id, start, end)
+    return jsonify(ChartService.fill_days(counts, start, end))
 
 @app.route('/health')
 def health():
     return {'status': 'ok', 'message': 'HabitIQ funcionando'}
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Métricas en formato Prometheus (con METRICS_TOKEN exige Authorization: Bearer)"""
+    token = os.environ.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'No autorizado'}), 401
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+# Usuarios con acceso a las herramientas de depuración (DEBUG_ADMINS=ana,luis)
+DEBUG_ADMINS = {name.strip() for name in os.environ.get('DEBUG_ADMINS', '').split(',') if name.strip()}
+LOOPBACK_ADDRESSES = {'127.0.0.1', '::1'}
+
+def can_view_debug():
+    """Admin autenticado, o cliente local que no llega a través de un proxy"""
+    if current_user.is_authenticated and current_user.username in DEBUG_ADMINS:
+        return True
+    return request.remote_addr in LOOPBACK_ADDRESSES and 'X-Forwarded-For' not in request.headers
+
+@app.route('/debug/requests')
+def debug_requests():
+    """Perfil SQL de las últimas peticiones (DEBUG_REQUESTS activo y admin o cliente local)"""
+    if not sql_profiler.keep_requests or not can_view_debug():
+        return jsonify({'error': 'No encontrado'}), 404
+    limit = min(max(request.args.get('limit', 50, type=int), 1), sql_profiler.requests.maxlen)
+    path = request.args.get('path')
+    profiles = [p for p in sql_profiler.recent() if not path or p['path'].startswith(path)]
+    return jsonify({'requests': profiles[:limit]})
+
 # Función para crear tablas
 def create_tables():
     try:
         with app.app_context():
             db.create_all()
             seed_achievements()
+            if not DailyUserStats.query.first() and Completion.query.first():
+                rebuild_daily_stats()
+            if not UserScore.query.first():
+                refresh_user_scores()
             print("✅ Tablas y logros creados")
     except Exception as e:
         print("⚠️ No se pudieron crear las tablas en create_tables():", str(e))
@@ -4,6 +4,7 @@ Maneja la conexión y configuración de SQLAlchemy.
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from backend.database.migrations import upgrade_schema
 
 # Crear instancia de SQLAlchemy (sin app asociada inicialmente)
 db = SQLAlchemy()
@@ -20,6 +21,7 @@ def init_app(app):
     try:
         with app.app_context():
             db.create_all()
+            upgrade_schema(db.engine)
             print("Base de datos inicializada correctamente")
     except Exception as e:
         # Mostrar advertencia pero no detener el arranque
@@ -0,0 +1,187 @@
+"""
+Migraciones ligeras del esquema.
+db.create_all() crea las tablas nuevas pero no modifica las existentes; este
+módulo añade, de forma idempotente, las columnas e índices posteriores.
+"""
+
+from sqlalchemy import Date, DateTime, bindparam, inspect, text
+
+from backend.services.time_service import TimeService
+
+
+def _columns(conn, table):
+    """Nombres de columnas de una tabla"""
+    return {column['name'] for column in inspect(conn).get_columns(table)}
+
+
+def _indexes(conn, table):
+    """Nombres de índices de una tabla (incluidos los de expresiones)"""
+    if conn.dialect.name == 'sqlite':
+        # La reflexión de SQLite omite los índices sobre expresiones
+        return set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"),
+                                {'table': table}).scalars())
+    return {index['name'] for index in inspect(conn).get_indexes(table)}
+
+
+def create_index(conn, name, table, columns, unique=False):
+    """Crear un índice si no existe (SQLite y PostgreSQL soportan IF NOT EXISTS)"""
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    conn.execute(text(f'CREATE {kind} IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'))
+
+
+def add_user_timezone(conn, tables):
+    """users.timezone: zona horaria IANA del usuario"""
+    if 'users' in tables and 'timezone' not in _columns(conn, 'users'):
+        conn.execute(text("ALTER TABLE users ADD COLUMN timezone VARCHAR(50) DEFAULT 'UTC'"))
+
+
+def add_completion_day(conn, tables):
+    """completions.completed_day: día de calendario (zona del usuario) de la completación, indexado"""
+    if 'completions' not in tables:
+        return
+    if 'completed_day' not in _columns(conn, 'completions'):
+        conn.execute(text('ALTER TABLE completions ADD COLUMN completed_day DATE'))
+        conn.execute(text('UPDATE completions SET completed_day = date(completed_date) '
+                          'WHERE completed_day IS NULL'))
+        if {'habits', 'users'} <= tables:
+            _localize_completion_days(conn)
+    create_index(conn, 'idx_habit_date', 'completions', ['habit_id', 'completed_date'])
+    create_index(conn, 'idx_habit_day', 'completions', ['habit_id', 'completed_day'])
+
+
+def _localize_completion_days(conn, batch_size=1000):
+    """
+    Pasar completed_day del día UTC al día local de cada usuario.
+
+    Solo cambian las completaciones de usuarios con zona distinta de UTC
+    cuyo instante cae en otro día local (las cercanas a medianoche).
+    """
+    zones = conn.execute(text(
+        "SELECT DISTINCT timezone FROM users WHERE timezone IS NOT NULL AND timezone <> 'UTC'"
+    )).scalars().all()
+    for tz_name in zones:
+        rows = conn.execute(text(
+            'SELECT completions.id, completions.completed_date, completions.completed_day FROM completions '
+            'JOIN habits ON habits.id = completions.habit_id JOIN users ON users.id = habits.user_id '
+            'WHERE users.timezone = :tz AND completions.completed_date IS NOT NULL'
+        ).columns(completed_date=DateTime, completed_day=Date), {'tz': tz_name}).all()
+        changes = []
+        for row_id, moment, utc_day in rows:
+            day = TimeService.local_day(moment, tz_name)
+            if day != utc_day:
+                changes.append({'id': row_id, 'day': day})
+        update = text('UPDATE completions SET completed_day = :day WHERE id = :id') \
+            .bindparams(bindparam('day', type_=Date))
+        for start in range(0, len(changes), batch_size):
+            conn.execute(update, changes[start:start + batch_size])
+
+
+def add_score_counters(conn, tables):
+    """user_scores.habit_count / friend_count: contadores para logros incrementales"""
+    if 'user_scores' not in tables or 'habit_count' in _columns(conn, 'user_scores'):
+        return
+    conn.execute(text('ALTER TABLE user_scores ADD COLUMN habit_count INTEGER NOT NULL DEFAULT 0'))
+    conn.execute(text('ALTER TABLE user_scores ADD COLUMN friend_count INTEGER NOT NULL DEFAULT 0'))
+    conn.execute(text(
+        'UPDATE user_scores SET '
+        'habit_count = (SELECT count(*) FROM habits WHERE habits.user_id = user_scores.user_id), '
+        "friend_count = (SELECT count(*) FROM friendships WHERE friendships.status = 'accepted' "
+        'AND (friendships.user_id = user_scores.user_id OR friendships.friend_id = user_scores.user_id))'
+    ))
+
+
+def add_social_indexes(conn, tables):
+    """Índices compuestos y únicos de friendships, user_achievements y habits"""
+    if 'friendships' in tables:
+        create_index(conn, 'idx_friendship_user_status', 'friendships', ['user_id', 'status'])
+        create_index(conn, 'idx_friendship_friend_status', 'friendships', ['friend_id', 'status'])
+    if 'user_achievements' in tables and 'uq_user_achievement' not in _indexes(conn, 'user_achievements'):
+        conn.execute(text(
+            'DELETE FROM user_achievements WHERE id NOT IN ('
+            'SELECT min_id FROM (SELECT MIN(id) AS min_id FROM user_achievements '
+            'GROUP BY user_id, achievement_id) AS keep)'
+        ))
+        create_index(conn, 'uq_user_achievement', 'user_achievements', ['user_id', 'achievement_id'], unique=True)
+    if 'habits' in tables:
+        create_index(conn, 'idx_habits_user_active', 'habits', ['user_id', 'is_active'])
+
+
+# Extremos de la pareja sin dirección (portables: SQLite y PostgreSQL)
+PAIR_LOW = 'CASE WHEN user_id < friend_id THEN user_id ELSE friend_id END'
+PAIR_HIGH = 'CASE WHEN user_id < friend_id THEN friend_id ELSE user_id END'
+
+
+def add_undirected_friendship_pair(conn, tables):
+    """
+    Índice único de friendships sobre (menor id, mayor id).
+
+    Sustituye a uq_friendship_pair (user_id, friend_id), que dejaba pasar
+    A->B y B->A a la vez. Antes de crearlo quita duplicados en ambos
+    sentidos: prevalece la aceptada y luego la más antigua.
+    """
+    if 'friendships' not in tables or 'uq_friendship_pair_undirected' in _indexes(conn, 'friendships'):
+        return
+    conn.execute(text(
+        "DELETE FROM friendships WHERE status <> 'accepted' AND EXISTS ("
+        "SELECT 1 FROM friendships f2 WHERE f2.status = 'accepted' AND f2.id <> friendships.id AND ("
+        "(f2.user_id = friendships.user_id AND f2.friend_id = friendships.friend_id) OR "
+        "(f2.user_id = friendships.friend_id AND f2.friend_id = friendships.user_id)))"
+    ))
+    conn.execute(text(
+        'DELETE FROM friendships WHERE id NOT IN ('
+        f'SELECT min_id FROM (SELECT MIN(id) AS min_id FROM friendships GROUP BY {PAIR_LOW}, {PAIR_HIGH}) AS keep)'
+    ))
+    create_index(conn, 'uq_friendship_pair_undirected', 'friendships',
+                 [f'({PAIR_LOW})', f'({PAIR_HIGH})'], unique=True)
+    conn.execute(text('DROP INDEX IF EXISTS uq_friendship_pair'))
+
+
+def add_habit_keyset_index(conn, tables):
+    """habits(user_id, created_at): paginación por cursor de los hábitos de un usuario"""
+    if 'habits' in tables:
+        create_index(conn, 'idx_habits_user_created', 'habits', ['user_id', 'created_at'])
+
+
+def require_keyset_positions(conn, tables):
+    """
+    habits.created_at y completions.completed_date NOT NULL.
+
+    Son la posición de los cursores de paginación: una fila con NULL no se
+    puede codificar en el cursor. Se rellenan los NULL (la completación toma
+    su completed_day; si tampoco lo tiene, la hora actual) y, donde el motor
+    lo permite, se añade la restricción. SQLite no altera columnas: ahí basta
+    el relleno, porque el modelo siempre escribe un valor.
+    """
+    sqlite = conn.dialect.name == 'sqlite'
+    day_start = 'datetime(completed_day)' if sqlite else 'CAST(completed_day AS TIMESTAMP)'
+    backfills = (
+        ('habits', 'created_at', 'CURRENT_TIMESTAMP'),
+        ('completions', 'completed_date', f'COALESCE({day_start}, CURRENT_TIMESTAMP)'),
+    )
+    for table, column, value in backfills:
+        if table not in tables:
+            continue
+        conn.execute(text(f'UPDATE {table} SET {column} = {value} WHERE {column} IS NULL'))
+        nullable = {c['name']: c['nullable'] for c in inspect(conn).get_columns(table)}[column]
+        if nullable and not sqlite:
+            conn.execute(text(f'ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL'))
+
+
+# Orden de aplicación; cada paso debe ser idempotente
+STEPS = [
+    add_user_timezone,
+    add_completion_day,
+    add_score_counters,
+    add_social_indexes,
+    add_undirected_friendship_pair,
+    add_habit_keyset_index,
+    require_keyset_positions,
+]
+
+
+def upgrade_schema(engine):
+    """Aplicar todos los pasos de migración pendientes"""
+    with engine.begin() as conn:
+        tables = set(inspect(conn).get_table_names())
+        for step in STEPS:
+            step(conn, tables)
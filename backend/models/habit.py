@@ -5,6 +5,7 @@ Define la estructura de la tabla y métodos relacionados.
 
 from datetime import datetime, date
 from backend.database.db import db
+from backend.services.time_service import TimeService
 
 
 class Habit(db.Model):
@@ -21,7 +22,7 @@ class Habit(db.Model):
         best_streak (int): Mejor racha histórica
         created_at (datetime): Fecha de creación
         updated_at (datetime): Última actualización
-        completions (relationship): Relación con las completaciones
+        completions (relationship): Consulta de las completaciones (dinámica, nunca se carga entera)
     """
     
     __tablename__ = 'habits'
@@ -35,18 +36,24 @@ class Habit(db.Model):
     frequency = db.Column(db.String(20), nullable=False, default='daily')
     current_streak = db.Column(db.Integer, default=0)
     best_streak = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     
-    # Relación con las completaciones
-    completions = db.relationship('Completion', backref='habit', lazy=True, cascade='all, delete-orphan')
+    # Relación con las completaciones: lazy='dynamic' devuelve una consulta, así el
+    # historial completo nunca se carga de forma implícita
+    completions = db.relationship('Completion', backref='habit', lazy='dynamic', cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Habit {self.id}: {self.name}>'
     
-    def to_dict(self):
-        """Convertir a diccionario para APIs o templates"""
+    def to_dict(self, completed_today=None):
+        """
+        Convertir a diccionario para APIs o templates.
+        
+        Args:
+            completed_today: Estado de hoy ya precargado (evita una consulta por hábito)
+        """
         return {
             'id': self.id,
             'name': self.name,
@@ -58,17 +65,18 @@ class Habit(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'is_active': self.is_active,
-            'completed_today': self.completed_today()
+            'completed_today': self.completed_today() if completed_today is None else completed_today
         }
     
-    def completed_today(self):
-        """Verificar si el hábito fue completado hoy"""
-        from backend.models.completion import Completion
-        today = date.today()
-        return any(
-            completion.completed_date.date() == today
-            for completion in self.completions
-        )
+    def completed_today(self, today: date = None):
+        """Verificar si el hábito fue completado hoy (consulta EXISTS sobre idx_habit_day)"""
+        today = today or TimeService.today()
+        return db.session.query(
+            Completion.query.filter(
+                Completion.habit_id == self.id,
+                Completion.completed_day == today
+            ).exists()
+        ).scalar()
 
 
 class Completion(db.Model):
@@ -80,12 +88,15 @@ class Completion(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     habit_id = db.Column(db.Integer, db.ForeignKey('habits.id'), nullable=False)
-    completed_date = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    completed_day = db.Column(db.Date, default=lambda ctx: (
+        ctx.get_current_parameters().get('completed_date') or datetime.utcnow()).date())
     notes = db.Column(db.String(200))
     
-    # Índice para búsquedas eficientes
+    # Índices para búsquedas eficientes (rango de fechas y día exacto)
     __table_args__ = (
         db.Index('idx_habit_date', 'habit_id', 'completed_date'),
+        db.Index('idx_habit_day', 'habit_id', 'completed_day'),
     )
     
     def __repr__(self):
@@ -6,6 +6,7 @@ Controladores que manejan las peticiones HTTP.
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
 from datetime import datetime
 from backend.services.habit_service import HabitService
+from backend.services.pagination import KeysetPagination
 
 # Crear Blueprint para organizar rutas
 habits_bp = Blueprint('habits', __name__)
@@ -25,9 +26,13 @@ def index():
 
 @habits_bp.route('/habits')
 def list_habits():
-    """Listar todos los hábitos (página separada)"""
-    habits = HabitService.get_all_habits()
-    return render_template('index.html', habits=habits)
+    """Listar hábitos (página separada, paginada por cursor)"""
+    try:
+        habits, next_cursor = HabitService.get_habits_page(cursor=request.args.get('cursor'), limit=100)
+    except ValueError:
+        return redirect(url_for('habits.list_habits'))
+    completed_ids = HabitService.completed_today_ids([habit.id for habit in habits])
+    return render_template('index.html', habits=habits, next_cursor=next_cursor, completed_ids=completed_ids)
 
 
 @habits_bp.route('/habits/new', methods=['GET', 'POST'])
@@ -128,9 +133,18 @@ def delete_habit(habit_id):
 
 @habits_bp.route('/api/habits', methods=['GET'])
 def api_list_habits():
-    """API: Listar hábitos (JSON)"""
-    habits = HabitService.get_all_habits()
-    return jsonify([habit.to_dict() for habit in habits])
+    """API: Listar hábitos (JSON); con ?limit=N y/o ?cursor=TOKEN se pagina"""
+    if not KeysetPagination.wants_page(request.args):
+        return jsonify(HabitService.serialize_habits(HabitService.get_all_habits()))
+    try:
+        limit = KeysetPagination.parse_limit(request.args.get('limit'))
+        habits, next_cursor = HabitService.get_habits_page(cursor=request.args.get('cursor'), limit=limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = jsonify(HabitService.serialize_habits(habits))
+    next_url = url_for('habits.api_list_habits', limit=limit, cursor=next_cursor) if next_cursor else None
+    return KeysetPagination.set_headers(response, next_cursor, next_url)
 
 
 @habits_bp.route('/api/habits/<int:habit_id>/stats', methods=['GET'])
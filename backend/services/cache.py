@@ -0,0 +1,136 @@
+"""
+Caché en memoria con expiración (TTL) para respuestas por usuario.
+Pensada para endpoints sondeados con frecuencia, como /api/dashboard/stats.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Caché clave -> valor con expiración, segura entre hilos.
+
+    Es local al proceso: con varios workers cada uno mantiene su copia y
+    un cambio hecho en otro worker se ve, como mucho, tras ``ttl`` segundos.
+
+    Cada clave tiene un contador de generación que ``invalidate`` incrementa.
+    Quien calcula un valor lee ``generation(key)`` antes de consultar la base
+    de datos y lo pasa a ``set``: si entretanto hubo una invalidación, el
+    valor ya es viejo y se descarta en lugar de quedar cacheado ``ttl``
+    segundos.
+    """
+
+    def __init__(self, ttl: float = 5.0, max_entries: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: Dict[Hashable, tuple] = {}
+        # Una entrada por clave invalidada alguna vez (acotado por el número de claves)
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Obtener un valor vigente.
+
+        Args:
+            key: Clave (p. ej. id de usuario)
+
+        Returns:
+            Optional[Any]: Valor guardado o None si no existe o expiró
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def generation(self, key: Hashable) -> int:
+        """Generación actual de una clave (cambia con cada invalidación)"""
+        with self._lock:
+            return self._epoch + self._generations.get(key, 0)
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> bool:
+        """
+        Guardar un valor durante ``ttl`` segundos.
+
+        Args:
+            key: Clave
+            value: Valor
+            generation: Generación leída antes de calcular el valor; si la
+                clave se invalidó después, el valor no se guarda
+
+        Returns:
+            bool: True si se guardó
+        """
+        now = self._clock()
+        with self._lock:
+            if generation is not None and generation != self._epoch + self._generations.get(key, 0):
+                return False
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                self._evict(now)
+            self._entries[key] = (now + self.ttl, value)
+            return True
+
+    def invalidate(self, key: Hashable) -> None:
+        """Descartar la entrada de una clave y los cálculos en curso de la generación anterior"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self) -> None:
+        """Vaciar la caché (invalida también los cálculos en curso de todas las claves)"""
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Contadores de uso.
+
+        Returns:
+            Dict[str, float]: hits, misses, size y hit_ratio
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'hit_ratio': self.hits / total if total else 0.0
+            }
+
+    def _evict(self, now: float) -> None:
+        """Liberar espacio: primero las expiradas y, si no basta, la más próxima a expirar"""
+        expired = [key for key, (expires, _) in self._entries.items() if expires <= now]
+        for key in expired:
+            del self._entries[key]
+        if len(self._entries) >= self.max_entries:
+            del self._entries[min(self._entries, key=lambda key: self._entries[key][0])]
+
+
+def make_etag(payload: Any) -> str:
+    """
+    ETag estable para un payload serializable a JSON.
+
+    Args:
+        payload: Datos de la respuesta
+
+    Returns:
+        str: Hash del contenido
+    """
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(body.encode('utf-8')).hexdigest()
@@ -0,0 +1,124 @@
+"""
+Servicio de apoyo para las gráficas del dashboard.
+Resuelve ventanas de fechas y rellena series diarias en memoria.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Mapping, Optional, Tuple
+
+
+class ChartService:
+    """Utilidades sin acceso a base de datos para construir series de gráficas"""
+
+    MAX_DAYS = 3660  # ~10 años
+
+    # Agrupaciones admitidas y formato de la etiqueta de cada cubeta
+    BUCKET_LABELS = {'day': '%d/%m', 'week': '%d/%m', 'month': '%m/%Y'}
+    BUCKET_ALIASES = {'daily': 'day', 'weekly': 'week', 'monthly': 'month'}
+
+    @staticmethod
+    def resolve_window(args: Mapping[str, str], default_days: int,
+                       today: Optional[date] = None) -> Tuple[date, date]:
+        """
+        Calcular la ventana [start, end] (ambos inclusive) pedida por query params.
+
+        Acepta ``start`` y ``end`` en formato ISO (YYYY-MM-DD) y/o ``days``.
+        Si solo se indica ``days``, la ventana termina en ``end`` (hoy por defecto).
+
+        Args:
+            args: Parámetros de la petición (p. ej. ``request.args``)
+            default_days: Días a devolver si no se indica nada
+            today: Fecha de referencia (hoy por defecto)
+
+        Returns:
+            Tuple[date, date]: Primer y último día de la ventana
+
+        Raises:
+            ValueError: Si los parámetros no son válidos
+        """
+        today = today or date.today()
+
+        try:
+            end = date.fromisoformat(args['end']) if args.get('end') else today
+            start = date.fromisoformat(args['start']) if args.get('start') else None
+            days = int(args['days']) if args.get('days') else None
+        except ValueError:
+            raise ValueError("Parámetros de fecha inválidos (usa YYYY-MM-DD y days entero)")
+
+        if start is None:
+            days = default_days if days is None else days
+            if days < 1:
+                raise ValueError("days debe ser mayor que 0")
+            start = end - timedelta(days=days - 1)
+
+        if start > end:
+            raise ValueError("start no puede ser posterior a end")
+
+        if (end - start).days + 1 > ChartService.MAX_DAYS:
+            raise ValueError(f"La ventana no puede superar {ChartService.MAX_DAYS} días")
+
+        return start, end
+
+    @staticmethod
+    def fill_days(counts: Mapping[str, int], start: date, end: date) -> Dict[str, int]:
+        """
+        Rellenar con ceros los días sin completaciones.
+
+        Args:
+            counts: Conteos por día con clave ISO (YYYY-MM-DD)
+            start: Primer día de la serie
+            end: Último día de la serie (inclusive)
+
+        Returns:
+            Dict[str, int]: Serie ordenada día a día
+        """
+        data = {}
+        d = start
+        while d <= end:
+            key = d.isoformat()
+            data[key] = int(counts.get(key, 0))
+            d += timedelta(days=1)
+        return data
+
+    @staticmethod
+    def resolve_bucket(value: Optional[str]) -> str:
+        """
+        Normalizar el parámetro de agrupación (day/week/month o daily/weekly/monthly).
+
+        Raises:
+            ValueError: Si la agrupación no existe
+        """
+        bucket = ChartService.BUCKET_ALIASES.get(value, value) if value else 'day'
+        if bucket not in ChartService.BUCKET_LABELS:
+            raise ValueError("bucket debe ser day, week o month")
+        return bucket
+
+    @staticmethod
+    def bucket_start(day: date, bucket: str) -> date:
+        """Primer día de la cubeta que contiene day (semanas ISO, empiezan en lunes)"""
+        if bucket == 'week':
+            return day - timedelta(days=day.weekday())
+        if bucket == 'month':
+            return day.replace(day=1)
+        return day
+
+    @staticmethod
+    def bucket_series(counts: Mapping[str, int], start: date, end: date,
+                      bucket: str = 'day') -> List[Tuple[date, int]]:
+        """
+        Agrupar conteos diarios en cubetas, incluyendo las vacías.
+
+        Args:
+            counts: Conteos por día con clave ISO (YYYY-MM-DD)
+            start: Primer día de la ventana
+            end: Último día de la ventana (inclusive)
+            bucket: 'day', 'week' o 'month'
+
+        Returns:
+            List[Tuple[date, int]]: (inicio de cubeta, total) en orden cronológico
+        """
+        series = {}
+        for key, count in ChartService.fill_days(counts, start, end).items():
+            first = ChartService.bucket_start(date.fromisoformat(key), bucket)
+            series[first] = series.get(first, 0) + count
+        return list(series.items())
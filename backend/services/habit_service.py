@@ -4,9 +4,12 @@ Contiene todas las operaciones y validaciones.
 """
 
 from datetime import datetime, date, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set, Tuple
 from backend.database.db import db
 from backend.models.habit import Habit, Completion
+from backend.services.pagination import KeysetPagination
+from backend.services.streaks import StreakService
+from backend.services.time_service import TimeService
 
 
 class HabitService:
@@ -62,7 +65,31 @@ class HabitService:
         if active_only:
             query = query.filter_by(is_active=True)
         
-        return query.order_by(Habit.created_at.desc()).all()
+        return query.order_by(Habit.created_at.desc(), Habit.id.desc()).all()
+    
+    @staticmethod
+    def get_habits_page(active_only: bool = True, cursor: Optional[str] = None,
+                        limit: int = KeysetPagination.DEFAULT_LIMIT) -> Tuple[List[Habit], Optional[str]]:
+        """
+        Obtener una página de hábitos paginada por cursor (created_at, id).
+        
+        Args:
+            active_only: Si True, solo retorna hábitos activos
+            cursor: Token devuelto por la página anterior
+            limit: Hábitos por página
+            
+        Returns:
+            Tuple[List[Habit], Optional[str]]: Hábitos y cursor de la página siguiente
+            
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        query = Habit.query
+        
+        if active_only:
+            query = query.filter_by(is_active=True)
+        
+        return KeysetPagination.paginate(query, Habit.created_at, Habit.id, cursor, limit)
     
     @staticmethod
     def get_habit_by_id(habit_id: int) -> Optional[Habit]:
@@ -96,10 +123,15 @@ class HabitService:
         
         # Actualizar campos permitidos
         allowed_fields = ['name', 'description', 'category', 'frequency', 'is_active']
+        frequency = habit.frequency
         for field in allowed_fields:
             if field in data:
                 setattr(habit, field, data[field])
         
+        # La racha se mide en periodos de la frecuencia
+        if habit.frequency != frequency:
+            HabitService._update_streak(habit, TimeService.today())
+        
         habit.updated_at = datetime.utcnow()
         db.session.commit()
         
@@ -145,21 +177,18 @@ class HabitService:
             return None
         
         # Verificar si ya fue completado hoy
-        today = datetime.utcnow().date()
-        already_completed = any(
-            c.completed_date.date() == today
-            for c in habit.completions
-        )
+        today = TimeService.today()
+        already_completed = habit.completed_today(today)
         
         if already_completed:
             # Si ya está completado, quitar la completación
             Completion.query.filter(
                 Completion.habit_id == habit_id,
-                db.func.date(Completion.completed_date) == today
+                Completion.completed_day == today
             ).delete()
             
             # Actualizar racha
-            HabitService._update_streak(habit, completed=False)
+            HabitService._update_streak(habit, today)
         else:
             # Crear nueva completación
             completion = Completion(
@@ -170,45 +199,26 @@ class HabitService:
             db.session.add(completion)
             
             # Actualizar racha
-            HabitService._update_streak(habit, completed=True)
+            HabitService._update_streak(habit, today)
         
         db.session.commit()
         
         return completion if not already_completed else None
     
     @staticmethod
-    def _update_streak(habit: Habit, completed: bool) -> None:
+    def _update_streak(habit: Habit, today: date) -> None:
         """
-        Actualizar la racha del hábito.
+        Recalcular la racha del hábito desde sus días completados.
         
         Args:
             habit: Objeto hábito
-            completed: Si se completó hoy
+            today: Día de referencia
         """
-        if not completed:
-            # Si no se completó, reiniciar racha
-            habit.current_streak = 0
-            return
-        
-        # Obtener fecha de ayer
-        yesterday = (datetime.utcnow() - timedelta(days=1)).date()
-        
-        # Verificar si se completó ayer
-        completed_yesterday = any(
-            c.completed_date.date() == yesterday
-            for c in habit.completions
-        )
-        
-        if completed_yesterday:
-            # Continuar racha
-            habit.current_streak += 1
-        else:
-            # Nueva racha
-            habit.current_streak = 1
-        
-        # Actualizar mejor racha si es necesario
-        if habit.current_streak > habit.best_streak:
-            habit.best_streak = habit.current_streak
+        days = db.session.query(Completion.completed_day) \
+            .filter(Completion.habit_id == habit.id) \
+            .distinct().order_by(Completion.completed_day)
+        habit.current_streak, habit.best_streak = StreakService.compute(
+            (day for day, in days), habit.frequency, today)
     
     @staticmethod
     def get_todays_habits() -> List[Dict[str, Any]]:
@@ -219,13 +229,42 @@ class HabitService:
             List[Dict]: Lista de hábitos con info adicional
         """
         habits = Habit.query.filter_by(is_active=True).all()
+        return HabitService.serialize_habits(habits)
+    
+    @staticmethod
+    def completed_today_ids(habit_ids: List[int], today: date = None) -> Set[int]:
+        """
+        Ids de los hábitos completados hoy, en una sola consulta.
         
-        result = []
-        for habit in habits:
-            habit_dict = habit.to_dict()
-            result.append(habit_dict)
+        Args:
+            habit_ids: Hábitos a consultar
+            today: Día de referencia (hoy por defecto)
+            
+        Returns:
+            Set[int]: Ids completados
+        """
+        if not habit_ids:
+            return set()
+        today = today or TimeService.today()
+        rows = db.session.query(Completion.habit_id).filter(
+            Completion.habit_id.in_(habit_ids),
+            Completion.completed_day == today
+        ).distinct()
+        return {habit_id for habit_id, in rows}
+    
+    @staticmethod
+    def serialize_habits(habits: List[Habit]) -> List[Dict[str, Any]]:
+        """
+        Convertir hábitos a diccionarios precargando su estado de hoy.
         
-        return result
+        Args:
+            habits: Lista de hábitos
+            
+        Returns:
+            List[Dict]: Hábitos serializados
+        """
+        done = HabitService.completed_today_ids([habit.id for habit in habits])
+        return [habit.to_dict(completed_today=habit.id in done) for habit in habits]
     
     @staticmethod
     def get_habits_by_category() -> Dict[str, List[Habit]]:
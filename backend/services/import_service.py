@@ -0,0 +1,215 @@
+"""
+Servicio de importación de hábitos y completaciones.
+Lee CSV o NDJSON en streaming y valida las filas; la escritura masiva
+la hace la aplicación con los modelos.
+
+Formato de fila (CSV con cabecera o un objeto JSON por línea):
+    type=habit:       name, category, frequency, description, is_active
+    type=completion:  habit (nombre), date (YYYY-MM-DD o fecha-hora ISO), notes
+Si falta ``type`` se deduce: filas con ``date`` son completaciones.
+"""
+
+import csv
+import json
+import time
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from backend.services.streaks import FREQUENCIES
+
+FORMATS = ('csv', 'ndjson')
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 50
+
+TRUE_VALUES = {'1', 'true', 'yes', 'si', 'sí', 'y'}
+
+
+class ImportReport:
+    """Contadores y rendimiento de una importación"""
+
+    def __init__(self):
+        self.rows = 0
+        self.habits_created = 0
+        self.completions_created = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors: List[Dict[str, Any]] = []
+        # True si se alcanzó el máximo de filas y el resto no se leyó
+        self.truncated = False
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, line: int, message: str) -> None:
+        """Registrar una fila rechazada (se guardan solo las primeras)"""
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def finish(self) -> 'ImportReport':
+        """Cerrar el cronómetro"""
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Resumen serializable, con filas por segundo"""
+        return {
+            'rows': self.rows,
+            'habits_created': self.habits_created,
+            'completions_created': self.completions_created,
+            'duplicates_skipped': self.duplicates,
+            'errors': self.error_count,
+            'error_samples': self.errors,
+            'truncated': self.truncated,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows / self.elapsed) if self.elapsed else self.rows
+        }
+
+
+class ImportService:
+    """Lectura y validación de ficheros de importación"""
+
+    @staticmethod
+    def detect_format(filename: Optional[str] = None, content_type: Optional[str] = None,
+                      explicit: Optional[str] = None) -> str:
+        """
+        Determinar el formato por parámetro, extensión o Content-Type.
+
+        Raises:
+            ValueError: Si no se reconoce el formato
+        """
+        if explicit:
+            if explicit not in FORMATS:
+                raise ValueError("format debe ser csv o ndjson")
+            return explicit
+        name = (filename or '').lower()
+        content_type = (content_type or '').lower()
+        if name.endswith('.csv') or 'csv' in content_type:
+            return 'csv'
+        if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type or 'jsonl' in content_type:
+            return 'ndjson'
+        raise ValueError("No se pudo determinar el formato (usa format=csv o format=ndjson)")
+
+    @staticmethod
+    def iter_records(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+        """
+        Recorrer las filas sin cargar el fichero completo.
+
+        Args:
+            stream: Texto de entrada
+            fmt: 'csv' o 'ndjson'
+
+        Returns:
+            Iterator[Tuple[int, Any]]: (número de línea, fila); las líneas
+            NDJSON no parseables se devuelven como ValueError
+        """
+        if fmt == 'csv':
+            reader = csv.DictReader(stream)
+            for record in reader:
+                yield reader.line_num, record
+            return
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError:
+                yield line_no, ValueError('JSON inválido')
+
+    @staticmethod
+    def chunks(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+        """Agrupar un iterable en listas de hasta size elementos"""
+        iterator = iter(iterable)
+        while True:
+            chunk = list(islice(iterator, size))
+            if not chunk:
+                return
+            yield chunk
+
+    @staticmethod
+    def validate(record: Any, max_day: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Validar y normalizar una fila.
+
+        Args:
+            record: Fila leída
+            max_day: Último día admitido para completaciones (p. ej. hoy)
+
+        Returns:
+            Dict: {'type': 'habit', ...} o {'type': 'completion', 'habit',
+            'day', 'moment', 'notes'}; moment es None si solo se dio la fecha
+
+        Raises:
+            ValueError: Si la fila no es válida
+        """
+        if isinstance(record, Exception):
+            raise record
+        if not isinstance(record, dict):
+            raise ValueError('La fila debe ser un objeto')
+        record = {key.strip().lower(): value for key, value in record.items() if isinstance(key, str)}
+
+        kind = (ImportService._text(record.get('type')) or
+                ('completion' if record.get('date') or record.get('completed_date') else 'habit')).lower()
+
+        if kind == 'habit':
+            name = ImportService._text(record.get('name'))
+            if not name:
+                raise ValueError('name es requerido')
+            if len(name) > 100:
+                raise ValueError('name no puede exceder 100 caracteres')
+            frequency = (ImportService._text(record.get('frequency')) or 'daily').lower()
+            if frequency not in FREQUENCIES:
+                raise ValueError(f'frequency inválida: {frequency}')
+            return {
+                'type': 'habit',
+                'name': name,
+                'category': (ImportService._text(record.get('category')) or 'general')[:50],
+                'frequency': frequency,
+                'description': (ImportService._text(record.get('description')) or '')[:200],
+                'is_active': ImportService._flag(record.get('is_active'), default=True)
+            }
+
+        if kind == 'completion':
+            habit = ImportService._text(record.get('habit') or record.get('habit_name'))
+            if not habit:
+                raise ValueError('habit es requerido')
+            raw = ImportService._text(record.get('date') or record.get('completed_date'))
+            if not raw:
+                raise ValueError('date es requerido')
+            try:
+                if len(raw) == 10:
+                    day, moment = date.fromisoformat(raw), None
+                else:
+                    moment = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+                    if moment.tzinfo is not None:
+                        # Se guarda en UTC sin zona, como completed_date
+                        moment = moment.replace(tzinfo=None) - moment.utcoffset()
+                    day = None
+            except ValueError:
+                raise ValueError(f'Fecha inválida: {raw}')
+            if max_day is not None and (day or moment.date()) > max_day:
+                raise ValueError(f'Fecha futura: {raw}')
+            return {
+                'type': 'completion',
+                'habit': habit[:100],
+                'day': day,
+                'moment': moment,
+                'notes': ImportService._text(record.get('notes'))[:200] or None
+            }
+
+        raise ValueError(f'type inválido: {kind}')
+
+    @staticmethod
+    def _flag(value: Any, default: bool) -> bool:
+        """Valor booleano de CSV/JSON ('true', '1', 'sí'...)"""
+        if value is None or value == '':
+            return default
+        if isinstance(value, bool):
+            return value
+        return str(value).strip().lower() in TRUE_VALUES
+
+    @staticmethod
+    def _text(value: Any) -> str:
+        """Valor como texto sin espacios (None -> '')"""
+        return '' if value is None else str(value).strip()
@@ -0,0 +1,271 @@
+"""
+Métricas en proceso con formato de exposición de Prometheus.
+Contadores e histogramas repartidos por hilo: cada hilo escribe en su propio
+fragmento sin bloqueos y /metrics suma los fragmentos al leer.
+"""
+
+import abc
+import bisect
+import math
+import threading
+import time
+import weakref
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.pool import QueuePool
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class _ShardOwner:
+    """Dueño del fragmento de un hilo: se libera cuando el hilo termina"""
+
+    __slots__ = ('shard', '__weakref__')
+
+    def __init__(self):
+        self.shard = {}
+
+
+class _Sharded(abc.ABC):
+    """
+    Base de las métricas con un fragmento por hilo.
+
+    Solo el alta y la baja de un fragmento (una vez por hilo) toman el lock;
+    las escrituras tocan únicamente el diccionario del hilo actual y la
+    lectura copia cada diccionario (dict.copy es atómico con el GIL). Al
+    terminar un hilo su fragmento se suma a la base y se descarta, así los
+    servidores que crean un hilo por petición no acumulan fragmentos.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._base: dict = {}
+        self._shards: Dict[int, dict] = {}
+        self._lock = threading.RLock()
+
+    def _shard(self) -> dict:
+        owner = getattr(self._local, 'owner', None)
+        if owner is None:
+            owner = self._local.owner = _ShardOwner()
+            with self._lock:
+                self._shards[id(owner)] = owner.shard
+            weakref.finalize(owner, self._retire, id(owner), owner.shard)
+        return owner.shard
+
+    def _retire(self, owner_id: int, shard: dict) -> None:
+        with self._lock:
+            self._shards.pop(owner_id, None)
+            for key, value in shard.items():
+                self._base[key] = self._merge(self._base.get(key), value)
+
+    @abc.abstractmethod
+    def _merge(self, total, value):
+        """Combinar el valor acumulado de una clave (None si no hay) con el de un fragmento"""
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} espera las etiquetas {self.labelnames}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _snapshots(self) -> List[dict]:
+        with self._lock:
+            return [self._base.copy()] + [shard.copy() for shard in self._shards.values()]
+
+    def shard_count(self) -> int:
+        """Fragmentos vivos (uno por hilo que ha escrito y sigue activo)"""
+        with self._lock:
+            return len(self._shards)
+
+    def _labels(self, values: LabelValues, extra: Iterable[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def header(self) -> List[str]:
+        """Líneas HELP y TYPE"""
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Sharded):
+    """Contador monótono con etiquetas"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Incrementar el contador de las etiquetas dadas"""
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _merge(self, total, value):
+        return value if total is None else total + value
+
+    def values(self) -> Dict[LabelValues, float]:
+        """Totales por combinación de etiquetas (suma de los fragmentos)"""
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshots():
+            for key, value in shard.items():
+                totals[key] = self._merge(totals.get(key), value)
+        return totals
+
+    def render(self) -> List[str]:
+        """Líneas de exposición del contador"""
+        return self.header() + [f'{self.name}{self._labels(key)} {_number(value)}'
+                                for key, value in sorted(self.values().items())]
+
+
+class Histogram(_Sharded):
+    """Histograma acumulativo con etiquetas (buckets en segundos)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Registrar una observación"""
+        shard = self._shard()
+        key = self._key(labels)
+        state = shard.get(key)
+        if state is None:
+            # [conteo por bucket (+Inf al final), suma, total]
+            state = shard[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def _merge(self, total, value):
+        counts, value_sum, count = value
+        if total is None:
+            return [list(counts), value_sum, count]
+        return [[a + b for a, b in zip(total[0], counts)], total[1] + value_sum, total[2] + count]
+
+    def values(self) -> Dict[LabelValues, Tuple[List[int], float, int]]:
+        """(conteos por bucket, suma, total) por combinación de etiquetas"""
+        totals: Dict[LabelValues, list] = {}
+        for shard in self._snapshots():
+            for key, state in shard.items():
+                totals[key] = self._merge(totals.get(key), state)
+        return {key: tuple(value) for key, value in totals.items()}
+
+    def render(self) -> List[str]:
+        """Líneas de exposición del histograma (buckets acumulados, suma y total)"""
+        lines = self.header()
+        for key, (counts, total, count) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == math.inf else _number(bound)
+                lines.append(f'{self.name}_bucket{self._labels(key, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{self._labels(key)} {_number(total)}')
+            lines.append(f'{self.name}_count{self._labels(key)} {count}')
+        return lines
+
+
+class CallbackMetric:
+    """
+    Valor leído al generar /metrics (p. ej. estado del pool o de una caché).
+
+    kind='counter' para totales que ya lleva otro objeto, como los aciertos
+    de TTLCache; si el callback devuelve None la métrica se omite.
+    """
+
+    def __init__(self, name: str, documentation: str,
+                 callback: Callable[[], Optional[float]], kind: str = 'gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        """Líneas de exposición de la métrica"""
+        value = self.callback()
+        if value is None:
+            return []
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}',
+                f'{self.name} {_number(value)}']
+
+
+class MetricsRegistry:
+    """Conjunto de métricas expuestas en /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        """Añadir una métrica (nombres únicos); devuelve la misma métrica"""
+        if metric.name in self._metrics:
+            raise ValueError(f'Métrica duplicada: {metric.name}')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Crear y registrar un contador"""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Crear y registrar un histograma"""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, callback: Callable[[], Optional[float]],
+                 kind: str = 'gauge') -> CallbackMetric:
+        """Registrar una métrica calculada al leer"""
+        return self.register(CallbackMetric(name, documentation, callback, kind))
+
+    def render(self) -> str:
+        """Texto en formato de exposición de Prometheus 0.0.4"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool que mide cuánto tarda cada checkout (espera + conexión nueva).
+
+    Los observadores son del pool; recreate() (p. ej. tras dispose) los
+    copia al pool nuevo.
+    """
+
+    def __init__(self, *args, wait_observers: Iterable[Callable[[float], None]] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_observers: List[Callable[[float], None]] = list(wait_observers)
+
+    def recreate(self) -> 'TimedQueuePool':
+        pool = super().recreate()
+        pool.wait_observers = list(self.wait_observers)
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - started
+            for observe in self.wait_observers:
+                observe(elapsed)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
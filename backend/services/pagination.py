@@ -0,0 +1,162 @@
+"""
+Paginación por cursor (keyset) sobre (created_at, id).
+El cursor es un token opaco con los valores de la última fila devuelta;
+la página siguiente empieza justo después, sin OFFSET.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+
+
+class KeysetPagination:
+    """Utilidades para paginar consultas ordenadas por (columna, id) descendente"""
+
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 500
+
+    @staticmethod
+    def encode_cursor(position: datetime, row_id: int) -> str:
+        """
+        Crear el token de cursor de una fila.
+
+        Args:
+            position: Valor de la columna de orden (p. ej. created_at)
+            row_id: Id de la fila (desempate)
+
+        Returns:
+            str: Token base64 url-safe
+        """
+        raw = json.dumps([position.isoformat(), row_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(token: Optional[str]) -> Optional[Tuple[datetime, int]]:
+        """
+        Leer un token de cursor.
+
+        Args:
+            token: Token recibido (None o vacío = primera página)
+
+        Returns:
+            Optional[Tuple[datetime, int]]: (posición, id) o None
+
+        Raises:
+            ValueError: Si el token no es válido
+        """
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            position, row_id = json.loads(raw)
+            if not isinstance(row_id, int):
+                raise TypeError
+            return datetime.fromisoformat(position), row_id
+        except (TypeError, ValueError):
+            raise ValueError("Cursor inválido")
+
+    @staticmethod
+    def wants_page(args) -> bool:
+        """
+        Saber si la petición pide paginar (trae limit o cursor).
+
+        Sin ninguno de los dos las APIs devuelven la lista completa, como
+        antes de paginar; así los clientes existentes no pierden filas.
+        """
+        return bool(args.get('limit') or args.get('cursor'))
+
+    @staticmethod
+    def parse_limit(value: Optional[str], default: int = DEFAULT_LIMIT) -> int:
+        """
+        Leer el parámetro limit, acotado a MAX_LIMIT.
+
+        Raises:
+            ValueError: Si no es un entero positivo
+        """
+        if not value:
+            return default
+        try:
+            limit = int(value)
+        except ValueError:
+            raise ValueError("limit debe ser un entero")
+        if limit < 1:
+            raise ValueError("limit debe ser mayor que 0")
+        return min(limit, KeysetPagination.MAX_LIMIT)
+
+    @staticmethod
+    def parse_fields(value: Optional[str], allowed: Iterable[str],
+                     default: Sequence[str]) -> List[str]:
+        """
+        Leer la proyección fields=a,b,c.
+
+        Args:
+            value: Parámetro recibido (None = campos por defecto)
+            allowed: Campos permitidos
+            default: Campos si no se indica nada
+
+        Returns:
+            List[str]: Campos pedidos, sin repetir y en el orden recibido
+
+        Raises:
+            ValueError: Si algún campo no existe
+        """
+        if not value:
+            return list(default)
+        fields = list(dict.fromkeys(f.strip() for f in value.split(',') if f.strip()))
+        unknown = [f for f in fields if f not in allowed]
+        if unknown or not fields:
+            raise ValueError(f"Campos no válidos: {', '.join(unknown) or value}")
+        return fields
+
+    @staticmethod
+    def paginate(query, position_column, id_column, cursor: Optional[str] = None,
+                 limit: int = DEFAULT_LIMIT) -> Tuple[List[Any], Optional[str]]:
+        """
+        Aplicar keyset descendente a una consulta ORM.
+
+        Lee limit + 1 filas para saber si hay página siguiente sin contar.
+
+        Args:
+            query: Consulta ya filtrada (sin orden ni límite)
+            position_column: Columna de orden (p. ej. Habit.created_at)
+            id_column: Columna id para desempatar
+            cursor: Token de la página anterior
+            limit: Filas por página
+
+        Returns:
+            Tuple[List[Any], Optional[str]]: Filas de la página y cursor siguiente (o None)
+
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        after = KeysetPagination.decode_cursor(cursor)
+        if after is not None:
+            position, row_id = after
+            query = query.filter(or_(
+                position_column < position,
+                and_(position_column == position, id_column < row_id)
+            ))
+        rows = query.order_by(position_column.desc(), id_column.desc()).limit(limit + 1).all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, KeysetPagination.encode_cursor(
+            getattr(last, position_column.key), getattr(last, id_column.key))
+
+    @staticmethod
+    def set_headers(response, next_cursor: Optional[str], next_url: Optional[str] = None):
+        """
+        Añadir X-Next-Cursor y Link rel="next" a una respuesta.
+
+        Returns:
+            La misma respuesta
+        """
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+            if next_url:
+                response.headers['Link'] = f'<{next_url}>; rel="next"'
+        return response
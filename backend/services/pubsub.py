@@ -0,0 +1,102 @@
+"""
+Publicación/suscripción en memoria por clave (id de usuario).
+Avisa a los streams SSE abiertos de que los datos de un usuario cambiaron.
+"""
+
+import threading
+from collections import defaultdict
+from typing import Dict, Hashable, Optional, Set
+
+
+class Subscription:
+    """
+    Suscripción de un stream a una clave.
+
+    Los avisos se agrupan: varios publish() antes de wait() cuentan como uno,
+    porque el suscriptor siempre vuelve a leer el estado completo.
+    """
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self._event = threading.Event()
+
+    def notify(self) -> None:
+        """Marcar que hay cambios pendientes"""
+        self._event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Esperar un aviso.
+
+        Args:
+            timeout: Segundos máximos de espera
+
+        Returns:
+            bool: True si llegó un aviso, False si venció el timeout
+        """
+        notified = self._event.wait(timeout)
+        self._event.clear()
+        return notified
+
+
+class PubSub:
+    """
+    Broker de avisos local al proceso.
+
+    Con varios workers cada proceso solo ve sus propias publicaciones;
+    para ese despliegue habría que sustituirlo por un broker externo.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[Hashable, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, key: Hashable, limit: Optional[int] = None) -> Optional[Subscription]:
+        """
+        Registrar una suscripción a una clave.
+
+        Args:
+            key: Clave (p. ej. id de usuario)
+            limit: Máximo de suscripciones simultáneas de la clave
+
+        Returns:
+            Optional[Subscription]: La suscripción, o None si la clave ya está en el límite
+        """
+        subscription = Subscription(key)
+        with self._lock:
+            subscribers = self._subscriptions[key]
+            if limit is not None and len(subscribers) >= limit:
+                if not subscribers:
+                    del self._subscriptions[key]
+                return None
+            subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Dar de baja una suscripción"""
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.key]
+
+    def publish(self, key: Hashable) -> int:
+        """
+        Avisar a todas las suscripciones de una clave.
+
+        Returns:
+            int: Número de suscriptores avisados
+        """
+        with self._lock:
+            subscribers = list(self._subscriptions.get(key, ()))
+        for subscription in subscribers:
+            subscription.notify()
+        return len(subscribers)
+
+    def subscriber_count(self, key: Optional[Hashable] = None) -> int:
+        """Suscripciones activas de una clave (o de todas)"""
+        with self._lock:
+            if key is not None:
+                return len(self._subscriptions.get(key, ()))
+            return sum(len(subscribers) for subscribers in self._subscriptions.values())
@@ -0,0 +1,180 @@
+"""
+Instrumentación SQL por petición.
+Escucha los eventos del engine de SQLAlchemy y registra, para cada petición
+Flask, el número de sentencias, el tiempo total en base de datos, las más
+lentas y las huellas repetidas (la firma de un N+1). El resumen se expone en
+la cabecera Server-Timing y, si se activa, en un buffer circular consultable.
+"""
+
+import heapq
+import re
+import threading
+import time
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_RING_SIZE = 200
+SLOWEST_KEPT = 5
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAM_LIST = re.compile(r'\(\s*(?:\?|%\([^)]*\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\([^)]*\)s|%s|:\w+))*\s*\)')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """
+    Huella de una sentencia: iguales salvo por valores o tamaño de IN.
+
+    Args:
+        statement: SQL tal como llega al driver
+
+    Returns:
+        str: SQL normalizado (literales -> ?, listas de parámetros -> (?...))
+    """
+    sql = _WHITESPACE.sub(' ', statement).strip()
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _PARAM_LIST.sub('(?...)', sql)
+
+
+class RequestProfile:
+    """Sentencias SQL de una petición"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.endpoint: Optional[str] = None
+        self.status: Optional[int] = None
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = 0.0
+        self.statements = 0
+        self.db_ms = 0.0
+        self._slowest: List[tuple] = []
+        self._fingerprints: Counter = Counter()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        """Añadir una sentencia ejecutada"""
+        self.statements += 1
+        self.db_ms += elapsed_ms
+        self._fingerprints[fingerprint(statement)] += 1
+        item = (elapsed_ms, self.statements, statement)
+        if len(self._slowest) < SLOWEST_KEPT:
+            heapq.heappush(self._slowest, item)
+        elif elapsed_ms > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def finish(self, endpoint: Optional[str], status: int) -> 'RequestProfile':
+        """Cerrar el cronómetro de la petición"""
+        self.endpoint = endpoint
+        self.status = status
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        return self
+
+    @property
+    def slowest(self) -> List[Dict[str, Any]]:
+        """Sentencias más lentas, de mayor a menor"""
+        return [{'ms': round(ms, 3), 'sql': sql} for ms, _, sql in sorted(self._slowest, reverse=True)]
+
+    @property
+    def duplicates(self) -> List[Dict[str, Any]]:
+        """Huellas ejecutadas más de una vez, de más a menos repetidas"""
+        return [{'count': count, 'fingerprint': sql}
+                for sql, count in self._fingerprints.most_common() if count > 1]
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera Server-Timing (db y total de la aplicación)"""
+        repeated = sum(count - 1 for count in self._fingerprints.values())
+        return (f'db;dur={self.db_ms:.2f};desc="{self.statements} queries, {repeated} repeated", '
+                f'app;dur={self.duration_ms:.2f}')
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Resumen serializable para /debug/requests"""
+        return {
+            'method': self.method,
+            'path': self.path,
+            'endpoint': self.endpoint,
+            'status': self.status,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration_ms, 3),
+            'statements': self.statements,
+            'db_ms': round(self.db_ms, 3),
+            'slowest': self.slowest,
+            'duplicates': self.duplicates
+        }
+
+
+class SQLProfiler:
+    """
+    Perfilado SQL por petición para una aplicación Flask.
+
+    Los eventos se registran en la clase Engine, así cubren cualquier engine
+    que use la aplicación; fuera de una petición no se registra nada.
+    """
+
+    def __init__(self, app=None, ring_size: int = DEFAULT_RING_SIZE, keep_requests: bool = False):
+        self.keep_requests = keep_requests
+        self.requests: deque = deque(maxlen=ring_size)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Registrar los hooks de Flask y los eventos de SQLAlchemy"""
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Últimas peticiones guardadas, la más reciente primero"""
+        with self._lock:
+            profiles = list(self.requests)
+        profiles.reverse()
+        return [p.as_dict() for p in profiles[:limit]]
+
+    def _start_request(self) -> None:
+        g.sql_profile = RequestProfile(request.method, redacted_path())
+
+    def _finish_request(self, response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+        profile.finish(request.endpoint, response.status_code)
+        response.headers['Server-Timing'] = profile.server_timing()
+        if self.keep_requests and request.endpoint != 'debug_requests':
+            with self._lock:
+                self.requests.append(profile)
+        return response
+
+
+def redacted_path() -> str:
+    """Ruta de la petición con los valores del query string ocultos (?q=***)"""
+    if not request.args:
+        return request.path
+    return request.path + '?' + '&'.join(f'{key}=***' for key in request.args.keys())
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """Perfil de la petición actual (None fuera de una petición)"""
+    return g.get('sql_profile') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_profile() is not None:
+        context.sql_profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'sql_profile_started', None)
+    profile = current_profile()
+    if started is not None and profile is not None:
+        profile.record(statement, (time.perf_counter() - started) * 1000)
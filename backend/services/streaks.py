@@ -0,0 +1,159 @@
+"""
+Motor de rachas.
+Calcula la racha actual y la mejor racha a partir de los días completados,
+respetando la frecuencia del hábito (diaria, semanal o mensual).
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, Mapping, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: solo acelera el recálculo masivo
+    np = None
+
+DEFAULT_FREQUENCY = 'daily'
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+
+
+class StreakService:
+    """Cálculo de rachas sobre secuencias ordenadas de días"""
+
+    @staticmethod
+    def period(day: date, frequency: str = DEFAULT_FREQUENCY) -> int:
+        """
+        Número de periodo del día: consecutivos si los periodos lo son.
+
+        Args:
+            day: Día completado
+            frequency: 'daily', 'weekly' (semanas ISO, desde el lunes) o 'monthly'
+
+        Returns:
+            int: Índice del día, semana o mes
+        """
+        if frequency == 'weekly':
+            return (day.toordinal() - 1) // 7  # el ordinal 1 (0001-01-01) es lunes
+        if frequency == 'monthly':
+            return day.year * 12 + day.month - 1
+        return day.toordinal()
+
+    @staticmethod
+    def previous_period_start(today: date, frequency: str = DEFAULT_FREQUENCY) -> date:
+        """
+        Primer día del periodo anterior al de today.
+
+        Un hábito sin completaciones desde ese día tiene la racha actual rota.
+
+        Args:
+            today: Día de referencia
+            frequency: Frecuencia del hábito
+
+        Returns:
+            date: Ayer, el lunes de la semana pasada o el día 1 del mes pasado
+        """
+        if frequency == 'weekly':
+            return today - timedelta(days=today.weekday() + 7)
+        if frequency == 'monthly':
+            return (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+        return today - timedelta(days=1)
+
+    @staticmethod
+    def compute(days: Iterable[date], frequency: str = DEFAULT_FREQUENCY,
+                today: date = None) -> Tuple[int, int]:
+        """
+        Calcular (racha actual, mejor racha) en una pasada.
+
+        La racha actual sigue viva si el último periodo completado es el
+        actual o el anterior (hoy aún se puede completar).
+
+        Args:
+            days: Días completados en orden ascendente (se admiten repetidos)
+            frequency: Frecuencia del hábito
+            today: Día de referencia (hoy por defecto)
+
+        Returns:
+            Tuple[int, int]: Racha actual y mejor racha, en periodos
+        """
+        today = today or date.today()
+        return StreakService._runs((StreakService.period(day, frequency) for day in days),
+                                   StreakService.period(today, frequency))
+
+    @staticmethod
+    def compute_many(rows: Iterable[Tuple[int, date]], frequencies: Mapping[int, str],
+                     today: Union[date, Mapping[int, date]]) -> Dict[int, Tuple[int, int]]:
+        """
+        Calcular rachas de muchos hábitos a la vez.
+
+        Usa NumPy si está instalado; si no, una pasada en Python por hábito.
+
+        Args:
+            rows: (habit_id, día) ordenados por hábito y día
+            frequencies: habit_id -> frecuencia; los hábitos sin filas dan (0, 0)
+            today: Día de referencia, común o por hábito
+
+        Returns:
+            Dict[int, Tuple[int, int]]: habit_id -> (racha actual, mejor racha)
+        """
+        today_for = today.get if isinstance(today, Mapping) else (lambda habit_id: today)
+        result = {habit_id: (0, 0) for habit_id in frequencies}
+
+        habit_ids, periods = [], []
+        for habit_id, day in rows:
+            habit_ids.append(habit_id)
+            periods.append(StreakService.period(day, frequencies.get(habit_id, DEFAULT_FREQUENCY)))
+        if not periods:
+            return result
+
+        if np is None:
+            start = 0
+            for end in range(1, len(habit_ids) + 1):
+                if end == len(habit_ids) or habit_ids[end] != habit_ids[start]:
+                    habit_id = habit_ids[start]
+                    result[habit_id] = StreakService._runs(
+                        periods[start:end],
+                        StreakService.period(today_for(habit_id), frequencies.get(habit_id, DEFAULT_FREQUENCY)))
+                    start = end
+            return result
+
+        ids = np.asarray(habit_ids, dtype=np.int64)
+        values = np.asarray(periods, dtype=np.int64)
+
+        # Quitar periodos repetidos del mismo hábito (p. ej. dos días de la misma semana)
+        keep = np.ones(len(values), dtype=bool)
+        keep[1:] = (ids[1:] != ids[:-1]) | (values[1:] != values[:-1])
+        ids, values = ids[keep], values[keep]
+
+        # Una racha empieza al cambiar de hábito o al saltarse un periodo
+        new_habit = np.ones(len(values), dtype=bool)
+        new_habit[1:] = ids[1:] != ids[:-1]
+        new_run = new_habit.copy()
+        new_run[1:] |= values[1:] - values[:-1] != 1
+
+        run_starts = np.flatnonzero(new_run)
+        run_index = np.cumsum(new_run) - 1
+        length = np.arange(len(values)) - run_starts[run_index] + 1
+
+        habit_starts = np.flatnonzero(new_habit)
+        habit_ends = np.append(habit_starts[1:], len(values)) - 1
+        best = np.maximum.reduceat(length, habit_starts)
+
+        for start, end, habit_best in zip(habit_starts, habit_ends, best):
+            habit_id = int(ids[start])
+            today_period = StreakService.period(today_for(habit_id),
+                                                frequencies.get(habit_id, DEFAULT_FREQUENCY))
+            current = int(length[end]) if today_period - values[end] <= 1 else 0
+            result[habit_id] = (current, int(habit_best))
+        return result
+
+    @staticmethod
+    def _runs(periods: Iterable[int], today_period: int) -> Tuple[int, int]:
+        """(racha actual, mejor racha) de periodos ascendentes, en una pasada"""
+        best = run = 0
+        previous = None
+        for current in periods:
+            if current == previous:
+                continue
+            run = run + 1 if previous is not None and current - previous == 1 else 1
+            best = max(best, run)
+            previous = current
+        return (run if previous is not None and today_period - previous <= 1 else 0), best
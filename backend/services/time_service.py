@@ -0,0 +1,80 @@
+"""
+Servicio de fechas y zonas horarias.
+Convierte días de calendario del usuario en rangos UTC indexables.
+"""
+
+from datetime import datetime, date, time, timedelta, timezone
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+DEFAULT_TIMEZONE = 'UTC'
+
+
+class TimeService:
+    """Utilidades para trabajar con días en la zona horaria del usuario"""
+
+    @staticmethod
+    def get_zone(tz_name: Optional[str] = None) -> ZoneInfo:
+        """
+        Obtener la zona horaria, usando UTC si no existe o no se indica.
+
+        Args:
+            tz_name: Nombre IANA de la zona (p. ej. 'Europe/Madrid')
+
+        Returns:
+            ZoneInfo: Zona horaria
+        """
+        try:
+            return ZoneInfo(tz_name or DEFAULT_TIMEZONE)
+        except (ZoneInfoNotFoundError, ValueError):
+            return ZoneInfo(DEFAULT_TIMEZONE)
+
+    @staticmethod
+    def today(tz_name: Optional[str] = None) -> date:
+        """Día de calendario actual en la zona horaria indicada"""
+        return datetime.now(TimeService.get_zone(tz_name)).date()
+
+    @staticmethod
+    def local_day(moment: datetime, tz_name: Optional[str] = None) -> date:
+        """
+        Día de calendario local de un instante guardado como UTC naive.
+
+        Args:
+            moment: Fecha/hora UTC sin tzinfo (como se guarda en la BD)
+            tz_name: Zona horaria del usuario
+
+        Returns:
+            date: Día local
+        """
+        aware = moment.replace(tzinfo=timezone.utc)
+        return aware.astimezone(TimeService.get_zone(tz_name)).date()
+
+    @staticmethod
+    def day_midpoint(day: date, tz_name: Optional[str] = None) -> datetime:
+        """
+        Instante central del día local, en UTC naive.
+
+        Sirve de completed_date para completaciones de días pasados de las
+        que solo se conoce la fecha.
+        """
+        start, end = TimeService.day_window(day, tz_name)
+        return start + (end - start) / 2
+
+    @staticmethod
+    def day_window(day: date, tz_name: Optional[str] = None) -> Tuple[datetime, datetime]:
+        """
+        Convertir un día local en el rango semiabierto [start, end) en UTC naive.
+
+        Args:
+            day: Día de calendario del usuario
+            tz_name: Zona horaria del usuario
+
+        Returns:
+            Tuple[datetime, datetime]: Inicio y fin (exclusivo) en UTC
+        """
+        zone = TimeService.get_zone(tz_name)
+        start = datetime.combine(day, time.min, tzinfo=zone)
+        end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=zone)
+        return (start.astimezone(timezone.utc).replace(tzinfo=None),
+                end.astimezone(timezone.utc).replace(tzinfo=None))
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Benchmark de endpoints sobre el dataset sintético.
+Mide con el cliente de pruebas de Flask la latencia (p50/p95), el número
+de sentencias SQL y las filas leídas de cada endpoint, y las compara con
+los presupuestos de bench_budgets.json: un N+1 hace fallar la ejecución.
+
+Uso:
+  python scripts/benchmark.py                     # dataset de 300 usuarios en un SQLite temporal
+  python scripts/benchmark.py --users 2000 --iterations 50 --output bench_output.txt
+  python scripts/benchmark.py --database sqlite:////tmp/bench.db --reuse
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date
+
+# Agregar raíz del proyecto y scripts al path
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_budgets.json')
+
+# Fecha fija: con la misma semilla el dataset es idéntico entre ejecuciones
+DEFAULT_END_DATE = '2026-01-01'
+
+
+@contextmanager
+def frozen_today(day):
+    """
+    Fijar el "hoy" de la aplicación (TimeService.today) en el último día del
+    dataset: rachas, estadísticas de hoy y toggle_complete no dependen así
+    de la fecha real en que se ejecuta el benchmark.
+    """
+    from backend.services.time_service import TimeService
+
+    original = TimeService.__dict__['today']
+    TimeService.today = staticmethod(lambda tz_name=None: day)
+    try:
+        yield
+    finally:
+        TimeService.today = original
+
+
+def percentile(values, pct):
+    """Percentil (interpolación lineal) de una lista no vacía"""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class QueryCounter:
+    """
+    Cuenta sentencias SQL y filas leídas mientras está activo.
+
+    Las sentencias se cuentan en el engine (incluye SQL directo); las filas,
+    en los SELECT ejecutados a través de la sesión.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = 0
+        self.rows = 0
+
+    def reset(self):
+        self.statements = 0
+        self.rows = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+
+    def _on_orm_execute(self, state):
+        if not state.is_select:
+            return None
+        frozen = state.invoke_statement().freeze()
+        self.rows += len(frozen.data)
+        return frozen()
+
+    def __enter__(self):
+        from sqlalchemy import event
+        from sqlalchemy.orm import Session
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        event.listen(Session, 'do_orm_execute', self._on_orm_execute)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        from sqlalchemy.orm import Session
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+        event.remove(Session, 'do_orm_execute', self._on_orm_execute)
+
+
+def pick_subject(db, User, Habit, Friendship):
+    """
+    Usuario del benchmark: el de más amistades aceptadas (peor caso social),
+    con uno de sus hábitos diarios para toggle_complete.
+    """
+    degree = db.func.count(Friendship.id)
+    user_id = db.session.query(User.id).join(
+        Friendship, db.or_(Friendship.user_id == User.id, Friendship.friend_id == User.id)
+    ).filter(Friendship.status == 'accepted').group_by(User.id) \
+        .order_by(degree.desc(), User.id).limit(1).scalar()
+    if user_id is None:
+        user_id = db.session.query(db.func.min(User.id)).scalar()
+    habit_id = db.session.query(db.func.min(Habit.id)).filter(
+        Habit.user_id == user_id, Habit.frequency == 'daily').scalar()
+    return db.session.get(User, user_id), habit_id
+
+
+def endpoints(habit_id, prefix, end_date):
+    """(nombre, método, url, cabeceras) de cada endpoint medido; las ventanas terminan en end_date"""
+    ajax = {'X-Requested-With': 'XMLHttpRequest'}
+    return [
+        ('dashboard', 'GET', '/dashboard', {}),
+        ('api_dashboard_stats', 'GET', '/api/dashboard/stats', {}),
+        ('api_chart_heatmap', 'GET', f'/api/chart/heatmap?end={end_date}', {}),
+        ('api_chart_completions', 'GET', f'/api/chart/completions?bucket=week&days=365&end={end_date}', {}),
+        ('leaderboard', 'GET', '/leaderboard', {}),
+        ('profile', 'GET', '/profile', {}),
+        ('friends_search', 'GET', f'/friends/search?q={prefix}00', {}),
+        ('toggle_complete', 'POST', f'/habits/toggle/{habit_id}', ajax),
+    ]
+
+
+def run_endpoint(client, counter, method, url, headers, iterations, warmup):
+    """
+    Ejecutar un endpoint warmup + iterations veces.
+
+    Returns:
+        dict: p50/p95 en ms y máximo de sentencias y filas por petición
+    """
+    latencies, statements, rows = [], [], []
+    for i in range(warmup + iterations):
+        counter.reset()
+        started = time.perf_counter()
+        response = client.open(url, method=method, headers=headers)
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise RuntimeError(f'{method} {url} devolvió {response.status_code}')
+        if i >= warmup:
+            latencies.append(elapsed)
+            statements.append(counter.statements)
+            rows.append(counter.rows)
+    return {
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'queries': max(statements),
+        'rows': max(rows)
+    }
+
+
+def check_budget(result, budget):
+    """
+    Comparar un resultado con su presupuesto.
+
+    Returns:
+        list: Mensajes de los límites superados (vacía si cumple)
+    """
+    problems = []
+    for metric, limit_key in (('queries', 'max_queries'), ('rows', 'max_rows'), ('p95_ms', 'max_p95_ms')):
+        limit = budget.get(limit_key)
+        if limit is not None and result[metric] > limit:
+            problems.append(f'{metric}={result[metric]} > {limit_key}={limit}')
+    return problems
+
+
+def load_budgets(path=BUDGETS_PATH):
+    """Presupuestos por endpoint ({nombre: {max_queries, max_rows, max_p95_ms}})"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def run_benchmarks(app, db, iterations=20, warmup=2, prefix='synth', end_date=DEFAULT_END_DATE):
+    """
+    Medir todos los endpoints con el usuario de más amistades.
+
+    "Hoy" se fija en end_date (último día del dataset) durante la medición.
+    Se calienta al menos dos veces: toggle_complete pasa así por marcar y
+    desmarcar, y los logros que otorga la primera completación (una sola
+    vez) quedan fuera de las iteraciones medidas.
+
+    Returns:
+        dict: {nombre: resultado}
+    """
+    from backend.app import User, Habit, Friendship
+
+    with app.app_context():
+        subject, habit_id = pick_subject(db, User, Habit, Friendship)
+        subject_id = subject.id
+        targets = endpoints(habit_id, prefix, end_date)
+        engine = db.engine
+
+    # Sin app_context alrededor: cada petición usa su propia sesión, como en producción
+    warmup = max(warmup, 2)
+    results = {}
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(subject_id)
+        session['_fresh'] = True
+    with QueryCounter(engine) as counter, frozen_today(date.fromisoformat(end_date)):
+        for name, method, url, headers in targets:
+            results[name] = run_endpoint(client, counter, method, url, headers, iterations, warmup)
+    return results
+
+
+def format_report(results, budgets):
+    """Tabla de resultados con el estado de cada presupuesto"""
+    lines = [f"{'endpoint':<24}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'rows':>8}  budget"]
+    for name, result in results.items():
+        budget = budgets.get(name)
+        problems = check_budget(result, budget) if budget else []
+        status = 'sin presupuesto' if budget is None else ('FAIL ' + '; '.join(problems) if problems else 'ok')
+        lines.append(f"{name:<24}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+                     f"{result['queries']:>9}{result['rows']:>8}  {status}")
+    return '\n'.join(lines)
+
+
+def parse_args(argv=None):
+    """Opciones de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Benchmark de endpoints de HabitIQ')
+    parser.add_argument('--database', help='URL de la base de datos (por defecto un SQLite temporal)')
+    parser.add_argument('--reuse', action='store_true', help='Usar los datos existentes sin regenerar')
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--habits', type=int, default=5)
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', default=DEFAULT_END_DATE)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2, help='Peticiones sin medir por endpoint (mínimo 2)')
+    parser.add_argument('--budgets', default=BUDGETS_PATH, help='Fichero JSON de presupuestos')
+    parser.add_argument('--output', help='Guardar también el informe en este fichero')
+    parser.add_argument('--json', action='store_true', help='Imprimir los resultados en JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Punto de entrada: devuelve 1 si algún endpoint supera su presupuesto"""
+    args = parse_args(argv)
+    database = args.database or 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='habitiq-bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = database  # antes de importar la app
+
+    from backend.app import app, db
+    import generate_data
+
+    if not args.reuse:
+        generate_data.generate(generate_data.parse_args([
+            '--users', str(args.users), '--habits', str(args.habits), '--years', str(args.years),
+            '--seed', str(args.seed), '--end-date', args.end_date, '--reset'
+        ]))
+
+    app.config['TESTING'] = True
+    results = run_benchmarks(app, db, args.iterations, args.warmup, end_date=args.end_date)
+    budgets = load_budgets(args.budgets)
+    report = format_report(results, budgets)
+
+    print(json.dumps(results, indent=2) if args.json else report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(f"# {date.today().isoformat()} usuarios={args.users} semilla={args.seed}\n{report}\n")
+
+    failed = [name for name, result in results.items()
+              if name in budgets and check_budget(result, budgets[name])]
+    if failed:
+        print(f"❌ Presupuestos superados: {', '.join(failed)}")
+        return 1
+    print("✅ Todos los endpoints dentro de presupuesto")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos para pruebas de carga.
+Crea usuarios, grafo de amistades, hábitos y años de completaciones con
+inserciones masivas. Con la misma semilla y fecha final el resultado es
+idéntico, así los benchmarks son comparables entre ejecuciones.
+
+Uso:
+  python scripts/generate_data.py --users 10000 --habits 6 --years 3 --seed 42
+  python scripts/init_db.py synthetic --users 1000
+"""
+
+import argparse
+import bisect
+import math
+import os
+import random
+import sys
+import time as timer
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate
+
+# Agregar raíz del proyecto al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+TIMEZONES = [
+    ('UTC', 0), ('Europe/Madrid', 1), ('America/Lima', -5), ('America/Mexico_City', -6),
+    ('America/Bogota', -5), ('America/Argentina/Buenos_Aires', -3), ('America/New_York', -5),
+    ('Asia/Tokyo', 9),
+]
+
+HABIT_CATALOG = [
+    ('Ejercicio matutino', 'fitness'), ('Leer 20 páginas', 'learning'), ('Meditar', 'mindfulness'),
+    ('Beber 2L de agua', 'health'), ('Dormir 8 horas', 'health'), ('Planificar el día', 'productivity'),
+    ('Estudiar inglés', 'learning'), ('Caminar 10.000 pasos', 'fitness'), ('Registrar gastos', 'finance'),
+    ('Llamar a la familia', 'social'), ('Escribir un diario', 'mindfulness'), ('Sin redes sociales', 'productivity'),
+    ('Cocinar en casa', 'health'), ('Estirar', 'fitness'), ('Revisión semanal', 'productivity'),
+    ('Ahorrar', 'finance'),
+]
+
+FREQUENCY_WEIGHTS = [('daily', 0.85), ('weekly', 0.10), ('monthly', 0.05)]
+
+DERIVED_CHUNK = 5000
+
+
+def parse_args(argv=None):
+    """Opciones de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Generar un dataset sintético de HabitIQ')
+    parser.add_argument('--users', type=int, default=1000, help='Número de usuarios')
+    parser.add_argument('--habits', type=int, default=5, help='Hábitos medios por usuario')
+    parser.add_argument('--years', type=float, default=2, help='Años de historial')
+    parser.add_argument('--friends', type=float, default=10, help='Amigos medios por usuario')
+    parser.add_argument('--friend-dist', choices=['powerlaw', 'uniform', 'none'], default='powerlaw',
+                        help='Distribución del grado del grafo de amistades')
+    parser.add_argument('--pending-ratio', type=float, default=0.1, help='Fracción de solicitudes pendientes')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla (resultado determinista)')
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(),
+                        help='Último día del historial (YYYY-MM-DD); fíjalo para datasets reproducibles')
+    parser.add_argument('--prefix', default='synth', help='Prefijo de los nombres de usuario')
+    parser.add_argument('--password', default='demo1234', help='Contraseña común de los usuarios')
+    parser.add_argument('--batch-size', type=int, default=10000, help='Filas por INSERT masivo')
+    parser.add_argument('--reset', action='store_true', help='Vaciar la base de datos antes de generar')
+    parser.add_argument('--skip-derived', action='store_true',
+                        help='No recalcular rollup, rachas ni puntuaciones al terminar')
+    return parser.parse_args(argv)
+
+
+def weighted_choice(rng, options):
+    """Elegir de [(valor, peso)]"""
+    values, weights = zip(*options)
+    return rng.choices(values, weights)[0]
+
+
+def friend_weights(rng, n, dist):
+    """
+    Peso de cada usuario en el grafo (grado esperado relativo).
+
+    powerlaw: pocos usuarios muy conectados y muchos con pocos amigos (Pareto);
+    uniform: todos con el mismo grado esperado.
+    """
+    if dist == 'uniform':
+        return [1.0] * n
+    return [rng.paretovariate(1.8) for _ in range(n)]
+
+
+def generate_friendships(rng, user_ids, args):
+    """
+    Pares de amistad sin duplicados (modelo de Chung-Lu).
+
+    Los extremos se eligen proporcionalmente al peso, así el grado medio
+    es ~args.friends y su distribución sigue friend_weights.
+    """
+    n = len(user_ids)
+    if args.friend_dist == 'none' or n < 2 or args.friends <= 0:
+        return []
+    weights = friend_weights(rng, n, args.friend_dist)
+    cumulative = list(accumulate(weights))
+    total = cumulative[-1]
+    target = min(int(n * args.friends / 2), n * (n - 1) // 2)
+
+    pairs = set()
+    attempts = 0
+    while len(pairs) < target and attempts < target * 20:
+        attempts += 1
+        a = bisect.bisect_left(cumulative, rng.random() * total)
+        b = bisect.bisect_left(cumulative, rng.random() * total)
+        if a == b:
+            continue
+        pairs.add((min(a, b), max(a, b)))
+
+    rows = []
+    for a, b in sorted(pairs):
+        sender, receiver = (a, b) if rng.random() < 0.5 else (b, a)
+        status = 'pending' if rng.random() < args.pending_ratio else 'accepted'
+        rows.append({'user_id': user_ids[sender], 'friend_id': user_ids[receiver], 'status': status})
+    return rows
+
+
+def completion_days(rng, frequency, start, end):
+    """
+    Días completados de un hábito con patrones realistas.
+
+    Cadena de Markov: tras completar es probable seguir (rachas) y tras
+    fallar es más probable volver a fallar; los fines de semana bajan la
+    adherencia. Parte de los hábitos se abandonan en algún momento.
+    """
+    adherence = rng.betavariate(4, 2)
+    keep = 0.55 + 0.4 * adherence
+    restart = 0.15 + 0.5 * adherence
+    if rng.random() < 0.25:
+        end = start + timedelta(days=int((end - start).days * rng.random()))
+
+    days = []
+    if frequency == 'daily':
+        done = rng.random() < adherence
+        day = start
+        while day <= end:
+            chance = keep if done else restart
+            if day.weekday() >= 5:
+                chance *= 0.8
+            done = rng.random() < chance
+            if done:
+                days.append(day)
+            day += timedelta(days=1)
+    elif frequency == 'weekly':
+        week = start - timedelta(days=start.weekday())
+        while week <= end:
+            if rng.random() < adherence:
+                day = week + timedelta(days=rng.randrange(7))
+                if start <= day <= end:
+                    days.append(day)
+            week += timedelta(days=7)
+    else:
+        month = start.replace(day=1)
+        while month <= end:
+            if rng.random() < adherence:
+                day = month + timedelta(days=rng.randrange(28))
+                if start <= day <= end:
+                    days.append(day)
+            month = (month + timedelta(days=32)).replace(day=1)
+    return days
+
+
+def insert_batches(db, model, rows, batch_size):
+    """INSERT masivo (executemany) por lotes"""
+    for i in range(0, len(rows), batch_size):
+        db.session.execute(db.insert(model), rows[i:i + batch_size])
+    db.session.commit()
+
+
+def generate(args):
+    """Generar el dataset completo; devuelve los contadores"""
+    from werkzeug.security import generate_password_hash
+    import backend.app as habitiq
+    from backend.app import app, db, User, Friendship, Habit, Completion
+
+    rng = random.Random(args.seed)
+    end = args.end_date
+    start = end - timedelta(days=int(args.years * 365))
+    counts = {'users': 0, 'friendships': 0, 'habits': 0, 'completions': 0}
+    started = timer.perf_counter()
+
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+            db.create_all()
+            habitiq.seed_achievements()
+
+        # Usuarios (un único hash: generar uno por usuario domina el tiempo)
+        password_hash = generate_password_hash(args.password)
+        last_id = db.session.query(db.func.max(User.id)).scalar() or 0
+        users = []
+        for i in range(args.users):
+            tz, offset = TIMEZONES[rng.randrange(len(TIMEZONES))]
+            users.append({
+                'username': f'{args.prefix}{i:07d}', 'email': f'{args.prefix}{i:07d}@example.com',
+                'password_hash': password_hash, 'timezone': tz, 'is_public': rng.random() < 0.7,
+                'created_at': datetime.combine(start, time()) + timedelta(days=rng.randrange(max(1, (end - start).days // 4)))
+            })
+        insert_batches(db, User, users, args.batch_size)
+        # Ids por clave natural (username): el executemany no garantiza ids en orden de inserción
+        ids = dict(db.session.query(User.username, User.id).filter(User.id > last_id))
+        user_ids = [ids[user['username']] for user in users]
+        offsets = dict(TIMEZONES)
+        user_offsets = {ids[user['username']]: offsets.get(user['timezone'], 0) for user in users}
+        counts['users'] = len(users)
+        print(f"  usuarios: {counts['users']}")
+
+        friendships = generate_friendships(rng, user_ids, args)
+        insert_batches(db, Friendship, friendships, args.batch_size)
+        counts['friendships'] = len(friendships)
+        print(f"  amistades: {counts['friendships']}")
+
+        # Hábitos y completaciones, por bloques de usuarios para acotar la memoria
+        block = max(1, args.batch_size // max(1, args.habits))
+        for b in range(0, len(user_ids), block):
+            habits, specs = [], []
+            block_users = user_ids[b:b + block]
+            for uid in block_users:
+                count = max(1, int(rng.gauss(args.habits, max(1.0, args.habits / 3))))
+                for name, category in rng.sample(HABIT_CATALOG, min(count, len(HABIT_CATALOG))):
+                    frequency = weighted_choice(rng, FREQUENCY_WEIGHTS)
+                    first = start + timedelta(days=int((end - start).days * rng.random() ** 2))
+                    habits.append({'user_id': uid, 'name': name, 'category': category, 'frequency': frequency,
+                                   'description': '', 'is_active': rng.random() < 0.9,
+                                   'created_at': datetime.combine(first, time(9))})
+                    specs.append((uid, name, frequency, first))
+            insert_batches(db, Habit, habits, args.batch_size)
+            # (usuario, nombre) es único entre los hábitos generados de un usuario nuevo
+            habit_ids = {(uid, name): hid for hid, uid, name in db.session.query(
+                Habit.id, Habit.user_id, Habit.name).filter(Habit.user_id.in_(block_users))}
+            counts['habits'] += len(habits)
+
+            completions = []
+            for uid, name, frequency, first in specs:
+                habit_id = habit_ids[(uid, name)]
+                offset = user_offsets[uid]
+                for day in completion_days(rng, frequency, first, end):
+                    # Hora local entre 8 y 21: el día local coincide aun con horario de verano
+                    local = datetime.combine(day, time(8)) + timedelta(minutes=rng.randrange(13 * 60))
+                    completions.append({'habit_id': habit_id, 'completed_date': local - timedelta(hours=offset),
+                                        'completed_day': day})
+                if len(completions) >= args.batch_size:
+                    insert_batches(db, Completion, completions, args.batch_size)
+                    counts['completions'] += len(completions)
+                    completions = []
+            insert_batches(db, Completion, completions, args.batch_size)
+            counts['completions'] += len(completions)
+            elapsed = timer.perf_counter() - started
+            print(f"  hábitos: {counts['habits']}, completaciones: {counts['completions']} "
+                  f"({math.floor(counts['completions'] / elapsed)} filas/s)")
+
+        if not args.skip_derived:
+            print("  recalculando rollup, rachas y puntuaciones...")
+            # Con --reset todo el dataset es nuevo; si no, por bloques para acotar el IN
+            scopes = [None] if args.reset else [user_ids[i:i + DERIVED_CHUNK]
+                                                for i in range(0, len(user_ids), DERIVED_CHUNK)]
+            for scope in scopes:
+                habitiq.rebuild_daily_stats(scope)
+                habitiq.recompute_streaks(scope)
+
+    counts['seconds'] = round(timer.perf_counter() - started, 1)
+    return counts
+
+
+def main(argv=None):
+    """Punto de entrada"""
+    args = parse_args(argv)
+    print(f"Generando dataset sintético (semilla {args.seed}, hasta {args.end_date})...")
+    counts = generate(args)
+    print(f"✅ {counts['users']} usuarios, {counts['friendships']} amistades, {counts['habits']} hábitos y "
+          f"{counts['completions']} completaciones en {counts['seconds']}s")
+
+
+if __name__ == '__main__':
+    main()
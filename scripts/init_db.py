@@ -10,14 +10,15 @@ import os
 # Agregar backend al path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../backend'))
 
-from app import create_app
-from database.db import db
-from models.habit import Habit, Completion
 from datetime import datetime, timedelta
 
 
 def init_database():
     """Inicializar base de datos con datos de ejemplo"""
+    from app import create_app
+    from database.db import db
+    from models.habit import Habit, Completion
+
     print("Inicializando base de datos HabitIQ...")
     
     # Crear aplicación
@@ -187,6 +188,9 @@ def clear_database():
     confirmation = input("¿Continuar? (s/n): ")
     
     if confirmation.lower() == 's':
+        from app import create_app
+        from database.db import db
+
         app = create_app('development')
         
         with app.app_context():
@@ -198,6 +202,12 @@ def clear_database():
         init_database()
 
 
+def generate_synthetic(argv):
+    """Generar un dataset sintético para pruebas de carga (ver generate_data.py)"""
+    from generate_data import main
+    main(argv)
+
+
 def show_help():
     """Mostrar ayuda"""
     print("""
@@ -209,6 +219,9 @@ Uso:
 Comandos:
   init     - Inicializar base de datos (crear tablas y datos de ejemplo)
   clear    - Eliminar todos los datos y reinicializar
+  synthetic [opciones]
+           - Generar un dataset sintético (usuarios, amistades, hábitos y
+             años de completaciones); 'synthetic --help' lista las opciones
   help     - Mostrar este mensaje de ayuda
 
 Si no se especifica comando, se ejecuta 'init' por defecto.
@@ -223,6 +236,8 @@ if __name__ == '__main__':
         init_database()
     elif command == 'clear':
         clear_database()
+    elif command == 'synthetic':
+        generate_synthetic(sys.argv[2:])
     elif command == 'help':
         show_help()
     else:
@@ -0,0 +1,72 @@
+"""
+Tests del catálogo de logros cacheado por proceso.
+"""
+
+import unittest
+import os
+import sys
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import app, db, Achievement, AchievementCatalog, seed_achievements
+
+
+class FakeClock:
+    """Reloj manual para controlar el TTL"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class AchievementCatalogTestCase(unittest.TestCase):
+    """Tests para la carga, el TTL y la invalidación"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        seed_achievements()
+        self.clock = FakeClock()
+        self.catalog = AchievementCatalog(ttl=60, clock=self.clock)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def rename_first_habit_achievement(self, name):
+        Achievement.query.filter_by(key='first_habit').update({'name': name})
+        db.session.commit()
+
+    def test_lookups_share_one_snapshot(self):
+        """Test: get, by_id y all leen el mismo catálogo"""
+        entry = self.catalog.get('first_habit')
+        self.assertIs(self.catalog.by_id(entry.id), entry)
+        self.assertIn(entry, self.catalog.all())
+        self.assertIsNone(self.catalog.get('no_existe'))
+
+    def test_reloads_after_ttl(self):
+        """Test: Otro proceso ve los cambios al vencer el TTL"""
+        self.catalog.get('first_habit')
+        self.rename_first_habit_achievement('Nuevo nombre')
+
+        self.clock.now = 59
+        self.assertNotEqual(self.catalog.get('first_habit').name, 'Nuevo nombre')
+        self.clock.now = 60
+        self.assertEqual(self.catalog.get('first_habit').name, 'Nuevo nombre')
+
+    def test_invalidate_reloads_immediately(self):
+        """Test: invalidate() fuerza la recarga en este proceso"""
+        self.catalog.get('first_habit')
+        self.rename_first_habit_achievement('Otro nombre')
+        self.catalog.invalidate()
+        self.assertEqual(self.catalog.get('first_habit').name, 'Otro nombre')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Tests de la evaluación de logros por eventos y de su otorgamiento.
+"""
+
+import unittest
+import os
+import sys
+from unittest import mock
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import (app, db, User, Habit, UserAchievement, UserScore, achievement_catalog,
+                         fire_achievement_event, _award_achievements, seed_achievements,
+                         EVENT_HABIT_CREATED, EVENT_COMPLETION_TOGGLED, EVENT_FRIENDSHIP_ACCEPTED)
+
+
+class AchievementEventsTestCase(unittest.TestCase):
+    """Tests para fire_achievement_event y _award_achievements"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        seed_achievements()
+        self.user = User(username='ana', email='ana@example.com')
+        self.user.set_password('secreto')
+        db.session.add(self.user)
+        db.session.flush()
+        db.session.add(Habit(user_id=self.user.id, name='Leer', best_streak=3))
+        # Contadores que cumplen reglas de los tres eventos a la vez
+        db.session.add(UserScore(user_id=self.user.id, habit_count=5, total_completions=1,
+                                 best_streak=3, friend_count=1))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def earned(self):
+        ids = [aid for aid, in db.session.query(UserAchievement.achievement_id).filter_by(user_id=self.user.id)]
+        return {achievement_catalog.by_id(aid).key for aid in ids}
+
+    def test_fire_awards_only_matching_rules(self):
+        """Test: Cada evento otorga solo sus reglas cumplidas, una sola vez"""
+        fire = lambda event: {a.key for a in fire_achievement_event(self.user, event)}
+
+        self.assertEqual(fire(EVENT_HABIT_CREATED), {'first_habit', 'five_habits'})
+        self.assertEqual(self.earned(), {'first_habit', 'five_habits'})
+        self.assertEqual(fire(EVENT_HABIT_CREATED), set())
+
+        # perfect_day no: no hay hábitos activos hoy
+        self.assertEqual(fire(EVENT_COMPLETION_TOGGLED), {'first_complete', 'streak_3'})
+        self.assertEqual(fire(EVENT_FRIENDSHIP_ACCEPTED), {'first_friend'})
+        self.assertEqual(fire(EVENT_FRIENDSHIP_ACCEPTED), set())
+
+        self.assertEqual(len(self.earned()), 5)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(UserScore, self.user.id).achievements, 5)
+
+    def test_duplicate_does_not_drop_batch(self):
+        """Test: Si otra petición otorga un logro a la vez, el resto del lote se guarda igual"""
+        first_habit = achievement_catalog.get('first_habit')
+        real_add_all = db.session.add_all
+        raced = []
+
+        def racing_add_all(objects):
+            objects = list(objects)
+            if not raced:
+                # Otra petición otorga first_habit entre la lectura y el commit de esta
+                raced.append(True)
+                db.session.add(UserAchievement(user_id=self.user.id, achievement_id=first_habit.id))
+                db.session.commit()
+            real_add_all(objects)
+
+        with mock.patch.object(db.session, 'add_all', racing_add_all):
+            awarded = _award_achievements(self.user.id, ['first_habit', 'five_habits', 'no_existe'])
+
+        self.assertEqual([a.key for a in awarded], ['five_habits'])
+        self.assertEqual(self.earned(), {'first_habit', 'five_habits'})
+        self.assertEqual(_award_achievements(self.user.id, ['first_habit', 'five_habits']), [])
+
+    def test_pages_do_not_evaluate(self):
+        """Test: /profile y /friends solo leen logros, no los evalúan ni otorgan"""
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(self.user.id)
+
+        with mock.patch('backend.app.check_achievements') as check, \
+                mock.patch('backend.app.fire_achievement_event') as fire, \
+                mock.patch('backend.app._award_achievements') as award:
+            for url in ('/profile', '/friends'):
+                self.assertEqual(client.get(url).status_code, 200)
+
+        check.assert_not_called()
+        fire.assert_not_called()
+        award.assert_not_called()
+        self.assertEqual(self.earned(), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
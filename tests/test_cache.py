@@ -0,0 +1,83 @@
+"""
+Tests unitarios para la caché con expiración.
+"""
+
+import unittest
+import os
+import sys
+
+# Agregar raíz del proyecto al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.services.cache import TTLCache, make_etag
+
+
+class FakeClock:
+    """Reloj manual para controlar la expiración"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TTLCacheTestCase(unittest.TestCase):
+    """Tests para expiración, invalidación y estadísticas"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(ttl=5, clock=self.clock)
+
+    def test_get_and_expire(self):
+        """Test: Un valor se sirve hasta que vence su TTL"""
+        self.cache.set(1, 'stats')
+        self.clock.now = 4.9
+        self.assertEqual(self.cache.get(1), 'stats')
+        self.clock.now = 5
+        self.assertIsNone(self.cache.get(1))
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_invalidate(self):
+        """Test: Invalidar descarta solo la clave indicada"""
+        self.cache.set(1, 'a')
+        self.cache.set(2, 'b')
+        self.cache.invalidate(1)
+
+        self.assertIsNone(self.cache.get(1))
+        self.assertEqual(self.cache.get(2), 'b')
+        self.assertEqual(self.cache.stats()['hit_ratio'], 0.5)
+
+    def test_set_after_invalidate_is_ignored(self):
+        """Test: Un valor calculado antes de invalidar no se guarda"""
+        generation = self.cache.generation(1)
+        self.cache.invalidate(1)  # otro hilo cambia los datos mientras se calcula
+        self.assertFalse(self.cache.set(1, 'viejo', generation))
+        self.assertIsNone(self.cache.get(1))
+
+        self.assertTrue(self.cache.set(1, 'nuevo', self.cache.generation(1)))
+        self.assertEqual(self.cache.get(1), 'nuevo')
+
+        generation = self.cache.generation(2)
+        self.cache.clear()
+        self.assertFalse(self.cache.set(2, 'viejo', generation))
+
+    def test_max_entries(self):
+        """Test: Al llenarse se descarta la entrada más próxima a expirar"""
+        cache = TTLCache(ttl=5, max_entries=2, clock=self.clock)
+        cache.set(1, 'a')
+        self.clock.now = 1
+        cache.set(2, 'b')
+        cache.set(3, 'c')
+
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.get(3), 'c')
+
+    def test_etag_stable(self):
+        """Test: El ETag no depende del orden de las claves"""
+        self.assertEqual(make_etag({'a': 1, 'b': 2}), make_etag({'b': 2, 'a': 1}))
+        self.assertNotEqual(make_etag({'a': 1}), make_etag({'a': 2}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Tests unitarios para el servicio de gráficas.
+"""
+
+import unittest
+import os
+import sys
+from datetime import date
+
+# Agregar raíz del proyecto al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.services.chart_service import ChartService
+
+
+class ChartServiceTestCase(unittest.TestCase):
+    """Tests para ventanas de fechas y relleno de series"""
+
+    def setUp(self):
+        self.today = date(2024, 3, 10)
+
+    def test_default_window(self):
+        """Test: Ventana por defecto termina hoy"""
+        start, end = ChartService.resolve_window({}, default_days=365, today=self.today)
+        self.assertEqual(end, self.today)
+        self.assertEqual((end - start).days + 1, 365)
+
+    def test_days_param(self):
+        """Test: Parámetro days"""
+        start, end = ChartService.resolve_window({'days': '7'}, default_days=365, today=self.today)
+        self.assertEqual(start, date(2024, 3, 4))
+        self.assertEqual(end, self.today)
+
+    def test_start_end_params(self):
+        """Test: Parámetros start/end explícitos"""
+        start, end = ChartService.resolve_window(
+            {'start': '2024-01-01', 'end': '2024-01-31'}, default_days=365, today=self.today)
+        self.assertEqual(start, date(2024, 1, 1))
+        self.assertEqual(end, date(2024, 1, 31))
+
+    def test_invalid_window(self):
+        """Test: Ventanas inválidas"""
+        with self.assertRaises(ValueError):
+            ChartService.resolve_window({'start': 'ayer'}, default_days=30, today=self.today)
+        with self.assertRaises(ValueError):
+            ChartService.resolve_window({'days': '0'}, default_days=30, today=self.today)
+        with self.assertRaises(ValueError):
+            ChartService.resolve_window(
+                {'start': '2024-02-01', 'end': '2024-01-01'}, default_days=30, today=self.today)
+        with self.assertRaises(ValueError):
+            ChartService.resolve_window({'days': '100000'}, default_days=30, today=self.today)
+
+    def test_fill_days(self):
+        """Test: Rellenar días vacíos con ceros"""
+        counts = {'2024-02-28': 2, '2024-03-01': 1}
+        data = ChartService.fill_days(counts, date(2024, 2, 27), date(2024, 3, 1))
+
+        self.assertEqual(list(data.keys()), ['2024-02-27', '2024-02-28', '2024-02-29', '2024-03-01'])
+        self.assertEqual(list(data.values()), [0, 2, 0, 1])
+
+    def test_resolve_bucket(self):
+        """Test: Normalizar agrupación"""
+        self.assertEqual(ChartService.resolve_bucket(None), 'day')
+        self.assertEqual(ChartService.resolve_bucket('weekly'), 'week')
+        self.assertEqual(ChartService.resolve_bucket('month'), 'month')
+        with self.assertRaises(ValueError):
+            ChartService.resolve_bucket('year')
+
+    def test_bucket_series_week(self):
+        """Test: Agrupar por semana (lunes) incluyendo semanas vacías"""
+        counts = {'2024-03-04': 1, '2024-03-10': 2, '2024-03-20': 4}
+        series = ChartService.bucket_series(counts, date(2024, 3, 6), date(2024, 3, 20), 'week')
+
+        self.assertEqual(series, [(date(2024, 3, 4), 2), (date(2024, 3, 11), 0), (date(2024, 3, 18), 4)])
+
+    def test_bucket_series_month(self):
+        """Test: Agrupar por mes"""
+        counts = {'2024-01-31': 1, '2024-02-01': 2, '2024-02-29': 3}
+        series = ChartService.bucket_series(counts, date(2024, 1, 1), date(2024, 3, 31), 'month')
+
+        self.assertEqual(series, [(date(2024, 1, 1), 1), (date(2024, 2, 1), 5), (date(2024, 3, 1), 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
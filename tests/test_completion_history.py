@@ -0,0 +1,163 @@
+"""
+Tests del historial y del export de completaciones (filtros start/end por
+día local, validación de fechas y contenido del streaming).
+"""
+
+import unittest
+import os
+import sys
+import csv
+import io
+import json
+from datetime import datetime
+from unittest import mock
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import (app, db, User, Habit, Completion, completion_day_filters,
+                         EXPORT_COLUMNS)
+
+
+class CompletionHistoryTestCase(unittest.TestCase):
+    """Tests para completion_day_filters, /api/habits/<id>/completions y /api/export/completions"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        # Lima es UTC-5: el día local cambia a las 05:00 UTC
+        user = self.add_user('ana', 'America/Lima')
+        other = self.add_user('luis', 'UTC')
+        self.leer = Habit(user_id=user.id, name='Leer')
+        self.correr = Habit(user_id=user.id, name='Correr')
+        ajeno = Habit(user_id=other.id, name='Ajeno')
+        db.session.add_all([self.leer, self.correr, ajeno])
+        db.session.flush()
+        # completed_day se deriva de completed_date en la zona del usuario
+        moments = [
+            datetime(2024, 5, 10, 12, 0),  # 10 local
+            datetime(2024, 5, 11, 3, 0),   # 10 local (11 en UTC)
+            datetime(2024, 5, 11, 6, 0),   # 11 local
+            datetime(2024, 5, 12, 4, 59),  # 11 local (12 en UTC)
+            datetime(2024, 5, 12, 5, 0),   # 12 local
+        ]
+        self.completions = [Completion(habit_id=self.leer.id, completed_date=moment) for moment in moments]
+        self.noted = Completion(habit_id=self.correr.id, completed_date=datetime(2024, 5, 11, 15, 0),
+                                notes='Con "comillas", coma\ny salto')
+        db.session.add_all(self.completions + [
+            self.noted, Completion(habit_id=ajeno.id, completed_date=datetime(2024, 5, 11, 12, 0))])
+        db.session.commit()
+        self.ids = [c.id for c in self.completions]
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_user(self, username, timezone):
+        user = User(username=username, email=f'{username}@example.com', timezone=timezone)
+        user.set_password('secreto')
+        db.session.add(user)
+        db.session.flush()
+        return user
+
+    def history(self, query=''):
+        response = self.client.get(f'/api/habits/{self.leer.id}/completions{query}')
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.get_json()]
+
+    def test_day_filters(self):
+        """Test: start/end inclusivos sobre completed_day; fechas mal formadas dan ValueError"""
+        count = lambda args: Completion.query.filter(Completion.habit_id == self.leer.id,
+                                                     *completion_day_filters(args)).count()
+        self.assertEqual(completion_day_filters({}), [])
+        self.assertEqual(count({'start': '', 'end': ''}), 5)
+        self.assertEqual(count({'start': '2024-05-11'}), 3)
+        self.assertEqual(count({'end': '2024-05-11'}), 4)
+        self.assertEqual(count({'start': '2024-05-11', 'end': '2024-05-11'}), 2)
+        for args in ({'start': '2024-02-30'}, {'end': 'ayer'}, {'start': '11/05/2024'}):
+            with self.subTest(args=args), self.assertRaises(ValueError):
+                completion_day_filters(args)
+
+    def test_history_uses_local_day(self):
+        """Test: El historial filtra por el día local del usuario, no por el día UTC"""
+        c10, c10_late, c11, c11_late, c12 = self.ids
+        self.assertEqual(self.history(), [c12, c11_late, c11, c10_late, c10])
+        self.assertEqual(self.history('?start=2024-05-10&end=2024-05-10'), [c10_late, c10])
+        self.assertEqual(self.history('?start=2024-05-11&end=2024-05-11'), [c11_late, c11])
+        self.assertEqual(self.history('?start=2024-05-12'), [c12])
+        self.assertEqual(self.history('?start=2024-05-13'), [])
+
+    def test_history_pages_keep_filters(self):
+        """Test: El enlace a la página siguiente conserva start/end"""
+        c10, c10_late, c11, c11_late, c12 = self.ids
+        response = self.client.get(f'/api/habits/{self.leer.id}/completions?start=2024-05-11&limit=2')
+        self.assertEqual([row['id'] for row in response.get_json()], [c12, c11_late])
+        link = response.headers['Link']
+        self.assertIn('start=2024-05-11', link)
+
+        next_url = link[link.index('<') + 1:link.index('>')]
+        response = self.client.get(next_url)
+        self.assertEqual([row['id'] for row in response.get_json()], [c11])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_invalid_input(self):
+        """Test: Fechas o formato inválidos devuelven 400; hábitos ajenos 404"""
+        for url in (f'/api/habits/{self.leer.id}/completions?start=2024-02-30',
+                    f'/api/habits/{self.leer.id}/completions?end=mañana',
+                    '/api/export/completions?start=2024-13-01',
+                    '/api/export/completions?format=csv&end=ayer',
+                    '/api/export/completions?format=xml'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.get_json())
+        ajeno = Habit.query.filter_by(name='Ajeno').one()
+        self.assertEqual(self.client.get(f'/api/habits/{ajeno.id}/completions').status_code, 404)
+
+    def test_export_ndjson(self):
+        """Test: NDJSON por streaming con solo las completaciones del usuario y filtros por día local"""
+        response = self.client.get('/api/export/completions')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(response.headers['Content-Disposition'], 'attachment; filename=completions.ndjson')
+
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([row['id'] for row in rows], sorted(self.ids + [self.noted.id]))
+        self.assertEqual(set(rows[0]), set(EXPORT_COLUMNS))
+        first = rows[0]
+        self.assertEqual((first['habit_name'], first['completed_date'], first['completed_day']),
+                         ('Leer', '2024-05-10T12:00:00', '2024-05-10'))
+
+        response = self.client.get('/api/export/completions?start=2024-05-10&end=2024-05-10')
+        days = {json.loads(line)['completed_day'] for line in response.get_data(as_text=True).splitlines()}
+        self.assertEqual(days, {'2024-05-10'})
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 2)
+
+    def test_export_csv(self):
+        """Test: CSV por streaming en varios trozos, con cabecera y campos escapados"""
+        with mock.patch('backend.app.EXPORT_BATCH_SIZE', 2):
+            response = self.client.get('/api/export/completions?format=csv')
+            self.assertEqual(response.status_code, 200)
+            chunks = list(response.response)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertEqual(response.headers['Content-Disposition'], 'attachment; filename=completions.csv')
+        self.assertGreater(len(chunks), 2)
+
+        body = b''.join(chunk if isinstance(chunk, bytes) else chunk.encode() for chunk in chunks)
+        rows = list(csv.reader(io.StringIO(body.decode('utf-8'))))
+        self.assertEqual(tuple(rows[0]), EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 1 + len(self.ids) + 1)
+        noted = next(row for row in rows[1:] if row[0] == str(self.noted.id))
+        self.assertEqual(noted[2], 'Correr')
+        self.assertEqual(noted[-1], 'Con "comillas", coma\ny salto')
+
+
+if __name__ == '__main__':
+    unittest.main()
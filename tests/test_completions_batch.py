@@ -0,0 +1,144 @@
+"""
+Tests de los endpoints que escriben completaciones y rachas
+(/api/completions/batch y la edición de hábitos).
+"""
+
+import unittest
+import os
+import sys
+from datetime import timedelta
+from unittest import mock
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import app, db, User, Habit, Completion, DailyUserStats, UserScore, user_today
+
+
+class CompletionsBatchTestCase(unittest.TestCase):
+    """Tests para marcar/desmarcar en lote y sus efectos en rachas y puntuación"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(username='ana', email='ana@example.com')
+        user.set_password('secreto')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([Habit(user_id=user.id, name='Leer'), Habit(user_id=user.id, name='Correr')])
+        db.session.commit()
+        self.user = user
+        self.habits = [habit.id for habit in Habit.query.order_by(Habit.id)]
+        self.today = user_today(user)
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def batch(self, operations):
+        return self.client.post('/api/completions/batch', json={'operations': operations})
+
+    def test_toggle_on_and_off(self):
+        """Test: Marcar tres días crea completaciones, rachas y puntuación; desmarcar las revierte"""
+        leer, correr = self.habits
+        days = [(self.today - timedelta(days=n)).isoformat() for n in range(3)]
+        response = self.batch([[leer, day, True] for day in days] + [[correr, days[0], True]])
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual((data['created'], data['deleted'], data['unchanged']), (4, 0, 0))
+        summary = {habit['id']: habit for habit in data['habits']}
+        self.assertEqual(summary[leer]['current_streak'], 3)
+        self.assertTrue(summary[correr]['completed_today'])
+
+        db.session.expire_all()
+        score = db.session.get(UserScore, self.user.id)
+        self.assertEqual((score.total_completions, score.today_done, score.best_streak), (4, 2, 3))
+        self.assertEqual(db.session.get(DailyUserStats, (self.user.id, self.today)).completions, 2)
+
+        # Repetir es idempotente; desmarcar hoy recalcula las rachas desde el historial y resta puntuación
+        self.assertEqual(self.batch([[correr, days[0], True]]).get_json()['unchanged'], 1)
+        data = self.batch([[leer, days[0], False], [correr, days[0], False]]).get_json()
+        self.assertEqual(data['deleted'], 2)
+        summary = {habit['id']: habit for habit in data['habits']}
+        self.assertFalse(summary[leer]['completed_today'])
+        self.assertEqual(summary[leer]['best_streak'], 2)
+
+        db.session.expire_all()
+        score = db.session.get(UserScore, self.user.id)
+        self.assertEqual((score.total_completions, score.today_done), (2, 0))
+        self.assertEqual(Completion.query.count(), 2)
+
+    def test_rejects_foreign_and_invalid_operations(self):
+        """Test: Hábitos ajenos dan 404 y datos inválidos 400, sin escribir nada"""
+        self.assertEqual(self.batch([[9999, None, True]]).status_code, 404)
+        future = (self.today + timedelta(days=1)).isoformat()
+        self.assertEqual(self.batch([[self.habits[0], future, True]]).status_code, 400)
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.assertEqual(Completion.query.count(), 0)
+
+    def test_save_error_is_generic(self):
+        """Test: Un fallo al guardar se registra y no filtra detalles al cliente"""
+        with mock.patch('backend.app.refresh_habit_streaks', side_effect=RuntimeError('secreto interno')), \
+                self.assertLogs(app.logger, 'ERROR'):
+            response = self.batch([[self.habits[0], None, True]])
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn('secreto interno', response.get_data(as_text=True))
+        self.assertEqual(Completion.query.count(), 0)
+
+
+class EditHabitStreaksTestCase(unittest.TestCase):
+    """Tests para el recálculo de rachas al cambiar la frecuencia"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(username='ana', email='ana@example.com')
+        user.set_password('secreto')
+        db.session.add(user)
+        db.session.flush()
+        habit = Habit(user_id=user.id, name='Nadar')
+        db.session.add(habit)
+        db.session.commit()
+        self.user_id, self.habit_id = user.id, habit.id
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+        today = user_today(user)
+        self.client.post('/api/completions/batch', json=[
+            [habit.id, (today - timedelta(weeks=n)).isoformat(), True] for n in range(3)])
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def edit(self, frequency):
+        return self.client.post(f'/habits/edit/{self.habit_id}',
+                                data={'name': 'Nadar', 'category': 'fitness', 'frequency': frequency})
+
+    def test_frequency_change_recomputes_streaks(self):
+        """Test: Una vez por semana es racha 1 diaria y 3 semanal, y vuelve al revertir"""
+        habit = db.session.get(Habit, self.habit_id)
+        self.assertEqual((habit.current_streak, habit.best_streak), (1, 1))
+
+        self.assertEqual(self.edit('weekly').status_code, 302)
+        db.session.expire_all()
+        habit = db.session.get(Habit, self.habit_id)
+        self.assertEqual((habit.current_streak, habit.best_streak), (3, 3))
+        self.assertEqual(db.session.get(UserScore, self.user_id).best_streak, 3)
+
+        self.edit('daily')
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Habit, self.habit_id).current_streak, 1)
+        self.assertEqual(db.session.get(UserScore, self.user_id).best_streak, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
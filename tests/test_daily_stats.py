@@ -0,0 +1,139 @@
+"""
+Tests del rollup diario daily_user_stats y del heatmap que lo lee.
+"""
+
+import unittest
+import os
+import sys
+from datetime import date, datetime
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import app, db, User, Habit, Completion, DailyUserStats, rebuild_daily_stats
+
+
+class DailyStatsTestCase(unittest.TestCase):
+    """Base: dos usuarios con completaciones repartidas en varios días"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        # Lima es UTC-5: las completaciones antes de las 05:00 UTC son del día anterior
+        self.ana = self.add_user('ana', 'America/Lima')
+        self.luis = self.add_user('luis', 'UTC')
+        leer, correr, pausado = [Habit(user_id=self.ana.id, name=name, is_active=name != 'Pausado')
+                                 for name in ('Leer', 'Correr', 'Pausado')]
+        nadar = Habit(user_id=self.luis.id, name='Nadar')
+        db.session.add_all([leer, correr, pausado, nadar])
+        db.session.flush()
+        moments = {
+            leer: [datetime(2024, 5, 10, 12), datetime(2024, 5, 11, 3), datetime(2024, 5, 11, 12)],
+            correr: [datetime(2024, 5, 10, 20), datetime(2024, 5, 12, 4, 59)],
+            pausado: [datetime(2024, 5, 9, 12)],
+            nadar: [datetime(2024, 5, 11, 3), datetime(2024, 5, 11, 23)],
+        }
+        db.session.add_all(Completion(habit_id=habit.id, completed_date=moment)
+                           for habit, days in moments.items() for moment in days)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_user(self, username, timezone):
+        user = User(username=username, email=f'{username}@example.com', timezone=timezone)
+        user.set_password('secreto')
+        db.session.add(user)
+        db.session.flush()
+        return user
+
+
+class RebuildDailyStatsTestCase(DailyStatsTestCase):
+    """Tests para rebuild_daily_stats"""
+
+    def raw_counts(self):
+        """Conteo por (usuario, día) directamente desde completions"""
+        rows = db.session.query(Habit.user_id, Completion.completed_day, db.func.count(Completion.id)) \
+            .join(Habit, Completion.habit_id == Habit.id) \
+            .group_by(Habit.user_id, Completion.completed_day)
+        return {(user_id, day): count for user_id, day, count in rows}
+
+    def rollup(self):
+        db.session.expire_all()
+        return {(s.user_id, s.day): s.completions for s in DailyUserStats.query}
+
+    def test_matches_group_by(self):
+        """Test: El rollup reconstruido coincide con GROUP BY completed_day, sin filas de más"""
+        # Filas desviadas que la reconstrucción debe sustituir o borrar
+        db.session.add_all([DailyUserStats(user_id=self.ana.id, day=date(2024, 5, 10), completions=9),
+                            DailyUserStats(user_id=self.luis.id, day=date(2024, 1, 1), completions=1)])
+        db.session.commit()
+
+        expected = self.raw_counts()
+        self.assertEqual(rebuild_daily_stats(), len(expected))
+        self.assertEqual(self.rollup(), expected)
+        # El día local de Lima separa el 11 UTC de madrugada del resto del 11
+        self.assertEqual(expected[(self.ana.id, date(2024, 5, 10))], 3)
+        self.assertEqual(expected[(self.luis.id, date(2024, 5, 11))], 2)
+
+        active = {s.user_id: s.habits_active for s in DailyUserStats.query}
+        self.assertEqual(active, {self.ana.id: 2, self.luis.id: 1})
+
+    def test_only_given_users(self):
+        """Test: Con user_ids solo se reconstruyen las filas de esos usuarios"""
+        stale = DailyUserStats(user_id=self.luis.id, day=date(2024, 1, 1), completions=1)
+        db.session.add(stale)
+        db.session.commit()
+
+        self.assertEqual(rebuild_daily_stats([self.ana.id]), 3)
+        rollup = self.rollup()
+        self.assertEqual({key: count for key, count in rollup.items() if key[0] == self.ana.id},
+                         {key: count for key, count in self.raw_counts().items() if key[0] == self.ana.id})
+        self.assertEqual([key for key in rollup if key[0] == self.luis.id],
+                         [(self.luis.id, date(2024, 1, 1))])
+
+
+class HeatmapEndpointTestCase(DailyStatsTestCase):
+    """Tests para /api/chart/heatmap leyendo el rollup"""
+
+    def setUp(self):
+        super().setUp()
+        rebuild_daily_stats()
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(self.ana.id)
+
+    def heatmap(self, query):
+        response = self.client.get(f'/api/chart/heatmap{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_window_filled_with_zeros(self):
+        """Test: Un valor por día de la ventana, con los días vacíos a cero y solo del usuario"""
+        data = self.heatmap('?start=2024-05-08&end=2024-05-13')
+        self.assertEqual(list(data), ['2024-05-08', '2024-05-09', '2024-05-10',
+                                      '2024-05-11', '2024-05-12', '2024-05-13'])
+        self.assertEqual(list(data.values()), [0, 1, 3, 2, 0, 0])
+
+    def test_days_param(self):
+        """Test: days cuenta hacia atrás desde end; por defecto un año"""
+        self.assertEqual(self.heatmap('?days=2&end=2024-05-11'), {'2024-05-10': 3, '2024-05-11': 2})
+        data = self.heatmap('?end=2024-05-11')
+        self.assertEqual(len(data), 365)
+        self.assertEqual(sum(data.values()), 6)
+
+    def test_invalid_window(self):
+        """Test: Ventanas inválidas devuelven 400"""
+        for query in ('?start=ayer', '?days=0', '?start=2024-05-12&end=2024-05-01'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/chart/heatmap{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
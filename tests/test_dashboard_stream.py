@@ -0,0 +1,130 @@
+"""
+Tests de la ruta SSE /api/dashboard/stream.
+"""
+
+import unittest
+import os
+import sys
+import json
+from unittest import mock
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import (app, db, User, Habit, dashboard_events, dashboard_stats_cache,
+                         DASHBOARD_STREAM_MAX_AGE)
+
+
+class DashboardStreamTestCase(unittest.TestCase):
+    """Tests para el stream de estadísticas: eventos, bajas y límite por usuario"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(username='ana', email='ana@example.com')
+        user.set_password('secreto')
+        db.session.add(user)
+        db.session.flush()
+        habit = Habit(user_id=user.id, name='Leer')
+        db.session.add(habit)
+        db.session.commit()
+        self.user_id, self.habit_id = user.id, habit.id
+        self.addCleanup(lambda: self.assertEqual(dashboard_events.subscriber_count(), 0))
+        dashboard_stats_cache.invalidate(user.id)
+        # Esperas cortas para que el stream no bloquee el test
+        patcher = mock.patch('backend.app.DASHBOARD_STREAM_KEEPALIVE', 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def open_stream(self, headers=None):
+        # Cada stream abierto mantiene su contexto de petición: se cierran en orden inverso
+        response = self.client.get('/api/dashboard/stream', headers=headers)
+        self.addCleanup(response.close)
+        return response
+
+    @staticmethod
+    def read(events):
+        chunk = next(events)
+        return chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+
+    @staticmethod
+    def stats(chunk):
+        lines = dict(line.split(': ', 1) for line in chunk.strip().splitlines())
+        return lines['id'], lines['event'], json.loads(lines['data'])
+
+    def test_completion_pushes_event(self):
+        """Test: text/event-stream, un evento inicial y otro solo cuando se marca un hábito"""
+        response = self.open_stream()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+
+        events = iter(response.response)
+        self.assertEqual(self.read(events), 'retry: 5000\n\n')
+        etag, event, first = self.stats(self.read(events))
+        self.assertEqual(event, 'stats')
+
+        # Sin cambios solo llegan keepalives
+        self.assertEqual(self.read(events), ': keepalive\n\n')
+
+        toggled = self.client.post(f'/habits/toggle/{self.habit_id}',
+                                   headers={'X-Requested-With': 'XMLHttpRequest'})
+        self.assertTrue(toggled.get_json()['completed'])
+        new_etag, event, second = self.stats(self.read(events))
+        self.assertEqual(event, 'stats')
+        self.assertNotEqual(new_etag, etag)
+        self.assertNotEqual(second, first)
+
+    def test_last_event_id_skips_unchanged(self):
+        """Test: Al reconectar con el último id no se repite el evento"""
+        events = iter(self.open_stream().response)
+        self.read(events)
+        etag, _, _ = self.stats(self.read(events))
+
+        events = iter(self.open_stream({'Last-Event-ID': etag}).response)
+        self.assertEqual(self.read(events), 'retry: 5000\n\n')
+        self.assertEqual(self.read(events), ': keepalive\n\n')
+
+    def test_disconnect_unsubscribes(self):
+        """Test: Cerrar la respuesta da de baja la suscripción, haya empezado el stream o no"""
+        response = self.open_stream()
+        self.assertEqual(dashboard_events.subscriber_count(self.user_id), 1)
+        response.close()
+        self.assertEqual(dashboard_events.subscriber_count(self.user_id), 0)
+
+        response = self.open_stream()
+        events = iter(response.response)
+        self.read(events)
+        self.read(events)
+        self.assertEqual(dashboard_events.subscriber_count(self.user_id), 1)
+        response.close()
+        self.assertEqual(dashboard_events.subscriber_count(self.user_id), 0)
+
+    def test_limit_per_user(self):
+        """Test: Por encima del límite por usuario se responde 429 con Retry-After"""
+        with mock.patch('backend.app.DASHBOARD_STREAM_MAX_PER_USER', 2):
+            streams = [self.open_stream(), self.open_stream()]
+            self.assertEqual([s.status_code for s in streams], [200, 200])
+
+            rejected = self.client.get('/api/dashboard/stream')
+            self.assertEqual(rejected.status_code, 429)
+            self.assertEqual(rejected.headers['Retry-After'], str(DASHBOARD_STREAM_MAX_AGE))
+            self.assertEqual(dashboard_events.subscriber_count(self.user_id), 2)
+
+            # Al cerrar uno queda hueco para otro
+            streams[1].close()
+            self.assertEqual(self.open_stream().status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
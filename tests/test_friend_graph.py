@@ -0,0 +1,135 @@
+"""
+Tests de FriendGraph y de las páginas de amigos (/friends y /friends/search).
+"""
+
+import unittest
+import os
+import re
+import sys
+from contextlib import contextmanager
+
+from flask import g
+from sqlalchemy import event
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import app, db, User, Friendship, FriendGraph
+
+
+class FriendGraphTestCase(unittest.TestCase):
+    """Tests para la adyacencia de amistades y las rutas que la usan"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.me = self.add_user('yo')
+        # Amistades en ambos sentidos, solicitudes en ambos sentidos y una pareja ajena
+        self.sent_ok, self.received_ok, self.asked_me, self.asked, self.stranger, self.other = [
+            self.add_user(name) for name in ('mario', 'marta', 'marco', 'maria', 'marisa', 'mariana')]
+        db.session.add_all([
+            Friendship(user_id=self.me.id, friend_id=self.sent_ok.id, status='accepted'),
+            Friendship(user_id=self.received_ok.id, friend_id=self.me.id, status='accepted'),
+            Friendship(user_id=self.asked_me.id, friend_id=self.me.id, status='pending'),
+            Friendship(user_id=self.me.id, friend_id=self.asked.id, status='pending'),
+            Friendship(user_id=self.stranger.id, friend_id=self.other.id, status='accepted'),
+        ])
+        db.session.commit()
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(self.me.id)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_user(self, username):
+        user = User(username=username, email=f'{username}@example.com')
+        user.set_password('secreto')
+        db.session.add(user)
+        db.session.flush()
+        return user
+
+    def get(self, url):
+        # Las peticiones reutilizan el app context del test: sin grafos ni usuario cacheados en g
+        g.pop('friend_graphs', None)
+        g.pop('_login_user', None)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.get_data(as_text=True)
+
+    @contextmanager
+    def count_queries(self):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+    def test_load_both_directions(self):
+        """Test: Aceptadas en ambos sentidos son amigos; las pendientes quedan aparte"""
+        graph = FriendGraph.load(self.me.id)
+
+        self.assertEqual(graph.accepted, {self.sent_ok.id, self.received_ok.id})
+        self.assertEqual(graph.pending_in, {self.asked_me.id})
+        self.assertEqual(graph.pending_out, {self.asked.id})
+        self.assertEqual([u.username for u in graph.friends()], ['mario', 'marta'])
+        self.assertEqual([f.user_id for f in graph.pending_received()], [self.asked_me.id])
+        self.assertIsNone(graph.edge(self.stranger.id))
+        self.assertEqual(self.me.get_friend_ids(), sorted([self.sent_ok.id, self.received_ok.id]))
+
+    def test_friends_page(self):
+        """Test: /friends lista amigos de ambos sentidos y solo las solicitudes recibidas"""
+        html = self.get('/friends')
+        start = html.index('Solicitudes Pendientes')
+        split = html.index('friends-section', start)
+        pending, friends = html[start:split], html[split:]
+
+        self.assertEqual(re.findall(r'class="friend-name">(\w+)<', pending), ['marco'])
+        self.assertEqual(re.findall(r'class="friend-name">(\w+)<', friends), ['mario', 'marta'])
+        for name in ('maria', 'marisa', 'mariana'):
+            self.assertNotIn(f'>{name}<', html)
+
+    def test_search_statuses(self):
+        """Test: /friends/search marca amigos, pendientes (ambos sentidos) y desconocidos"""
+        html = self.get('/friends/search?q=mar')
+        results = html[html.index('search-results'):html.index('<!-- Pending Requests -->')]
+        actions = {}
+        for row in results.split('<div class="friend-row">')[1:]:
+            name = re.search(r'class="friend-name">(\w+)<', row).group(1)
+            actions[name] = ('Amigos' if 'Amigos' in row else 'Pendiente' if 'Pendiente' in row
+                             else 'Agregar' if 'Agregar' in row else None)
+
+        self.assertEqual(actions, {'mario': 'Amigos', 'marta': 'Amigos', 'marco': 'Pendiente',
+                                   'maria': 'Pendiente', 'marisa': 'Agregar', 'mariana': 'Agregar'})
+
+    def test_query_count_independent_of_friends(self):
+        """Test: Las consultas de /friends y la búsqueda no crecen con el número de amigos"""
+        def measure():
+            counts = []
+            for url in ('/friends', '/friends/search?q=mar'):
+                with self.count_queries() as statements:
+                    self.get(url)
+                counts.append(len(statements))
+            return counts
+
+        before = measure()
+        self.assertTrue(all(before))
+        for i in range(10):
+            friend = self.add_user(f'marina{i}')
+            db.session.add(Friendship(user_id=friend.id if i % 2 else self.me.id,
+                                      friend_id=self.me.id if i % 2 else friend.id, status='accepted'))
+            db.session.add(Friendship(user_id=self.add_user(f'marcos{i}').id, friend_id=self.me.id))
+        db.session.commit()
+
+        self.assertEqual(len(FriendGraph.load(self.me.id).accepted), 12)
+        self.assertEqual(measure(), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Tests de la lista de hábitos (index.html): estado "completado hoy".
+"""
+
+import unittest
+import os
+import sys
+from datetime import datetime
+
+from flask import render_template
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import app, db, User, Habit
+
+
+class LegacyHabit:
+    """Como backend/models/habit.py: completed_today es un método, no un atributo"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def completed_today(self, today=None):
+        raise AssertionError('La plantilla no debe llamar a completed_today()')
+
+
+class HabitsPageTestCase(unittest.TestCase):
+    """Tests para el botón de completado de la lista de hábitos"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(username='ana', email='ana@example.com')
+        user.set_password('secreto')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([Habit(user_id=user.id, name='Leer'), Habit(user_id=user.id, name='Correr')])
+        db.session.commit()
+        self.habits = [habit.id for habit in Habit.query.order_by(Habit.id)]
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_marks_only_completed(self):
+        """Test: /app marca como completados solo los hábitos completados hoy"""
+        html = self.client.get('/app').get_data(as_text=True)
+        self.assertNotIn('btn-completed', html)
+
+        self.client.post(f'/habits/toggle/{self.habits[0]}', headers={'X-Requested-With': 'XMLHttpRequest'})
+        html = self.client.get('/app').get_data(as_text=True)
+        self.assertEqual(html.count('btn-completed'), 1)
+        self.assertEqual(html.count('Marcar como hecho'), 1)
+
+    def test_legacy_model(self):
+        """Test: En el modelo antiguo completed_today es un método y no cuenta como completado"""
+        habit = LegacyHabit(id=7, name='Leer', category='general', frequency='daily', is_active=True,
+                            current_streak=0, best_streak=0, created_at=datetime(2024, 1, 1))
+        self.assertTrue(callable(habit.completed_today))
+
+        with app.test_request_context('/habits'):
+            pending = render_template('index.html', habits=[habit], completed_ids=set(), next_cursor=None)
+            done = render_template('index.html', habits=[habit], completed_ids={7}, next_cursor=None)
+        self.assertNotIn('btn-completed', pending)
+        self.assertIn('btn-completed', done)
+
+
+if __name__ == '__main__':
+    unittest.main()
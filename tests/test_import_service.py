@@ -0,0 +1,145 @@
+"""
+Tests unitarios para la lectura y validación de importaciones, y del
+endpoint /api/import.
+"""
+
+import unittest
+import csv
+import io
+import os
+import sys
+from datetime import date, datetime
+from unittest import mock
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import app, db, User, Habit, Completion
+from backend.services.import_service import ImportService
+
+
+class ImportServiceTestCase(unittest.TestCase):
+    """Tests para formatos, validación de filas y lotes"""
+
+    def test_detect_format(self):
+        """Test: Formato por parámetro, extensión o Content-Type"""
+        self.assertEqual(ImportService.detect_format(filename='datos.CSV'), 'csv')
+        self.assertEqual(ImportService.detect_format(content_type='application/x-ndjson'), 'ndjson')
+        self.assertEqual(ImportService.detect_format(filename='x.csv', explicit='ndjson'), 'ndjson')
+        with self.assertRaises(ValueError):
+            ImportService.detect_format(filename='datos.xlsx')
+
+    def test_iter_records(self):
+        """Test: CSV con cabecera y NDJSON con líneas inválidas"""
+        rows = list(ImportService.iter_records(io.StringIO('name,category\nLeer,estudio\n'), 'csv'))
+        self.assertEqual(rows, [(2, {'name': 'Leer', 'category': 'estudio'})])
+
+        rows = list(ImportService.iter_records(io.StringIO('{"name": "Leer"}\n\n{roto\n'), 'ndjson'))
+        self.assertEqual(rows[0], (1, {'name': 'Leer'}))
+        self.assertEqual(rows[1][0], 3)
+        with self.assertRaises(ValueError):
+            ImportService.validate(rows[1][1])
+
+    def test_validate_habit(self):
+        """Test: Hábito con valores por defecto"""
+        row = ImportService.validate({'Name': ' Leer ', 'is_active': 'no'})
+        self.assertEqual(row, {'type': 'habit', 'name': 'Leer', 'category': 'general', 'frequency': 'daily',
+                               'description': '', 'is_active': False})
+        with self.assertRaises(ValueError):
+            ImportService.validate({'name': 'Leer', 'frequency': 'yearly'})
+
+    def test_validate_completion(self):
+        """Test: Completación por fecha o instante con zona"""
+        row = ImportService.validate({'habit': 'Leer', 'date': '2024-03-01'})
+        self.assertEqual((row['type'], row['day'], row['moment']), ('completion', date(2024, 3, 1), None))
+
+        row = ImportService.validate({'habit': 'Leer', 'date': '2024-03-01T08:00:00-05:00'})
+        self.assertEqual(row['moment'], datetime(2024, 3, 1, 13))
+
+        with self.assertRaises(ValueError):
+            ImportService.validate({'habit': 'Leer', 'date': '2024-03-05'}, max_day=date(2024, 3, 4))
+        with self.assertRaises(ValueError):
+            ImportService.validate({'type': 'completion', 'date': '2024-03-01'})
+
+    def test_chunks(self):
+        """Test: Lotes de tamaño fijo"""
+        self.assertEqual(list(ImportService.chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+
+class ImportEndpointTestCase(unittest.TestCase):
+    """Tests para /api/import con cuerpo NDJSON y con CSV multipart"""
+
+    NDJSON = ('{"type": "habit", "name": "Leer", "category": "learning"}\n'
+              '{"habit": "Leer", "date": "2024-03-10"}\n'
+              '{"habit": "Correr", "date": "2024-03-11", "notes": "5k"}\n'
+              '{"habit": "Leer", "date": "mañana"}\n')
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(username='ana', email='ana@example.com')
+        user.set_password('secreto')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_raw_ndjson(self):
+        """Test: Cuerpo NDJSON crea hábitos y completaciones; reimportar no duplica"""
+        response = self.client.post('/api/import', data=self.NDJSON, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual((report['rows'], report['habits_created'], report['completions_created'],
+                          report['errors']), (4, 2, 2, 1))
+        self.assertEqual(report['error_samples'][0]['line'], 4)
+        self.assertEqual(Habit.query.filter_by(user_id=self.user_id).count(), 2)
+
+        again = self.client.post('/api/import?format=ndjson', data=self.NDJSON).get_json()
+        self.assertEqual((again['completions_created'], again['duplicates_skipped']), (0, 2))
+        self.assertEqual(Completion.query.count(), 2)
+
+    def test_multipart_csv(self):
+        """Test: Fichero CSV en multipart, formato por extensión"""
+        body = 'type,name,habit,date,notes\nhabit,Meditar,,,\ncompletion,,Meditar,2024-03-10,\n'
+        response = self.client.post('/api/import?batch_size=1', content_type='multipart/form-data',
+                                    data={'file': (io.BytesIO(body.encode('utf-8')), 'export.csv')})
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual((report['rows'], report['habits_created'], report['completions_created']), (2, 1, 1))
+        self.assertFalse(report['truncated'])
+        self.assertEqual(Habit.query.filter_by(user_id=self.user_id).one().name, 'Meditar')
+
+    def test_row_limit(self):
+        """Test: Más filas que IMPORT_MAX_ROWS devuelve 413 y remite al comando"""
+        with mock.patch('backend.app.IMPORT_MAX_ROWS', 2):
+            response = self.client.post('/api/import', data=self.NDJSON, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 413)
+        report = response.get_json()
+        self.assertTrue(report['truncated'])
+        self.assertEqual(report['rows'], 2)
+        self.assertIn('import-data', report['error'])
+
+    def test_rejects_bad_input(self):
+        """Test: Formato desconocido, batch_size inválido, texto no UTF-8 y CSV ilegible"""
+        self.assertEqual(self.client.post('/api/import', data='x', content_type='text/plain').status_code, 400)
+        self.assertEqual(self.client.post('/api/import?format=csv&batch_size=0', data='x').status_code, 400)
+        response = self.client.post('/api/import?format=csv', data=b'name\n\xff\xfe\n')
+        self.assertEqual(response.status_code, 400)
+        # Campo mayor que csv.field_size_limit(): csv.Error
+        response = self.client.post('/api/import?format=csv',
+                                    data='name\n' + 'x' * (csv.field_size_limit() + 1) + '\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('CSV', response.get_json()['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Tests del leaderboard (build_leaderboard y /leaderboard): ordenación,
+desempates estables entre páginas y columnas de orden no permitidas.
+"""
+
+import unittest
+import os
+import re
+import sys
+from datetime import date, timedelta
+from unittest import mock
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import app, db, User, UserScore, Friendship, build_leaderboard, LEADERBOARD_SORTS
+from backend.services.time_service import TimeService
+
+TODAY = date(2024, 5, 15)
+
+# username -> (best_streak, total_completions, today_done, días desde today_day, achievements);
+# None = sin fila en user_scores. Empates a propósito en todas las columnas numéricas.
+SCORES = {
+    'carla': (5, 20, 2, 0, 3),
+    'ana': (5, 10, 3, 1, 1),  # today_done de ayer: cuenta como 0
+    'eva': (2, 20, 1, 0, 3),
+    'beto': (7, 10, 0, None, 0),
+    'dani': (2, 20, 3, 0, 1),
+    'fede': None,
+}
+
+
+class LeaderboardTestCase(unittest.TestCase):
+    """Tests para build_leaderboard y la ruta /leaderboard"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        patcher = mock.patch.object(TimeService, 'today', staticmethod(lambda tz_name=None: TODAY))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.expected = {}
+        for username, score in SCORES.items():
+            user = User(username=username, email=f'{username}@example.com')
+            user.set_password('secreto')
+            db.session.add(user)
+            db.session.flush()
+            values = {'best_streak': 0, 'total_completions': 0, 'today_done': 0, 'achievements': 0}
+            if score:
+                best, total, today_done, days_ago, achievements = score
+                today_day = TODAY - timedelta(days=days_ago) if days_ago is not None else None
+                db.session.add(UserScore(user_id=user.id, best_streak=best, total_completions=total,
+                                         today_done=today_done, today_day=today_day,
+                                         achievements=achievements))
+                values = {'best_streak': best, 'total_completions': total,
+                          'today_done': today_done if today_day == TODAY else 0,
+                          'achievements': achievements}
+            self.expected[user.id] = dict(values, username=username)
+        db.session.commit()
+        self.user_ids = list(self.expected)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def expected_order(self, sort, order):
+        """Ids ordenados por sort (asc/desc) y, a igualdad, por id ascendente"""
+        if sort == 'username':
+            return sorted(self.expected, key=lambda uid: self.expected[uid]['username'], reverse=order == 'desc')
+        sign = -1 if order == 'desc' else 1
+        return sorted(self.expected, key=lambda uid: (sign * self.expected[uid][sort], uid))
+
+    def test_each_sort_and_order(self):
+        """Test: Cada columna permitida ordena en asc y desc con desempate por id"""
+        for sort in LEADERBOARD_SORTS:
+            for order in ('asc', 'desc'):
+                with self.subTest(sort=sort, order=order):
+                    rows, total = build_leaderboard(self.user_ids, sort, order)
+                    self.assertEqual(total, len(SCORES))
+                    self.assertEqual([row['user'].id for row in rows], self.expected_order(sort, order))
+                    for row in rows:
+                        expected = self.expected[row['user'].id]
+                        self.assertEqual({key: row[key] for key in
+                                          ('best_streak', 'total_completions', 'today_done', 'achievements')},
+                                         {key: expected[key] for key in
+                                          ('best_streak', 'total_completions', 'today_done', 'achievements')})
+
+    def test_pages_are_stable(self):
+        """Test: Con empates, recorrer las páginas da el orden completo sin repetir ni saltar usuarios"""
+        for sort in ('total_completions', 'best_streak', 'today_done'):
+            with self.subTest(sort=sort):
+                seen = []
+                for page in (1, 2, 3):
+                    rows, total = build_leaderboard(self.user_ids, sort, 'desc', page=page, per_page=2)
+                    self.assertEqual(total, len(SCORES))
+                    seen.extend(row['user'].id for row in rows)
+                self.assertEqual(seen, self.expected_order(sort, 'desc'))
+                self.assertEqual(build_leaderboard(self.user_ids, sort, 'desc', page=4, per_page=2), ([], 0))
+
+    def test_invalid_sort_falls_back(self):
+        """Test: Una columna no permitida no se usa: se ordena por total_completions"""
+        default = [row['user'].id for row in build_leaderboard(self.user_ids)[0]]
+        self.assertEqual(default, self.expected_order('total_completions', 'desc'))
+        for sort in ('password_hash', 'email', 'id; DROP TABLE users'):
+            with self.subTest(sort=sort):
+                rows, _ = build_leaderboard(self.user_ids, sort)
+                self.assertEqual([row['user'].id for row in rows], default)
+
+    def test_empty(self):
+        """Test: Sin usuarios no se consulta nada"""
+        self.assertEqual(build_leaderboard([]), ([], 0))
+
+    def test_route_orders_friends(self):
+        """Test: /leaderboard ordena a los amigos y a uno mismo; sort/order inválidos usan el orden por defecto"""
+        fede = User.query.filter_by(username='fede').one()
+        db.session.add_all(Friendship(user_id=fede.id, friend_id=uid, status='accepted')
+                           for uid in self.user_ids if uid != fede.id)
+        db.session.commit()
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(fede.id)
+
+        def listed(query):
+            response = client.get(f'/leaderboard{query}')
+            self.assertEqual(response.status_code, 200)
+            return re.findall(r'href="/user/(\w+)"', response.get_data(as_text=True))
+
+        names = lambda ids: [self.expected[uid]['username'] for uid in ids]
+        self.assertEqual(listed('?sort=username&order=asc'), names(self.expected_order('username', 'asc')))
+        self.assertEqual(listed('?sort=best_streak&order=desc&per_page=2&page=2'),
+                         names(self.expected_order('best_streak', 'desc')[2:4]))
+        self.assertEqual(listed('?sort=password_hash&order=sideways'),
+                         names(self.expected_order('total_completions', 'desc')))
+
+
+if __name__ == '__main__':
+    unittest.main()
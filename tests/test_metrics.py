@@ -0,0 +1,108 @@
+"""
+Tests unitarios para las métricas en formato Prometheus.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import threading
+
+# Agregar raíz del proyecto al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import sqlalchemy as sa
+
+from backend.services.metrics import MetricsRegistry, TimedQueuePool
+
+
+class MetricsTestCase(unittest.TestCase):
+    """Tests para contadores, histogramas y exposición"""
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_sums_thread_shards(self):
+        """Test: Cada hilo escribe en su fragmento y la lectura suma todos"""
+        counter = self.registry.counter('jobs_total', 'Trabajos', ('kind',))
+
+        def work():
+            for _ in range(1000):
+                counter.inc(kind='a')
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        counter.inc(5, kind='b')
+
+        self.assertEqual(counter.values(), {('a',): 8000, ('b',): 5})
+        self.assertIn('jobs_total{kind="a"} 8000', self.registry.render())
+
+    def test_finished_threads_fold_into_base(self):
+        """Test: Un hilo por petición no deja fragmentos vivos al terminar"""
+        counter = self.registry.counter('requests_total', 'Peticiones')
+        histogram = self.registry.histogram('request_seconds', 'Latencia', buckets=(1,))
+
+        for _ in range(50):
+            t = threading.Thread(target=lambda: (counter.inc(), histogram.observe(0.5)))
+            t.start()
+            t.join()
+
+        self.assertEqual(counter.shard_count(), 0)
+        self.assertEqual(histogram.shard_count(), 0)
+        self.assertEqual(counter.values(), {(): 50})
+        self.assertEqual(histogram.values(), {(): ([50, 0], 25.0, 50)})
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test: Buckets acumulados con límite inclusivo, suma y total"""
+        histogram = self.registry.histogram('latency_seconds', 'Latencia', ('route',), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, route='/x')
+
+        text = self.registry.render()
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertIn('latency_seconds_bucket{route="/x",le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{route="/x",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{route="/x",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_sum{route="/x"} 3.65', text)
+        self.assertIn('latency_seconds_count{route="/x"} 4', text)
+
+    def test_labels_are_validated_and_escaped(self):
+        """Test: Etiquetas incorrectas fallan y los valores se escapan"""
+        counter = self.registry.counter('hits_total', 'Hits', ('path',))
+        with self.assertRaises(ValueError):
+            counter.inc(route='/')
+        counter.inc(path='say "hi"')
+        self.assertIn('hits_total{path="say \\"hi\\""} 1', self.registry.render())
+
+    def test_callbacks_and_duplicates(self):
+        """Test: Callbacks sin valor se omiten y los nombres no se repiten"""
+        self.registry.callback('pool_size', 'Tamaño', lambda: 5)
+        self.registry.callback('pool_overflow', 'Overflow', lambda: None)
+        text = self.registry.render()
+        self.assertIn('pool_size 5', text)
+        self.assertNotIn('pool_overflow', text)
+        with self.assertRaises(ValueError):
+            self.registry.counter('pool_size', 'Otra vez')
+
+    def test_timed_pool_observes_checkouts(self):
+        """Test: TimedQueuePool avisa de cada checkout y conserva sus observadores al recrearse"""
+        waits = []
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = sa.create_engine(f'sqlite:///{tmp}/pool.db', poolclass=TimedQueuePool)
+            engine.pool.wait_observers.append(waits.append)
+            for _ in range(2):
+                with engine.connect() as conn:
+                    conn.execute(sa.text('SELECT 1'))
+            engine.dispose()
+            with engine.connect() as conn:
+                conn.execute(sa.text('SELECT 1'))
+            engine.dispose()
+        self.assertEqual(len(waits), 3)
+        self.assertTrue(all(w >= 0 for w in waits))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests unitarios para la paginación por cursor.
+"""
+
+import unittest
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import app, db, User, Habit
+from backend.services.pagination import KeysetPagination
+
+
+class KeysetPaginationTestCase(unittest.TestCase):
+    """Tests para cursores, límites y proyección de campos"""
+
+    def test_cursor_roundtrip(self):
+        """Test: El cursor conserva posición e id"""
+        moment = datetime(2024, 3, 10, 8, 30, 15, 123456)
+        token = KeysetPagination.encode_cursor(moment, 42)
+
+        self.assertNotIn('=', token)
+        self.assertEqual(KeysetPagination.decode_cursor(token), (moment, 42))
+        self.assertIsNone(KeysetPagination.decode_cursor(''))
+
+    def test_invalid_cursor(self):
+        """Test: Cursores manipulados se rechazan"""
+        with self.assertRaises(ValueError):
+            KeysetPagination.decode_cursor('no-es-un-cursor')
+        with self.assertRaises(ValueError):
+            KeysetPagination.decode_cursor(KeysetPagination.encode_cursor(datetime(2024, 1, 1), 1)[:-3])
+
+    def test_parse_limit(self):
+        """Test: limit por defecto, acotado y validado"""
+        self.assertEqual(KeysetPagination.parse_limit(None), KeysetPagination.DEFAULT_LIMIT)
+        self.assertEqual(KeysetPagination.parse_limit('10'), 10)
+        self.assertEqual(KeysetPagination.parse_limit('100000'), KeysetPagination.MAX_LIMIT)
+        with self.assertRaises(ValueError):
+            KeysetPagination.parse_limit('0')
+        with self.assertRaises(ValueError):
+            KeysetPagination.parse_limit('diez')
+
+    def test_parse_fields(self):
+        """Test: Proyección de campos"""
+        allowed = ('id', 'name', 'category')
+        self.assertEqual(KeysetPagination.parse_fields(None, allowed, ('id',)), ['id'])
+        self.assertEqual(KeysetPagination.parse_fields('name, id,name', allowed, ('id',)), ['name', 'id'])
+        with self.assertRaises(ValueError):
+            KeysetPagination.parse_fields('id,password', allowed, ('id',))
+
+
+class HabitsApiPaginationTestCase(unittest.TestCase):
+    """Tests para /api/habits con y sin paginación"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(username='ana', email='ana@example.com')
+        user.set_password('secreto')
+        db.session.add(user)
+        db.session.flush()
+        start = datetime(2024, 1, 1)
+        db.session.add_all(Habit(user_id=user.id, name=f'Hábito {i}', created_at=start + timedelta(minutes=i))
+                           for i in range(KeysetPagination.DEFAULT_LIMIT + 10))
+        db.session.commit()
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_without_limit_returns_everything(self):
+        """Test: Sin limit ni cursor se devuelven todos los hábitos"""
+        response = self.client.get('/api/habits')
+        self.assertEqual(len(response.get_json()), KeysetPagination.DEFAULT_LIMIT + 10)
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_pages_cover_everything_once(self):
+        """Test: Las páginas por cursor recorren todos los hábitos sin repetir"""
+        seen, url = [], '/api/habits?limit=25&fields=id'
+        while url:
+            response = self.client.get(url)
+            seen.extend(row['id'] for row in response.get_json())
+            cursor = response.headers.get('X-Next-Cursor')
+            url = f'/api/habits?limit=25&fields=id&cursor={cursor}' if cursor else None
+        self.assertEqual(len(seen), KeysetPagination.DEFAULT_LIMIT + 10)
+        self.assertEqual(len(set(seen)), len(seen))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Tests unitarios para el broker de avisos en memoria.
+"""
+
+import unittest
+import os
+import sys
+
+# Agregar raíz del proyecto al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.services.pubsub import PubSub
+
+
+class PubSubTestCase(unittest.TestCase):
+    """Tests para suscripción, publicación y baja"""
+
+    def setUp(self):
+        self.broker = PubSub()
+
+    def test_publish_notifies_only_key(self):
+        """Test: Solo se avisa a las suscripciones de la clave publicada"""
+        mine = self.broker.subscribe(1)
+        other = self.broker.subscribe(2)
+
+        self.assertEqual(self.broker.publish(1), 1)
+        self.assertTrue(mine.wait(0))
+        self.assertFalse(other.wait(0))
+
+    def test_notifications_coalesce(self):
+        """Test: Varios avisos seguidos se consumen con una sola espera"""
+        subscription = self.broker.subscribe(1)
+        self.broker.publish(1)
+        self.broker.publish(1)
+
+        self.assertTrue(subscription.wait(0))
+        self.assertFalse(subscription.wait(0))
+
+    def test_unsubscribe(self):
+        """Test: Tras la baja no quedan suscripciones"""
+        subscription = self.broker.subscribe(1)
+        self.broker.unsubscribe(subscription)
+
+        self.assertEqual(self.broker.publish(1), 0)
+        self.assertEqual(self.broker.subscriber_count(), 0)
+
+    def test_subscribe_limit(self):
+        """Test: Con limit no se superan las suscripciones simultáneas"""
+        first = self.broker.subscribe(1, limit=2)
+        self.broker.subscribe(1, limit=2)
+
+        self.assertIsNone(self.broker.subscribe(1, limit=2))
+        self.broker.unsubscribe(first)
+        self.assertIsNotNone(self.broker.subscribe(1, limit=2))
+        self.assertIsNone(self.broker.subscribe(2, limit=0))
+        self.assertEqual(self.broker.subscriber_count(2), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Tests de presupuesto de consultas por endpoint.
+Ejecuta el benchmark sobre un dataset sintético pequeño y comprueba
+max_queries de scripts/bench_budgets.json: un N+1 hace fallar el test.
+"""
+
+import unittest
+import os
+import sys
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from backend.app import app, db
+import benchmark
+import generate_data
+
+
+class QueryBudgetTestCase(unittest.TestCase):
+    """Tests para los presupuestos de sentencias SQL de los endpoints"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        generate_data.generate(generate_data.parse_args([
+            '--users', '40', '--habits', '4', '--years', '0.25', '--friends', '8',
+            '--end-date', benchmark.DEFAULT_END_DATE, '--reset'
+        ]))
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_endpoints_within_query_budget(self):
+        """Test: Cada endpoint ejecuta exactamente su max_queries (más es un N+1; menos, un presupuesto por actualizar)"""
+        budgets = benchmark.load_budgets()
+        results = benchmark.run_benchmarks(app, db, iterations=2, warmup=1)
+        for name, result in results.items():
+            with self.subTest(endpoint=name):
+                self.assertIn(name, budgets)
+                self.assertEqual(result['queries'], budgets[name]['max_queries'])
+
+    def test_percentile(self):
+        """Test: Percentiles con interpolación lineal"""
+        self.assertEqual(benchmark.percentile([5], 95), 5)
+        self.assertEqual(benchmark.percentile([1, 2, 3, 4], 50), 2.5)
+        self.assertAlmostEqual(benchmark.percentile(list(range(1, 101)), 95), 95.05)
+
+    def test_check_budget(self):
+        """Test: Solo se informan los límites superados"""
+        result = {'queries': 6, 'rows': 10, 'p95_ms': 3.0}
+        self.assertEqual(benchmark.check_budget(result, {'max_queries': 6, 'max_rows': 10}), [])
+        problems = benchmark.check_budget(result, {'max_queries': 5, 'max_p95_ms': 1})
+        self.assertEqual(len(problems), 2)
+        self.assertIn('queries=6 > max_queries=5', problems)
+
+
+if __name__ == '__main__':
+    unittest.main()
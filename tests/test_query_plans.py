@@ -0,0 +1,224 @@
+"""
+Tests de regresión de planes de consulta (SQLite).
+Verifican que las consultas sociales y de completaciones usan sus índices.
+"""
+
+import unittest
+import os
+import sys
+from datetime import date, datetime
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import sqlalchemy as sa
+from backend.app import app, db, Friendship, UserAchievement, User, Habit, Completion, completed_today_ids, user_today
+from backend.database.migrations import upgrade_schema
+
+
+def explain(stmt):
+    """Plan de consulta de SQLite para una sentencia SQLAlchemy"""
+    compiled = stmt.compile(dialect=db.engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params).all()
+    return ' | '.join(row[-1] for row in rows)
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    """Tests para el uso de índices en las consultas frecuentes"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_friendships_by_user_and_status(self):
+        """Test: (user_id, status) usa idx_friendship_user_status"""
+        plan = explain(sa.select(Friendship).where(Friendship.user_id == 1, Friendship.status == 'accepted'))
+        self.assertIn('idx_friendship_user_status', plan)
+
+    def test_friendships_by_friend_and_status(self):
+        """Test: (friend_id, status) usa idx_friendship_friend_status"""
+        plan = explain(sa.select(Friendship).where(Friendship.friend_id == 1, Friendship.status == 'pending'))
+        self.assertIn('idx_friendship_friend_status', plan)
+
+    def test_friend_graph_uses_both_directions(self):
+        """Test: La carga del grafo (OR en ambos sentidos) no recorre la tabla"""
+        plan = explain(sa.select(Friendship).where(
+            sa.or_(Friendship.user_id == 1, Friendship.friend_id == 1)))
+        self.assertIn('USING INDEX', plan)
+        self.assertNotIn('SCAN friendships', plan)
+
+    def test_user_achievements_by_user(self):
+        """Test: user_achievements por usuario usa uq_user_achievement"""
+        plan = explain(sa.select(UserAchievement.achievement_id).where(UserAchievement.user_id == 1))
+        self.assertIn('uq_user_achievement', plan)
+
+    def test_active_habits_by_user(self):
+        """Test: (user_id, is_active) usa idx_habits_user_active"""
+        plan = explain(sa.select(sa.func.count(Habit.id)).where(Habit.user_id == 1, Habit.is_active.is_(True)))
+        self.assertIn('idx_habits_user_active', plan)
+
+    def test_habits_keyset_page(self):
+        """Test: La página por cursor de hábitos usa idx_habits_user_created"""
+        plan = explain(sa.select(Habit.id).where(
+            Habit.user_id == 1,
+            sa.or_(Habit.created_at < datetime(2024, 1, 1),
+                   sa.and_(Habit.created_at == datetime(2024, 1, 1), Habit.id < 10))
+        ).order_by(Habit.created_at.desc(), Habit.id.desc()).limit(51))
+        self.assertIn('idx_habits_user_created', plan)
+
+    def test_completion_history_page(self):
+        """Test: La página por cursor del historial de un hábito usa idx_habit_date"""
+        plan = explain(sa.select(Completion.id).where(
+            Completion.habit_id == 1,
+            sa.or_(Completion.completed_date < datetime(2024, 1, 1),
+                   sa.and_(Completion.completed_date == datetime(2024, 1, 1), Completion.id < 10))
+        ).order_by(Completion.completed_date.desc(), Completion.id.desc()).limit(51))
+        self.assertIn('idx_habit_date', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_completed_day_lookup(self):
+        """Test: Búsqueda por día exacto usa idx_habit_day"""
+        plan = explain(sa.select(Completion.id).where(
+            Completion.habit_id == 1, Completion.completed_day == date(2024, 1, 1)))
+        self.assertIn('idx_habit_day', plan)
+        self.assertNotIn('SCAN completions', plan)
+
+
+class SocialIndexMigrationTestCase(unittest.TestCase):
+    """Tests para el paso de migración de índices sobre un esquema antiguo"""
+
+    def test_migration_dedupes_and_creates_indexes(self):
+        """Test: Se eliminan duplicados y se crean los índices únicos"""
+        engine = sa.create_engine('sqlite://')
+        with engine.begin() as conn:
+            conn.exec_driver_sql('CREATE TABLE friendships (id INTEGER PRIMARY KEY, user_id INT, '
+                                 'friend_id INT, status VARCHAR(20), created_at DATETIME)')
+            conn.exec_driver_sql('CREATE TABLE user_achievements (id INTEGER PRIMARY KEY, user_id INT, '
+                                 'achievement_id INT, earned_at DATETIME)')
+            conn.exec_driver_sql("INSERT INTO friendships (user_id, friend_id, status) VALUES "
+                                 "(1, 2, 'pending'), (1, 2, 'accepted'), (1, 3, 'pending'), (1, 3, 'pending'), "
+                                 "(2, 1, 'pending'), (4, 1, 'pending'), (1, 4, 'accepted'), (5, 1, 'pending'), "
+                                 "(1, 5, 'pending')")
+            conn.exec_driver_sql('INSERT INTO user_achievements (user_id, achievement_id) VALUES (1, 1), (1, 1)')
+
+        upgrade_schema(engine)
+        upgrade_schema(engine)  # idempotente
+
+        with engine.connect() as conn:
+            friendships = conn.exec_driver_sql(
+                'SELECT user_id, friend_id, status FROM friendships ORDER BY user_id + friend_id').all()
+            achievements = conn.exec_driver_sql('SELECT count(*) FROM user_achievements').scalar()
+            indexes = {row[0] for row in conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+        # Duplicados en ambos sentidos: queda la aceptada o, si no hay, la más antigua
+        self.assertEqual(friendships, [(1, 2, 'accepted'), (1, 3, 'pending'), (1, 4, 'accepted'),
+                                       (5, 1, 'pending')])
+        self.assertEqual(achievements, 1)
+        self.assertTrue({'uq_friendship_pair_undirected', 'idx_friendship_user_status',
+                         'idx_friendship_friend_status', 'uq_user_achievement'} <= indexes)
+
+        for user_id, friend_id in ((1, 3), (3, 1)):
+            with self.assertRaises(sa.exc.IntegrityError):
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f"INSERT INTO friendships (user_id, friend_id, status) "
+                                         f"VALUES ({user_id}, {friend_id}, 'pending')")
+
+    def test_migration_backfills_keyset_positions(self):
+        """Test: created_at y completed_date NULL se rellenan para poder paginar"""
+        engine = sa.create_engine('sqlite://')
+        with engine.begin() as conn:
+            conn.exec_driver_sql('CREATE TABLE habits (id INTEGER PRIMARY KEY, user_id INT, is_active BOOLEAN, '
+                                 'created_at DATETIME)')
+            conn.exec_driver_sql('CREATE TABLE completions (id INTEGER PRIMARY KEY, habit_id INT, '
+                                 'completed_date DATETIME, completed_day DATE)')
+            conn.exec_driver_sql('INSERT INTO habits (user_id, created_at) VALUES (1, NULL)')
+            conn.exec_driver_sql("INSERT INTO completions (habit_id, completed_date, completed_day) VALUES "
+                                 "(1, NULL, '2024-03-10'), (1, NULL, NULL)")
+
+        upgrade_schema(engine)
+
+        with engine.connect() as conn:
+            self.assertIsNotNone(conn.exec_driver_sql('SELECT created_at FROM habits').scalar())
+            dates = conn.exec_driver_sql('SELECT completed_date FROM completions ORDER BY id').scalars().all()
+        self.assertEqual(dates[0], '2024-03-10 00:00:00')
+        self.assertIsNotNone(dates[1])
+
+    def test_model_rejects_reverse_pair(self):
+        """Test: El índice del modelo impide B->A si ya existe A->B"""
+        engine = sa.create_engine('sqlite://')
+        Friendship.__table__.create(engine)
+        with engine.begin() as conn:
+            conn.execute(sa.insert(Friendship), {'user_id': 1, 'friend_id': 2, 'status': 'pending'})
+        with self.assertRaises(sa.exc.IntegrityError):
+            with engine.begin() as conn:
+                conn.execute(sa.insert(Friendship), {'user_id': 2, 'friend_id': 1, 'status': 'pending'})
+
+
+class CompletionDayTestCase(unittest.TestCase):
+    """Tests para completed_day en la zona horaria del usuario"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.user = User(username='lima', email='lima@example.com', timezone='America/Lima')
+        self.user.set_password('secreto')
+        db.session.add(self.user)
+        db.session.flush()
+        self.habit = Habit(user_id=self.user.id, name='Leer')
+        db.session.add(self.habit)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_default_uses_user_timezone(self):
+        """Test: Las 02:00 UTC del 11/03 son el 10/03 en Lima"""
+        completion = Completion(habit_id=self.habit.id, completed_date=datetime(2024, 3, 11, 2))
+        db.session.add(completion)
+        db.session.commit()
+        self.assertEqual(completion.completed_day, date(2024, 3, 10))
+
+    def test_completed_today_reads_completed_day(self):
+        """Test: 'Hecho hoy' depende del día local guardado, no del rango UTC"""
+        db.session.add(Completion(habit_id=self.habit.id, completed_day=user_today(self.user)))
+        db.session.commit()
+        self.assertEqual(completed_today_ids(self.user), {self.habit.id})
+
+    def test_migration_backfills_local_day(self):
+        """Test: El relleno de completed_day usa la zona de cada usuario"""
+        engine = sa.create_engine('sqlite://')
+        with engine.begin() as conn:
+            conn.exec_driver_sql('CREATE TABLE users (id INTEGER PRIMARY KEY, timezone VARCHAR(50))')
+            conn.exec_driver_sql('CREATE TABLE habits (id INTEGER PRIMARY KEY, user_id INT, is_active BOOLEAN, '
+                                 'created_at DATETIME)')
+            conn.exec_driver_sql('CREATE TABLE completions (id INTEGER PRIMARY KEY, habit_id INT, '
+                                 'completed_date DATETIME)')
+            conn.exec_driver_sql("INSERT INTO users (id, timezone) VALUES (1, 'America/Lima'), (2, 'UTC')")
+            conn.exec_driver_sql("INSERT INTO habits (id, user_id, created_at) VALUES "
+                                 "(1, 1, '2024-01-01 00:00:00'), (2, 2, '2024-01-01 00:00:00')")
+            conn.exec_driver_sql("INSERT INTO completions (habit_id, completed_date) VALUES "
+                                 "(1, '2024-03-11 02:00:00.000000'), (1, '2024-03-11 12:00:00.000000'), "
+                                 "(2, '2024-03-11 02:00:00.000000')")
+
+        upgrade_schema(engine)
+
+        with engine.connect() as conn:
+            days = conn.exec_driver_sql('SELECT completed_day FROM completions ORDER BY id').scalars().all()
+        self.assertEqual(days, ['2024-03-10', '2024-03-11', '2024-03-11'])
+
+
+if __name__ == '__main__':
+    unittest.main()
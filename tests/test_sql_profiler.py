@@ -0,0 +1,147 @@
+"""
+Tests unitarios para la instrumentación SQL por petición.
+"""
+
+import unittest
+import os
+import sys
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import sqlalchemy as sa
+from flask import Flask, jsonify
+
+import backend.app as habitiq
+from backend.services.sql_profiler import RequestProfile, SQLProfiler, fingerprint
+
+
+class FingerprintTestCase(unittest.TestCase):
+    """Tests para la normalización de sentencias"""
+
+    def test_ignores_values_and_whitespace(self):
+        """Test: Literales y espacios no cambian la huella"""
+        self.assertEqual(fingerprint("SELECT * FROM users WHERE id = 1"),
+                         fingerprint("SELECT *  FROM users\n WHERE id = 42"))
+        self.assertEqual(fingerprint("SELECT 1 FROM users WHERE name = 'ana'"),
+                         fingerprint("SELECT 2 FROM users WHERE name = 'luis'"))
+
+    def test_collapses_in_lists(self):
+        """Test: IN con distinto número de parámetros tiene la misma huella"""
+        self.assertEqual(fingerprint("SELECT * FROM habits WHERE id IN (?, ?)"),
+                         fingerprint("SELECT * FROM habits WHERE id IN (?, ?, ?, ?)"))
+
+    def test_keeps_identifiers(self):
+        """Test: Los números dentro de identificadores se conservan"""
+        self.assertIn('anon_1', fingerprint("SELECT anon_1.id FROM (SELECT 1 AS id) AS anon_1"))
+
+
+class RequestProfileTestCase(unittest.TestCase):
+    """Tests para el resumen de una petición"""
+
+    def test_duplicates_and_slowest(self):
+        """Test: Repetidas agrupadas por huella y lentas ordenadas"""
+        profile = RequestProfile('GET', '/leaderboard')
+        for i in range(7):
+            profile.record(f"SELECT * FROM habits WHERE user_id = {i}", float(i))
+        profile.record("SELECT * FROM users", 0.5)
+
+        self.assertEqual(profile.statements, 8)
+        self.assertAlmostEqual(profile.db_ms, 21.5)
+        self.assertEqual(profile.duplicates, [{'count': 7, 'fingerprint': 'SELECT * FROM habits WHERE user_id = ?'}])
+        self.assertEqual([s['ms'] for s in profile.slowest], [6.0, 5.0, 4.0, 3.0, 2.0])
+
+    def test_server_timing(self):
+        """Test: Server-Timing incluye db y app"""
+        profile = RequestProfile('GET', '/')
+        profile.record("SELECT 1", 1.0)
+        profile.record("SELECT 2", 1.0)
+        header = profile.finish('index', 200).server_timing()
+        self.assertTrue(header.startswith('db;dur=2.00;desc="2 queries, 1 repeated"'))
+        self.assertIn('app;dur=', header)
+
+
+class SQLProfilerTestCase(unittest.TestCase):
+    """Tests para los hooks de Flask y SQLAlchemy"""
+
+    def setUp(self):
+        self.engine = sa.create_engine('sqlite://')
+        self.app = Flask(__name__)
+        self.profiler = SQLProfiler(self.app, ring_size=2, keep_requests=True)
+
+        @self.app.route('/n-plus-one')
+        def n_plus_one():
+            with self.engine.connect() as conn:
+                for i in range(3):
+                    conn.execute(sa.text(f'SELECT {i}'))
+            return jsonify({})
+
+        self.client = self.app.test_client()
+
+    def test_header_and_ring_buffer(self):
+        """Test: Cada respuesta lleva Server-Timing y se guarda en el buffer"""
+        response = self.client.get('/n-plus-one?x=1')
+        self.assertIn('3 queries, 2 repeated', response.headers['Server-Timing'])
+
+        recent = self.profiler.recent()
+        self.assertEqual(len(recent), 1)
+        self.assertEqual(recent[0]['path'], '/n-plus-one?x=***')
+        self.assertEqual(recent[0]['statements'], 3)
+        self.assertEqual(recent[0]['duplicates'][0]['count'], 3)
+
+    def test_ring_buffer_is_bounded(self):
+        """Test: El buffer conserva solo las últimas peticiones"""
+        for i in range(3):
+            self.client.get(f'/n-plus-one?p{i}=secreto')
+        self.assertEqual([r['path'] for r in self.profiler.recent()], ['/n-plus-one?p2=***', '/n-plus-one?p1=***'])
+
+    def test_ignores_queries_outside_requests(self):
+        """Test: Las sentencias fuera de una petición no se registran"""
+        with self.engine.connect() as conn:
+            conn.execute(sa.text('SELECT 1'))
+        self.assertEqual(self.profiler.recent(), [])
+
+
+class DebugRequestsAccessTestCase(unittest.TestCase):
+    """Tests para el acceso a /debug/requests"""
+
+    def setUp(self):
+        self.app_context = habitiq.app.app_context()
+        self.app_context.push()
+        habitiq.db.create_all()
+        user = habitiq.User(username='ana', email='ana@example.com')
+        user.set_password('secreto')
+        habitiq.db.session.add(user)
+        habitiq.db.session.commit()
+        self.user_id = user.id
+        self.client = habitiq.app.test_client()
+        self.saved = habitiq.sql_profiler.keep_requests, habitiq.DEBUG_ADMINS
+        habitiq.sql_profiler.keep_requests = True
+
+    def tearDown(self):
+        habitiq.sql_profiler.keep_requests, habitiq.DEBUG_ADMINS = self.saved
+        habitiq.db.session.remove()
+        habitiq.db.drop_all()
+        self.app_context.pop()
+
+    def get(self, remote_addr, **headers):
+        return self.client.get('/debug/requests', environ_base={'REMOTE_ADDR': remote_addr}, headers=headers)
+
+    def test_loopback_only_without_proxy(self):
+        """Test: Un cliente local accede; uno remoto o vía proxy no"""
+        self.assertEqual(self.get('127.0.0.1').status_code, 200)
+        self.assertEqual(self.get('10.0.0.8').status_code, 404)
+        self.assertEqual(self.get('127.0.0.1', **{'X-Forwarded-For': '203.0.113.5'}).status_code, 404)
+
+    def test_admin_from_remote_address(self):
+        """Test: Un usuario de DEBUG_ADMINS accede desde cualquier dirección"""
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(self.user_id)
+        self.assertEqual(self.get('10.0.0.8').status_code, 404)
+        habitiq.DEBUG_ADMINS = {'ana'}
+        self.assertEqual(self.get('10.0.0.8').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+Tests de los trabajos de rachas sobre la base de datos (rollover nocturno y
+recálculo masivo).
+"""
+
+import unittest
+import os
+import sys
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import app, db, User, Habit, Completion, recompute_streaks, rollover_streaks
+from backend.services.streaks import StreakService
+from backend.services.time_service import TimeService
+
+# Miércoles; en Lima (UTC-5) todavía es el día anterior
+TODAY = date(2024, 5, 15)
+LOCAL_TODAY = {'America/Lima': TODAY - timedelta(days=1)}
+
+
+def frozen_today(tz_name=None):
+    """Hoy fijo por zona horaria"""
+    return LOCAL_TODAY.get(tz_name, TODAY)
+
+
+class StreakJobsTestCase(unittest.TestCase):
+    """Base: usuarios y hábitos con rachas y completaciones a medida"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        patcher = mock.patch.object(TimeService, 'today', staticmethod(frozen_today))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_user(self, username, timezone='UTC'):
+        user = User(username=username, email=f'{username}@example.com', timezone=timezone)
+        user.set_password('secreto')
+        db.session.add(user)
+        db.session.flush()
+        return user
+
+    def add_habit(self, user, frequency, days, current=0, best=0):
+        habit = Habit(user_id=user.id, name=f'{frequency} {len(days)}', frequency=frequency,
+                      current_streak=current, best_streak=best)
+        db.session.add(habit)
+        db.session.flush()
+        db.session.add_all(Completion(habit_id=habit.id, completed_day=day,
+                                      completed_date=datetime.combine(day, datetime.min.time()))
+                           for day in days)
+        return habit
+
+    def streaks(self):
+        db.session.expire_all()
+        return {habit.id: (habit.current_streak, habit.best_streak) for habit in Habit.query}
+
+
+class RolloverStreaksTestCase(StreakJobsTestCase):
+    """Tests para rollover_streaks"""
+
+    def test_resets_only_expired_streaks(self):
+        """Test: Diaria, semanal y mensual caducadas a 0 con best intacto; vivas y de Lima sin tocar"""
+        madrid = self.add_user('madrid', 'Europe/Madrid')
+        lima = self.add_user('lima', 'America/Lima')
+        expired = [
+            self.add_habit(madrid, 'daily', [TODAY - timedelta(days=2)], current=3, best=5),
+            self.add_habit(madrid, 'weekly', [date(2024, 5, 1)], current=2, best=4),  # semana antepasada
+            self.add_habit(madrid, 'monthly', [date(2024, 3, 20)], current=2, best=2),  # marzo
+        ]
+        alive = [
+            self.add_habit(madrid, 'daily', [TODAY - timedelta(days=1)], current=2, best=2),
+            self.add_habit(madrid, 'weekly', [date(2024, 5, 6)], current=1, best=1),  # lunes pasado
+            self.add_habit(madrid, 'monthly', [date(2024, 4, 10)], current=1, best=3),  # abril
+            # Mismo día que la diaria caducada de Madrid, pero en Lima aún es "ayer"
+            self.add_habit(lima, 'daily', [TODAY - timedelta(days=2)], current=4, best=4),
+        ]
+        db.session.commit()
+        before = self.streaks()
+
+        self.assertEqual(rollover_streaks(chunk_size=1), len(expired))
+
+        after = self.streaks()
+        for habit in expired:
+            self.assertEqual(after[habit.id], (0, before[habit.id][1]))
+        for habit in alive:
+            self.assertEqual(after[habit.id], before[habit.id])
+
+        # Idempotente: una segunda pasada no cambia nada
+        self.assertEqual(rollover_streaks(chunk_size=1), 0)
+        self.assertEqual(self.streaks(), after)
+
+    def test_without_users(self):
+        """Test: Sin usuarios no hay nada que reiniciar"""
+        self.assertEqual(rollover_streaks(), 0)
+
+
+class RecomputeStreaksTestCase(StreakJobsTestCase):
+    """Tests para recompute_streaks por bloques"""
+
+    def test_chunks_match_streak_service(self):
+        """Test: Con varios bloques, las rachas guardadas son las de StreakService"""
+        patterns = {
+            'daily': [0, 1, 2, 4, 5, 6, 7, 20],
+            'weekly': [0, 7, 14, 35, 42],
+            'monthly': [3, 40, 70, 150],
+        }
+        expected = {}
+        for i, timezone in enumerate(('UTC', 'America/Lima', 'Europe/Madrid')):
+            user = self.add_user(f'user{i}', timezone)
+            today = frozen_today(timezone)
+            for frequency, offsets in patterns.items():
+                days = [today - timedelta(days=n + i) for n in offsets]
+                habit = self.add_habit(user, frequency, days, current=99, best=99)
+                expected[habit.id] = StreakService.compute(sorted(days), frequency, today)
+        # Una completación repetida el mismo día no cuenta dos veces
+        db.session.add(Completion(habit_id=next(iter(expected)), completed_day=TODAY,
+                                  completed_date=datetime(2024, 5, 15, 12)))
+        db.session.commit()
+
+        self.assertEqual(recompute_streaks(chunk_size=2), len(expected))
+        self.assertEqual(self.streaks(), expected)
+        self.assertTrue(any(current for current, _ in expected.values()))
+
+    def test_only_given_users(self):
+        """Test: Con user_ids solo se recalculan los hábitos de esos usuarios"""
+        ana, luis = self.add_user('ana'), self.add_user('luis')
+        mine = self.add_habit(ana, 'daily', [TODAY], current=7, best=7)
+        other = self.add_habit(luis, 'daily', [TODAY], current=7, best=7)
+        db.session.commit()
+
+        self.assertEqual(recompute_streaks([ana.id], chunk_size=1), 1)
+        streaks = self.streaks()
+        self.assertEqual(streaks[mine.id], (1, 1))
+        self.assertEqual(streaks[other.id], (7, 7))
+
+
+if __name__ == '__main__':
+    unittest.main()
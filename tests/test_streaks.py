@@ -0,0 +1,81 @@
+"""
+Tests unitarios para el motor de rachas.
+"""
+
+import unittest
+import os
+import sys
+from datetime import date, timedelta
+from unittest import mock
+
+# Agregar raíz del proyecto al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.services import streaks
+from backend.services.streaks import StreakService
+
+
+class StreakServiceTestCase(unittest.TestCase):
+    """Tests para rachas diarias, semanales y el cálculo masivo"""
+
+    def setUp(self):
+        self.today = date(2024, 3, 13)  # miércoles
+
+    def days_ago(self, *offsets):
+        return sorted(self.today - timedelta(days=n) for n in offsets)
+
+    def test_daily_current_and_best(self):
+        """Test: Racha actual hasta hoy y mejor racha histórica"""
+        days = self.days_ago(0, 1, 2, 5, 6, 7, 8)
+        self.assertEqual(StreakService.compute(days, 'daily', self.today), (3, 4))
+
+    def test_daily_alive_from_yesterday(self):
+        """Test: La racha sigue viva si el último día fue ayer, y se rompe antes"""
+        self.assertEqual(StreakService.compute(self.days_ago(1, 2), 'daily', self.today), (2, 2))
+        self.assertEqual(StreakService.compute(self.days_ago(2, 3), 'daily', self.today), (0, 2))
+        self.assertEqual(StreakService.compute([], 'daily', self.today), (0, 0))
+
+    def test_duplicates_ignored(self):
+        """Test: Días repetidos cuentan una vez"""
+        days = self.days_ago(0, 0, 1, 1)
+        self.assertEqual(StreakService.compute(days, 'daily', self.today), (2, 2))
+
+    def test_weekly(self):
+        """Test: Semanal cuenta semanas ISO consecutivas con al menos un día"""
+        days = [date(2024, 2, 26), date(2024, 3, 4), date(2024, 3, 10), date(2024, 3, 11)]
+        self.assertEqual(StreakService.compute(days, 'weekly', self.today), (3, 3))
+        self.assertEqual(StreakService.compute(days[:1], 'weekly', self.today), (0, 1))
+
+    def test_monthly(self):
+        """Test: Mensual cruza el cambio de año"""
+        days = [date(2023, 12, 31), date(2024, 1, 15), date(2024, 2, 1)]
+        self.assertEqual(StreakService.compute(days, 'monthly', self.today), (3, 3))
+
+    def test_previous_period_start(self):
+        """Test: Inicio del periodo anterior según la frecuencia"""
+        self.assertEqual(StreakService.previous_period_start(self.today, 'daily'), date(2024, 3, 12))
+        self.assertEqual(StreakService.previous_period_start(self.today, 'weekly'), date(2024, 3, 4))
+        self.assertEqual(StreakService.previous_period_start(date(2024, 1, 5), 'monthly'), date(2023, 12, 1))
+
+    def check_compute_many(self):
+        rows = [(1, d) for d in self.days_ago(0, 1, 2, 5, 6, 7, 8)] + \
+               [(2, d) for d in [date(2024, 3, 4), date(2024, 3, 5), date(2024, 3, 11)]] + \
+               [(3, d) for d in self.days_ago(3)]
+        frequencies = {1: 'daily', 2: 'weekly', 3: 'daily', 4: 'daily'}
+        result = StreakService.compute_many(rows, frequencies, self.today)
+
+        self.assertEqual(result, {1: (3, 4), 2: (2, 2), 3: (0, 1), 4: (0, 0)})
+
+    def test_compute_many_python(self):
+        """Test: Cálculo masivo sin NumPy"""
+        with mock.patch.object(streaks, 'np', None):
+            self.check_compute_many()
+
+    @unittest.skipIf(streaks.np is None, 'NumPy no instalado')
+    def test_compute_many_numpy(self):
+        """Test: Cálculo masivo vectorizado con NumPy"""
+        self.check_compute_many()
+
+
+if __name__ == '__main__':
+    unittest.main()
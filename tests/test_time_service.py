@@ -0,0 +1,50 @@
+"""
+Tests unitarios para el servicio de fechas y zonas horarias.
+"""
+
+import unittest
+import os
+import sys
+from datetime import datetime, date
+
+# Agregar raíz del proyecto al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.services.time_service import TimeService
+
+
+class TimeServiceTestCase(unittest.TestCase):
+    """Tests para la conversión de días locales a rangos UTC"""
+
+    def test_day_window_utc(self):
+        """Test: Día UTC es [00:00, 00:00 del día siguiente)"""
+        start, end = TimeService.day_window(date(2024, 3, 10))
+        self.assertEqual(start, datetime(2024, 3, 10))
+        self.assertEqual(end, datetime(2024, 3, 11))
+
+    def test_day_window_timezone(self):
+        """Test: Día en Lima (UTC-5) se desplaza 5 horas"""
+        start, end = TimeService.day_window(date(2024, 3, 10), 'America/Lima')
+        self.assertEqual(start, datetime(2024, 3, 10, 5))
+        self.assertEqual(end, datetime(2024, 3, 11, 5))
+
+    def test_day_window_dst(self):
+        """Test: El día del cambio de hora dura 23 horas"""
+        start, end = TimeService.day_window(date(2024, 3, 31), 'Europe/Madrid')
+        self.assertEqual(start, datetime(2024, 3, 30, 23))
+        self.assertEqual(end, datetime(2024, 3, 31, 22))
+
+    def test_local_day(self):
+        """Test: Día local de un instante UTC"""
+        moment = datetime(2024, 1, 1, 3)
+        self.assertEqual(TimeService.local_day(moment), date(2024, 1, 1))
+        self.assertEqual(TimeService.local_day(moment, 'America/Lima'), date(2023, 12, 31))
+
+    def test_unknown_zone_falls_back_to_utc(self):
+        """Test: Zona desconocida usa UTC"""
+        self.assertEqual(TimeService.get_zone('Mars/Base').key, 'UTC')
+        self.assertEqual(TimeService.get_zone(None).key, 'UTC')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Tests de la puntuación materializada (user_scores): las actualizaciones
+incrementales deben coincidir con el refresco completo.
+"""
+
+import unittest
+import os
+import sys
+from datetime import timedelta
+
+from flask import g
+
+# Base de datos en memoria antes de importar la app
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app import (app, db, User, Habit, Friendship, UserAchievement, UserScore,
+                         refresh_user_scores, seed_achievements, user_today)
+
+SCORE_COLUMNS = ('best_streak', 'total_completions', 'today_done', 'today_day',
+                 'achievements', 'habit_count', 'friend_count')
+
+
+class UserScoresTestCase(unittest.TestCase):
+    """Tests para bump_user_score frente a refresh_user_scores"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        seed_achievements()
+        self.users = []
+        for username in ('ana', 'luis'):
+            user = User(username=username, email=f'{username}@example.com')
+            user.set_password('secreto')
+            db.session.add(user)
+            self.users.append(user)
+        db.session.commit()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login(self, user):
+        # Las peticiones reutilizan el app context del test: olvidar el usuario cacheado en g
+        g.pop('_login_user', None)
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+
+    def toggle(self, habit_id):
+        response = self.client.post(f'/habits/toggle/{habit_id}',
+                                    headers={'X-Requested-With': 'XMLHttpRequest'})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def scores(self):
+        db.session.expire_all()
+        return {score.user_id: tuple(getattr(score, column) for column in SCORE_COLUMNS)
+                for score in UserScore.query}
+
+    def test_incremental_matches_full_refresh(self):
+        """Test: Tras crear, marcar, desmarcar, lotes, logros y amistad, la fila es la del refresco"""
+        ana, luis = self.users
+        self.login(ana)
+        for name in ('Leer', 'Correr', 'Meditar'):
+            self.assertEqual(self.client.post('/habits/new', data={'name': name}).status_code, 302)
+        leer, correr, meditar = [habit.id for habit in Habit.query.filter_by(user_id=ana.id).order_by(Habit.id)]
+
+        # Marcar y desmarcar hoy; el primero otorga first_complete
+        self.assertEqual(['Check!'], self.toggle(leer)['achievements'])
+        self.toggle(correr)
+        self.toggle(meditar)  # perfect_day
+        self.assertFalse(self.toggle(correr)['completed'])
+        self.toggle(meditar)
+
+        # Días atrasados en lote (streak_3) y desmarcar alguno después
+        today = user_today(ana)
+        days = [(today - timedelta(days=n)).isoformat() for n in range(1, 4)]
+        response = self.client.post('/api/completions/batch', json=[[leer, day, True] for day in days] +
+                                    [[correr, days[0], True], [correr, days[1], True]])
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/api/completions/batch', json=[[correr, days[1], False]])
+        self.assertEqual(response.status_code, 200)
+
+        # Amistad aceptada (first_friend para los dos)
+        self.assertEqual(self.client.post(f'/friends/add/{luis.id}').status_code, 302)
+        friendship = Friendship.query.one()
+        self.login(luis)
+        self.assertEqual(self.client.post(f'/friends/accept/{friendship.id}').status_code, 302)
+
+        incremental = self.scores()
+        self.assertEqual(set(incremental), {ana.id, luis.id})
+        self.assertGreaterEqual(UserAchievement.query.filter_by(user_id=ana.id).count(), 5)
+        self.assertEqual(incremental[ana.id][SCORE_COLUMNS.index('total_completions')], 5)
+        self.assertEqual(incremental[ana.id][SCORE_COLUMNS.index('today_done')], 1)
+
+        refresh_user_scores([ana.id, luis.id])
+        self.assertEqual(self.scores(), incremental)
+
+
+if __name__ == '__main__':
+    unittest.main()